@@ -1,30 +1,293 @@
 #!/usr/bin/env python
 
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
-def load_xyz_traj(filename):
-    """ Read the xyz file as a trajectory """
-    # load all lines at once
-    with open(filename) as f:
-        lines = f.readlines()
-    n_lines = len(lines)
-    traj = []
-    # read the number of atoms from first line
-    noa = int(lines[0])
+def load_xyz_traj(filename, chunk_size=1<<24, frames=None, n_workers=1):
+    """ Read the xyz file as a trajectory
+
+    The file is read in chunks of chunk_size bytes, and the whole frames in each chunk
+    are parsed together by parse_xyz_frames(). If frames is given as a slice, only
+    these frames are read, found through the byte offset index of the file.
+    If n_workers is not 1, the file is parsed by load_xyz_traj_parallel().
+    """
+    if frames is None and n_workers != 1:
+        return load_xyz_traj_parallel(filename, n_workers=n_workers)
+    if frames is not None:
+        noa = index_xyz_traj(filename)[0]
+        xyz = list(iter_xyz_frames(filename, frames.start, frames.stop, frames.step))
+        return np.array(xyz, dtype=float).reshape(len(xyz), noa, 3)
+    with open(filename, 'rb') as f:
+        noa = int(f.readline())
+        f.seek(0)
+        lines_per_frame = noa + 2
+        blocks = []
+        rest = b''
+        for data in iter(lambda: f.read(chunk_size), b''):
+            data = rest + data
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            line_ends = np.flatnonzero(buffer == ord('\n'))
+            # the lines after the last whole frame are kept for the next chunk
+            n_lines = len(line_ends) - len(line_ends) % lines_per_frame
+            if n_lines > 0:
+                blocks.append(parse_xyz_frames(buffer, line_ends[:n_lines], noa))
+                data = data[line_ends[n_lines-1]+1:]
+            rest = data
+        # the last frame may not end with a new line
+        blocks.append(parse_xyz_bytes(rest, noa))
+    return np.concatenate(blocks)
+
+def parse_xyz_lines(lines, noa):
+    """ Parse the lines of whole xyz frames into a numpy array of shape (Nframes, Natoms, 3) with parse_xyz_bytes() """
+    lines = [line.encode() if isinstance(line, str) else line for line in lines]
+    return parse_xyz_bytes(b'\n'.join(line.rstrip(b'\r\n') for line in lines), noa)
+
+def parse_xyz_bytes(data, noa):
+    """ Parse the bytes of whole xyz frames into a numpy array of shape (Nframes, Natoms, 3)
+
+    The last line may not end with a new line.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buffer == ord('\n'))
+    if len(buffer) > 0 and buffer[-1] != ord('\n'):
+        line_ends = np.append(line_ends, len(buffer))
+    return parse_xyz_frames(buffer, line_ends, noa)
+
+def parse_xyz_frames(buffer, line_ends, noa):
+    """ Parse the whole frames in the bytes of buffer, given the end of each line
+
+    The two header lines of each frame are dropped by their byte offsets, and the coordinates
+    of all atom lines are converted to numbers in one vectorized pass by parse_fixed_columns(),
+    or by the C parser of numpy if they are not in fixed-width columns.
+    """
     lines_per_frame = noa + 2
-    # read the frames
-    for i_frame in range(int(n_lines / lines_per_frame)):
-        frame_lines = lines[i_frame*lines_per_frame:(i_frame+1)*lines_per_frame]
-        frame_coords = parse_xyz_frame(frame_lines)
-        traj.append(frame_coords)
-    return np.array(traj, dtype=float)
+    n_frames = len(line_ends) // lines_per_frame
+    if n_frames == 0 or noa == 0:
+        return np.zeros((n_frames, noa, 3))
+    line_ends = line_ends[:n_frames*lines_per_frame].reshape(n_frames, lines_per_frame)
+    # each atom line starts after the end of the previous line
+    atom_starts = line_ends[:, 1:-1] + 1
+    atom_ends = line_ends[:, 2:]
+    xyz = parse_fixed_columns(buffer[:atom_ends[-1, -1]], atom_starts, atom_ends)
+    if xyz is None:
+        data = buffer.tobytes()
+        atom_lines = [data[start:end] for start, end in zip(atom_starts.ravel().tolist(), atom_ends.ravel().tolist())]
+        xyz = np.loadtxt(atom_lines, usecols=(1, 2, 3), comments=None, ndmin=2)
+    return xyz.reshape(n_frames, noa, 3)
+
+def parse_fixed_columns(buffer, line_starts, line_ends, block_lines=4096):
+    """ Parse the 3 coordinates at the end of each atom line in fixed-width columns, e.g. written by ' %10.7f'
+
+    The columns are found in the first line. The last bytes of each line are gathered into a matrix,
+    which is checked column by column for the spaces, the optional minus sign, the digits and the point
+    of each number, and the digits are combined by one matrix product, exactly as by float().
+    block_lines lines are parsed at a time, so the intermediate arrays stay in the CPU cache.
+    Returns the coordinates of shape (Nlines, 3), or None if the lines are not in the same columns.
+    """
+    columns = fixed_columns(buffer[line_starts[0, 0]:line_ends[0, 0]].tobytes())
+    if columns is None:
+        return None
+    width, n_int, n_frac, n_after = columns
+    # the points in the atom lines are only the 3 in the columns
+    n_points = np.count_nonzero(buffer == ord('.'))
+    if n_points != 3 * line_ends.size:
+        # drop the points in the header lines
+        points = np.flatnonzero(buffer == ord('.'))
+        n_points = np.sum(np.searchsorted(points, line_ends[:, -1]) - np.searchsorted(points, line_starts[:, 0]))
+        if n_points != 3 * line_ends.size:
+            return None
+    # the tail of each line has the 3 columns, each with a separator, n_int - 2 middle bytes
+    # of spaces, an optional minus sign and digits, a digit, the point and n_frac digits
+    n_tail = 3 * width + n_after
+    n_middle = n_int - 2
+    line_starts, line_ends = line_starts.ravel(), line_ends.ravel()
+    # each line has an element before the columns
+    if np.min(line_ends - line_starts) <= n_tail:
+        return None
+    # the lowest byte and the range of each byte of the tail, spaces up to ' ' by default,
+    # and the decimal weight of each digit
+    lowest = np.zeros(n_tail, dtype=int)
+    span = np.full(n_tail, ord(' '), dtype=np.uint8)
+    weights = np.zeros((n_tail, 3))
+    for i in range(3):
+        point = i * width + n_int
+        lowest[point-n_int+1:point+1+n_frac] = ord('0')
+        span[point-n_int+1:point+1+n_frac] = 9
+        # the middle bytes are checked again below
+        lowest[point-n_int+1:point-1] = 0
+        span[point-n_int+1:point-1] = ord('9')
+        lowest[point] = ord('.')
+        span[point] = 0
+        weights[point-n_int+1:point, i] = 10.0 ** np.arange(n_int - 2 + n_frac, n_frac - 1, -1)
+        weights[point+1:point+1+n_frac, i] = 10.0 ** np.arange(n_frac - 1, -1, -1)
+    # the bytes are checked after subtracting '0', which wraps the bytes below '0' around to 208-255
+    zero = ord('0')
+    lowest = np.tile((lowest - zero) % 256, block_lines).astype(np.uint8)
+    span = np.tile(span, block_lines)
+    space, minus = np.uint8(ord(' ') - zero + 256), np.uint8(ord('-') - zero + 256)
+    scale = 10.0 ** n_frac
+    tails = np.ndarray((len(buffer) - n_tail + 1,), dtype=f'V{n_tail}', buffer=buffer, strides=(1,))
+    xyz = np.empty((len(line_ends), 3))
+    for start in range(0, len(line_ends), block_lines):
+        block = tails[line_ends[start:start+block_lines] - n_tail].view(np.uint8).reshape(-1, n_tail)
+        digits = block.ravel() - np.uint8(zero)
+        size = digits.size
+        checked = digits - lowest[:size]
+        if not np.all(checked <= span[:size]):
+            return None
+        # the few middle bytes are copied, so they are checked faster
+        middle = np.ndarray((len(block), 3, n_middle), dtype=np.uint8, buffer=digits, offset=1, strides=(n_tail, width, 1))
+        middle_copy = middle.copy()
+        is_minus = middle_copy == minus
+        # the middle bytes above '9' are only spaces and minus signs
+        if np.any((middle_copy > space) ^ is_minus):
+            return None
+        is_digit = middle_copy < 10
+        # spaces, then an optional minus sign, then digits
+        if n_middle > 1 and np.any((is_digit[..., :-1] | is_minus[..., :-1]) > is_digit[..., 1:]):
+            return None
+        middle_copy *= is_digit
+        middle[...] = middle_copy
+        signed_scale = np.any(is_minus, axis=2) * (-2 * scale)
+        signed_scale += scale
+        np.divide(digits.reshape(-1, n_tail) @ weights, signed_scale, out=xyz[start:start+block_lines])
+    return xyz
+
+def fixed_columns(line):
+    """ Width, bytes before and after the point of the 3 columns at the end of the line, and bytes after them """
+    points = [i for i, byte in enumerate(line) if byte == ord('.')]
+    if len(points) != 3:
+        return None
+    n_frac = [len(line) - i - 1 - len(line[i+1:].lstrip(b'0123456789')) for i in points]
+    width = points[1] - points[0]
+    n_int = width - n_frac[0] - 1
+    # at most 14 digits, so the integer of all digits is exact in double precision
+    if not (points[2] - points[1] == width and n_frac[0] == n_frac[1] == n_frac[2] <= 7 and 2 <= n_int <= 8):
+        return None
+    return width, n_int, n_frac[0], len(line) - points[2] - 1 - n_frac[0]
 
 def parse_xyz_frame(lines):
     """ read the traj coordinates from lines for one frame """
-    coords = []
-    for line in lines[2:]:
-        coords.append(np.array(line.split()[1:], dtype=float))
-    return np.array(coords)
+    return parse_xyz_lines(lines, len(lines) - 2)[0]
+
+# the sidecar index has the same format as mdsim.io.xyz_index, so both read the same file
+INDEX_VERSION = 1
+
+def index_xyz_traj(filename):
+    """ Find the byte offset of each frame in an xyz file
+
+    Only the start of each frame is kept while reading the file in chunks. The index is saved
+    in the sidecar file filename.idx together with the format version, the size and the mtime
+    of the xyz file, and rebuilt when the xyz file changes.
+
+    Returns
+    -------
+    noa: int
+        Number of atoms in each frame
+    offsets: numpy.ndarray of shape (Nframes + 1,)
+        Frame k is stored in bytes offsets[k]:offsets[k+1] of the file
+    """
+    stat = os.stat(filename)
+    index_file = f'{filename}.idx'
+    try:
+        index = np.load(index_file)
+        if len(index) >= 4 and tuple(index[:3]) == (INDEX_VERSION, stat.st_size, stat.st_mtime_ns):
+            return int(index[3]), index[4:]
+    except (OSError, ValueError):
+        pass
+    with open(filename, 'rb') as f:
+        noa = int(f.readline())
+        f.seek(0)
+        lines_per_frame = noa + 2
+        frame_starts = [np.zeros(1, dtype=np.int64)]
+        n_newlines = 0
+        file_size = 0
+        last_byte = b'\n'
+        for data in iter(lambda: f.read(1<<24), b''):
+            newline_pos = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+            # a frame starts after every noa + 2 lines
+            line_number = n_newlines + np.arange(1, len(newline_pos) + 1)
+            frame_starts.append(file_size + newline_pos[line_number % lines_per_frame == 0] + 1)
+            n_newlines += len(newline_pos)
+            file_size += len(data)
+            last_byte = data[-1:]
+    # the last line may not end with a new line
+    n_frames = (n_newlines + (last_byte != b'\n')) // lines_per_frame
+    offsets = np.concatenate(frame_starts)[:n_frames+1]
+    if len(offsets) == n_frames:
+        offsets = np.append(offsets, file_size)
+    try:
+        with open(index_file, 'wb') as f:
+            np.save(f, np.concatenate([[INDEX_VERSION, stat.st_size, stat.st_mtime_ns, noa], offsets]).astype(np.int64))
+    except OSError:
+        pass
+    return noa, offsets
+
+def read_xyz_range(f, noa, byte_start, byte_stop):
+    """ Parse the whole frames stored in bytes byte_start:byte_stop of an open xyz file """
+    f.seek(byte_start)
+    return parse_xyz_bytes(f.read(byte_stop - byte_start), noa)
+
+def iter_xyz_frames(filename, start=None, stop=None, step=None):
+    """ Yield the frames in range(start, stop, step) of an xyz file lazily
+
+    Each frame is read by seeking to its byte offset, so the cost is proportional to the frames read.
+    """
+    noa, offsets = index_xyz_traj(filename)
+    with open(filename, 'rb') as f:
+        for i_frame in range(*slice(start, stop, step).indices(len(offsets) - 1)):
+            yield read_xyz_range(f, noa, offsets[i_frame], offsets[i_frame+1])[0]
+
+def parse_xyz_range(filename, result_file, shape, start, stop, byte_start, byte_stop):
+    """ Parse frames start:stop from a byte range of an xyz file into the shared result array """
+    result = np.memmap(result_file, dtype=float, mode='r+', shape=shape)
+    with open(filename, 'rb') as f:
+        result[start:stop] = read_xyz_range(f, shape[1], byte_start, byte_stop)
+    result.flush()
+
+def shared_memory_dir(n_bytes):
+    """ /dev/shm if it has room for n_bytes and 64 MB to spare, otherwise None for the default temporary folder """
+    try:
+        return '/dev/shm' if shutil.disk_usage('/dev/shm').free >= n_bytes + (1<<26) else None
+    except OSError:
+        return None
+
+def load_xyz_traj_parallel(filename, n_workers=None):
+    """ Read the xyz file as a trajectory with a pool of processes
+
+    The file is split at frame boundaries using the byte offset index, and each worker
+    parses its byte range into a memory-mapped result file in shared memory (/dev/shm),
+    or in the default temporary folder if /dev/shm is too small, e.g. 64 MB in docker.
+    The result is mapped by this process too, so it is assembled without copying.
+    """
+    noa, offsets = index_xyz_traj(filename)
+    shape = (len(offsets) - 1, noa, 3)
+    if shape[0] == 0 or noa == 0:
+        return np.zeros(shape)
+    n_workers = n_workers or os.cpu_count()
+    # a few ranges per worker to balance the load
+    bounds = np.linspace(0, shape[0], min(4 * n_workers, shape[0]) + 1).astype(int)
+    n_bytes = shape[0] * noa * 3 * 8
+    fd, result_file = tempfile.mkstemp(dir=shared_memory_dir(n_bytes))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(n_bytes)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(parse_xyz_range, filename, result_file, shape, start, stop, int(offsets[start]), int(offsets[stop]))
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            for future in futures:
+                future.result()
+        traj = np.memmap(result_file, dtype=float, mode='r+', shape=shape)
+    finally:
+        # the mapping stays valid after the file is removed
+        try:
+            os.remove(result_file)
+        except OSError:
+            pass
+    return traj
 
 def find_break_frame(traj, thresh=0.1):
     """ Find the frame in trajectory where the structure changes from initial
@@ -51,9 +314,10 @@ def main():
     parser = argparse.ArgumentParser(description='Analyze MD trajectory', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('trajfile', help="Input trajectory file.")
     parser.add_argument('-t', '--thresh', type=float, default=0.1, help="Threshold for detecting the geometry change")
+    parser.add_argument('-j', '--n_workers', type=int, default=1, help="Number of processes parsing the trajectory, 0 for the number of CPUs")
     args = parser.parse_args()
 
-    traj = load_xyz_traj(args.trajfile)
+    traj = load_xyz_traj(args.trajfile, n_workers=args.n_workers or None)
     break_frame = find_break_frame(traj)
 
     print(f"Found cube destructs at frame ~ {break_frame}")
@@ -5,6 +5,7 @@
 #####################
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 def create_molecule(n=3, element='He'):
@@ -99,6 +100,49 @@ def numpy_LJ_force(coords, epsilon=1.0, sigma=1.0):
     # contract with coordinates dR to get gradient vectors
     return np.einsum('ijk,ij->ik', c_diff, f_lj_mat)
 
+def tiled_LJ_force(coords, epsilon=1.0, sigma=1.0, block_size=256, n_workers=1):
+    """ Compute the LJ force for the molecule in current geometry, in tiles of atom blocks.
+
+    Only block_size x block_size temporary arrays are created at a time, so the memory
+    usage does not grow as N x N. The row blocks are computed in n_workers threads.
+
+    Parameters
+    ----------
+    coords: Numpy.ndarray of shape (Natoms, 3)
+        Numpy array of atomic coordinates
+    epsilon: float
+        epsilon parameter in LJ force formula
+    sigma: float
+        sigma parameter in LJ force formula
+    block_size: int
+        Number of atoms in each block
+    n_workers: int
+        Number of threads computing the blocks
+
+    Returns
+    -------
+    force: Numpy.ndarray of shape (Natoms, 3)
+        Numpy array of gradients on each atom
+    """
+    noa = len(coords)
+    s6 = sigma**6
+    force = np.zeros((noa,3))
+    blocks = [(i0, min(i0+block_size, noa)) for i0 in range(0, noa, block_size)]
+    def compute_row_block(row_block):
+        i0, i1 = row_block
+        for j0, j1 in blocks:
+            c_diff = coords[i0:i1,np.newaxis,:] - coords[np.newaxis,j0:j1,:]
+            r2_tile = np.sum(np.square(c_diff), axis=-1)
+            if i0 == j0:
+                np.fill_diagonal(r2_tile, 1.0) # prevent 1/0 error in equation
+            r2_tilen4 = 1.0 / np.square(np.square(r2_tile))
+            r2_tilen7 = np.square(r2_tilen4) * r2_tile
+            f_lj_tile = (-12.0*r2_tilen7 * s6 + 6.0*r2_tilen4) * 4 * epsilon * s6
+            force[i0:i1] += np.einsum('ijk,ij->ik', c_diff, f_lj_tile)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(compute_row_block, blocks))
+    return force
+
 ELEM_MASS = {'He': 2}
 
 def verlet_intergrate(forcefunc, coords, elems, nsteps=10000, interval=100, dt=0.001, outfile='traj.xyz', verbose=True):
@@ -132,6 +176,8 @@ def verlet_intergrate(forcefunc, coords, elems, nsteps=10000, interval=100, dt=0
     traj = []
     prev_coords = coords.copy()
     masses = np.array([ELEM_MASS[e] for e in elems])
+    # the format of the frames is built once for the run
+    template = xyz_frame_template(elems)
     with open(outfile,'w') as outputfile:
         for i_step in range(nsteps):
             # compute force
@@ -146,16 +192,24 @@ def verlet_intergrate(forcefunc, coords, elems, nsteps=10000, interval=100, dt=0
                 # append the coords to traj list
                 traj.append(coords.copy())
                 # write the coordinate to file in xyz format
-                write_xyz_frame(coords, elems, i_frame, outputfile)
+                write_xyz_frame(coords, elems, i_frame, outputfile, template=template)
                 if verbose:
                     print(f'{i_step:6d} steps finished', end='\r', flush=True)
     return np.array(traj, dtype=float)
 
-def write_xyz_frame(coords, elems, frame_number, outputfile):
-    """ Write the current frame as xyz format into an opened file handle """
-    outputfile.write(f'{len(coords)}\nframe {frame_number}\n')
-    for c,e in zip(coords, elems):
-        outputfile.write(f'{e} {c[0]:10.7f} {c[1]:10.7f} {c[2]:10.7f}\n')
+def xyz_frame_template(elems):
+    """ Build the %-format template of one xyz frame, taking the frame number and the flattened coordinates """
+    # a literal % in the element names has to be escaped
+    return f'{len(elems)}\nframe %d\n' + ''.join(f"{e.replace('%', '%%')} %10.7f %10.7f %10.7f\n" for e in elems)
+
+def write_xyz_frame(coords, elems, frame_number, outputfile, template=None):
+    """ Write the current frame as xyz format into an opened file handle
+
+    The whole frame is formatted by one % operation on the template and written with a single call.
+    """
+    if template is None:
+        template = xyz_frame_template(elems)
+    outputfile.write(template % (frame_number, *coords.ravel().tolist()))
 
 def main():
     import argparse
@@ -163,7 +217,7 @@ def main():
     parser.add_argument('-a', '--atoms_each_edge', type=int, default=3, help="Number of atoms in each edge of cube.")
     parser.add_argument('-e', '--element', type=str, default='He', help="Element of all atoms.")
     parser.add_argument('-n', '--num_steps', type=int, default=10000, help="Number of intergration steps.")
-    parser.add_argument('-f', '--force_function', type=str, choices=['ref', 'numpy'], default='ref', help="Function to compute force")
+    parser.add_argument('-f', '--force_function', type=str, choices=['ref', 'numpy', 'tiled'], default='ref', help="Function to compute force")
     parser.add_argument('-o', '--outfile', type=str, default='traj.xyz', help='Name of output trajectory file')
     parser.add_argument('--analyze', action='store_true', help='Flag to enable analysis following simulation')
     args = parser.parse_args()
@@ -175,6 +229,7 @@ def main():
     ffdict = {
         'ref': ref_LJ_force,
         'numpy': numpy_LJ_force,
+        'tiled': tiled_LJ_force,
     }
     ffunc = ffdict[args.force_function]
 
@@ -1,3 +1,4 @@
+import shutil
 import numpy as np
 import md_run
 import md_analysis
@@ -38,12 +39,63 @@ def test_numpy_LJ_force():
             ref_force = md_run.ref_LJ_force(rand_coords, epsilon=1.0, sigma=0.9)
             assert np.allclose(numpy_force, ref_force)
 
+def test_tiled_LJ_force():
+    coords, elems = md_run.create_molecule(n=3)
+    for block_size, n_workers in [(4, 1), (5, 3), (100, 2)]:
+        rand_coords = coords + 0.3 * np.random.random(coords.shape)
+        tiled_force = md_run.tiled_LJ_force(rand_coords, epsilon=1.0, sigma=0.9, block_size=block_size, n_workers=n_workers)
+        numpy_force = md_run.numpy_LJ_force(rand_coords, epsilon=1.0, sigma=0.9)
+        assert np.allclose(tiled_force, numpy_force)
+
 def test_parse_xyz_frame():
     lines = ['3', '', 'H 0 0 0', 'H 0 0 1', 'H 1 2 3']
     ref_coords = np.array([[0,0,0], [0,0,1], [1,2,3]])
     coords = md_analysis.parse_xyz_frame(lines)
     assert np.allclose(coords, ref_coords)
 
+def test_load_xyz_traj(tmp_path, monkeypatch):
+    coords, elems = md_run.create_molecule(n=2)
+    traj = md_run.verlet_intergrate(md_run.numpy_LJ_force, coords, elems, nsteps=500, outfile=tmp_path / 'traj.xyz', verbose=False)
+    # chunks that split frames and lines in the middle
+    for chunk_size in [7, 100, 1 << 20]:
+        loaded_traj = md_analysis.load_xyz_traj(tmp_path / 'traj.xyz', chunk_size=chunk_size)
+        assert np.allclose(loaded_traj, traj, atol=1e-7)
+    loaded_traj = md_analysis.load_xyz_traj(tmp_path / 'traj.xyz', n_workers=2)
+    assert np.allclose(loaded_traj, traj, atol=1e-7)
+    # a full /dev/shm falls back to the default temporary folder
+    usage = shutil.disk_usage(tmp_path)._replace(free=0)
+    monkeypatch.setattr(shutil, 'disk_usage', lambda path: usage)
+    assert md_analysis.shared_memory_dir(1) is None
+    loaded_traj = md_analysis.load_xyz_traj(tmp_path / 'traj.xyz', n_workers=2)
+    assert np.allclose(loaded_traj, traj, atol=1e-7)
+
+def test_iter_xyz_frames(tmp_path):
+    coords, elems = md_run.create_molecule(n=2)
+    traj = md_run.verlet_intergrate(md_run.numpy_LJ_force, coords, elems, nsteps=2000, outfile=tmp_path / 'traj.xyz', verbose=False)
+    noa, offsets = md_analysis.index_xyz_traj(tmp_path / 'traj.xyz')
+    assert noa == 8
+    assert len(offsets) == len(traj) + 1
+    # the second call loads the sidecar index
+    assert np.array_equal(md_analysis.index_xyz_traj(tmp_path / 'traj.xyz')[1], offsets)
+    frames = list(md_analysis.iter_xyz_frames(tmp_path / 'traj.xyz', 5, 15, 2))
+    assert np.allclose(frames, traj[5:15:2], atol=1e-7)
+    loaded_traj = md_analysis.load_xyz_traj(tmp_path / 'traj.xyz', frames=slice(12, None))
+    assert np.allclose(loaded_traj, traj[12:], atol=1e-7)
+    assert md_analysis.load_xyz_traj(tmp_path / 'traj.xyz', frames=slice(5, 5)).shape == (0, 8, 3)
+    # the sidecar index is shared with mdsim.io.xyz_index: version, size, mtime, noa and the frame starts
+    index = np.load(f"{tmp_path / 'traj.xyz'}.idx")
+    assert index[0] == md_analysis.INDEX_VERSION
+    assert np.array_equal(index[3:], np.concatenate([[noa], offsets]))
+
+def test_write_xyz_frame(tmp_path):
+    coords, elems = md_run.create_molecule(n=2)
+    coords[0] = [-0.0, 1e-9, -1234.5]
+    with open(tmp_path / 'frame.xyz', 'w') as f:
+        md_run.write_xyz_frame(coords, elems, 7, f)
+    # the same as formatting each line with f-strings
+    text = f'{len(coords)}\nframe 7\n' + ''.join(f'{e} {c[0]:10.7f} {c[1]:10.7f} {c[2]:10.7f}\n' for c, e in zip(coords, elems))
+    assert (tmp_path / 'frame.xyz').read_text() == text
+
 def test_find_break_frame():
     traj = np.zeros((100, 10, 3))
     traj[25:] = 1
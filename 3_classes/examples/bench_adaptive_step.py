@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VelocityVerletIntegrator
+from mdsim.md_simulation import MDSimulation
+
+def simulate(integrator, duration=3.0, record_time=0.05):
+    """ Run the collapsing cube for a simulated time, return the simulation and the wall time """
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule, ff, integrator, interval=1, record_time=record_time, log_observables=True)
+    t0 = time.perf_counter()
+    simulation.run(duration)
+    return simulation, time.perf_counter() - t0
+
+# the cube is at rest, then collapses, so the atoms only move fast during a part of the run
+print(f"{'integrator':>24s} {'steps':>6s} {'frames':>7s} {'time (s)':>9s} {'max |dE|':>10s}")
+runs = [(f'fixed dt={t_step}', t_step, None) for t_step in [0.001, 0.002, 0.004]]
+runs += [(f'adaptive max={t_step_max} d={d}', t_step_max, d) for t_step_max, d in [(0.002, 0.003), (0.003, 0.005), (0.003, 0.008)]]
+for name, t_step, max_displacement in runs:
+    integrator = VelocityVerletIntegrator(t_step=t_step)
+    if max_displacement is not None:
+        integrator.set_adaptive(1e-5, t_step, max_displacement=max_displacement)
+    simulation, elapsed = simulate(integrator)
+    energy = np.array(simulation.observables['potential_energy']) + np.array(simulation.observables['kinetic_energy'])
+    print(f"{name:>24s} {simulation.current_step:6d} {len(simulation.trajectory):7d} {elapsed:9.2f} {np.abs(energy - energy[0]).max():10.2e}")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+import os
+import time
+import tempfile
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_simulation import MDSimulation
+from mdsim.checkpoint import save_checkpoint
+
+n_steps = 10000
+
+def time_checkpoint(save, n_repeat=20):
+    """ Return the mean wall time of save() in seconds """
+    t0 = time.perf_counter()
+    for _ in range(n_repeat):
+        save()
+    return (time.perf_counter() - t0) / n_repeat
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    checkpoint_file = os.path.join(tmpdir, 'run.chk')
+    print(f"{'atoms':>8s} {'step us':>10s} {'checkpoint ms':>14s} {'overhead':>9s}")
+    for n, kernel in [(3, 'dense'), (6, 'neighbor')]:
+        molecule = Molecule()
+        molecule.create_cube(n=n)
+        ff = LJForce(kernel=kernel, cutoff=2.5 if kernel == 'neighbor' else None)
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        simulation = MDSimulation(molecule, ff, VerletIntegrator(inplace=True), interval=100)
+        t0 = time.perf_counter()
+        simulation.step(n_steps)
+        t_step = (time.perf_counter() - t0) / n_steps
+        t_checkpoint = time_checkpoint(lambda: simulation.save_checkpoint(checkpoint_file))
+        # fraction of the run time spent in checkpoints at the default interval
+        overhead = t_checkpoint / (t_step * simulation.checkpoint_interval)
+        print(f"{molecule.noa:8d} {t_step * 1e6:10.1f} {t_checkpoint * 1e3:14.2f} {overhead:9.2%}")
+
+    # a long run with a frame every step: the checkpoint appends the new frames to its sidecar
+    # file, while a checkpoint of the whole state rewrites all frames every time
+    print(f"\n{'frames':>8s} {'checkpoint ms':>14s} {'full state ms':>14s}")
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule, ff, VerletIntegrator(inplace=True), interval=1,
+                              checkpoint_file=checkpoint_file)
+    for n_frames in [10000, 100000, 300000]:
+        simulation.step(n_frames - simulation.current_step)
+        t_checkpoint = time_checkpoint(lambda: simulation.save_checkpoint(checkpoint_file))
+        t_full = time_checkpoint(lambda: save_checkpoint(checkpoint_file + '.full', simulation.get_state()), n_repeat=3)
+        print(f"{len(simulation.trajectory):8d} {t_checkpoint * 1e3:14.2f} {t_full * 1e3:14.2f}")
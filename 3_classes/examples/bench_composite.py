@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce, SoftRepulsionForce, CompositePairForce
+
+def time_force(compute, coords, repeat=5):
+    """ Return the best wall time of compute(coords) in seconds """
+    compute(coords)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute(coords)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+def create_terms(kernel, cutoff):
+    lj = LJForce(kernel=kernel, cutoff=cutoff)
+    lj.set_params(sigma=0.9, epsilon=1.0)
+    soft = SoftRepulsionForce(kernel=kernel, cutoff=cutoff)
+    soft.set_params(sigma=1.0, epsilon=5.0)
+    return [lj, soft]
+
+# LJ plus a soft repulsion, as two forces each computing their pairs, and as one composite force
+print(f"{'atoms':>8s} {'kernel':>9s} {'LJ (ms)':>9s} {'separate (ms)':>14s} {'composite (ms)':>15s} {'added term':>11s}")
+for n in [6, 10, 16]:
+    molecule = Molecule()
+    molecule.create_cube(n=n, periodic=True)
+    coords = molecule.coords + 0.2 * np.random.random(molecule.coords.shape)
+    for kernel, cutoff in ([('half', None)] if n <= 10 else []) + [('neighbor', 2.5)]:
+        terms = create_terms(kernel, cutoff)
+        # the terms of the composite only give their pair formulas, so they have no neighbor list
+        composite = CompositePairForce(create_terms('half', cutoff), kernel=kernel)
+        if kernel == 'neighbor':
+            for ff in terms + [composite]:
+                ff.set_box(molecule.box)
+        t_lj = time_force(terms[0].compute_force, coords)
+        t_separate = time_force(lambda c: terms[0].compute_force(c) + terms[1].compute_force(c), coords)
+        t_composite = time_force(composite.compute_force, coords)
+        # cost of the soft repulsion on top of LJ alone
+        added = (t_composite - t_lj) / t_lj
+        print(f"{molecule.noa:8d} {kernel:>9s} {t_lj * 1e3:9.3f} {t_separate * 1e3:14.3f} {t_composite * 1e3:15.3f} {added:+11.0%}")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_simulation import MDSimulation
+from mdsim.md_ensemble import MDEnsembleSimulation
+
+n_replicas = 200
+n_steps = 200
+
+# create replicas of the 3x3x3 cube with random displacements
+molecules = []
+for _ in range(n_replicas):
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    molecule.set_coords(molecule.coords + 0.01 * np.random.random(molecule.coords.shape))
+    molecules.append(molecule)
+n_atom_steps = n_replicas * molecules[0].noa * n_steps
+
+# run each replica as a separate simulation
+t0 = time.perf_counter()
+for molecule in molecules:
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule, ff, VerletIntegrator(t_step=0.001), interval=100)
+    simulation.step(n_steps)
+t_serial = time.perf_counter() - t0
+
+# run all replicas together
+t0 = time.perf_counter()
+ff = LJForce(kernel='half')
+ff.set_params(sigma=0.9, epsilon=20.0)
+ensemble = MDEnsembleSimulation(molecules, ff, VerletIntegrator(t_step=0.001), interval=100)
+ensemble.step(n_steps)
+t_ensemble = time.perf_counter() - t0
+
+print(f"{n_replicas} replicas x {molecules[0].noa} atoms x {n_steps} steps")
+print(f"separate simulations: {t_serial / n_atom_steps * 1e9:10.1f} ns per atom-step")
+print(f"ensemble simulation:  {t_ensemble / n_atom_steps * 1e9:10.1f} ns per atom-step")
+print(f"speedup: {t_serial / t_ensemble:.1f}x")
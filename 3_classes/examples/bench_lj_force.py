@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.force import LJForce
+
+def time_force(compute, coords, repeat=3):
+    """ Return the best wall time of compute(coords) in seconds """
+    compute(coords)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute(coords)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+# compare the LJ force kernels on cubes of atoms with random displacements
+print(f"{'atoms':>8s} {'kernel':>8s} {'time (ms)':>12s} {'max err':>10s} {'+energy (ms)':>13s}")
+for n in [3, 6, 10, 14]:
+    cube = np.array([[x,y,z] for x in range(n) for y in range(n) for z in range(n)], dtype=float)
+    coords = cube + 0.2 * np.random.random(cube.shape)
+    ref_ff = LJForce()
+    ref_ff.set_params(sigma=0.9, epsilon=20.0)
+    ref_force = ref_ff.compute_force_dense(coords)
+    # the reference python loop is only timed on small systems
+    if len(coords) <= 300:
+        t0 = time.perf_counter()
+        ref_ff.compute_force_ref(coords)
+        print(f"{len(coords):8d} {'ref':>8s} {(time.perf_counter() - t0) * 1e3:12.3f} {0.0:10.2e}")
+    for kernel in ['dense', 'tiled', 'half']:
+        ff = LJForce(kernel=kernel)
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        elapsed = time_force(ff.compute_force, coords)
+        err = np.abs(ff.compute_force(coords) - ref_force).max()
+        # energy and virial computed together with the force
+        elapsed_energy = time_force(ff.compute_energy_force, coords)
+        print(f"{len(coords):8d} {kernel:>8s} {elapsed * 1e3:12.3f} {err:10.2e} {elapsed_energy * 1e3:13.3f}")
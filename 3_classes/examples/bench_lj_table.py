@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.force import LJForce, LJTableForce
+
+def time_force(compute, coords, repeat=5):
+    """ Return the best wall time of compute(coords) in seconds """
+    compute(coords)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute(coords)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+def random_cube(n, displacement=0.2):
+    cube = np.array([[x,y,z] for x in range(n) for y in range(n) for z in range(n)], dtype=float)
+    return cube + displacement * np.random.random(cube.shape)
+
+# accuracy against the reference loop, the table covers all pairs of the cube
+coords = random_cube(5)
+ref_ff = LJForce()
+ref_ff.set_params(sigma=0.9, epsilon=20.0)
+ref_force = ref_ff.compute_force_ref(coords)
+r_max = np.sqrt(3) * 5
+print(f"{len(coords)} atoms, table from 0.8 x sigma to {r_max:.2f}, error relative to the largest force")
+print(f"{'n_grid':>8s} {'linear':>10s} {'cubic':>10s}")
+for n_grid in [1000, 4000, 16000, 64000]:
+    errors = []
+    for interpolation in LJTableForce.INTERPOLATIONS:
+        ff = LJTableForce(kernel='half', n_grid=n_grid, interpolation=interpolation, r_max=r_max)
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        errors.append(np.abs(ff.compute_force(coords) - ref_force).max() / np.abs(ref_force).max())
+    print(f"{n_grid:8d} {errors[0]:10.2e} {errors[1]:10.2e}")
+
+# timing of the neighbor kernel, the table covers the pairs within the cutoff
+cutoff = 2.5
+print(f"{'atoms':>8s} {'pair term':>10s} {'time (ms)':>10s} {'max err':>10s}")
+for n in [10, 16]:
+    coords = random_cube(n)
+    ref_ff = LJForce(kernel='neighbor', cutoff=cutoff)
+    ref_ff.set_params(sigma=0.9, epsilon=20.0)
+    ref_force = ref_ff.compute_force(coords)
+    print(f"{len(coords):8d} {'formula':>10s} {time_force(ref_ff.compute_force, coords) * 1e3:10.3f} {0.0:10.2e}")
+    for interpolation in LJTableForce.INTERPOLATIONS:
+        ff = LJTableForce(kernel='neighbor', cutoff=cutoff, interpolation=interpolation)
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        err = np.abs(ff.compute_force(coords) - ref_force).max() / np.abs(ref_force).max()
+        print(f"{len(coords):8d} {interpolation:>10s} {time_force(ff.compute_force, coords) * 1e3:10.3f} {err:10.2e}")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+
+# lattice sizes, e.g. "python bench_pbc.py 10 22 46 100" for up to 10^6 atoms
+sizes = [int(n) for n in sys.argv[1:]] or [10, 22, 46]
+cutoff, skin = 2.5, 0.3
+print(f"simple cubic lattice in a periodic box, cutoff {cutoff}, skin {skin}")
+print(f"{'atoms':>9s} {'pairs':>10s} {'build (s)':>10s} {'force (s)':>10s} {'us/atom':>8s}")
+for n in sizes:
+    molecule = Molecule()
+    molecule.create_cube(n=n, periodic=True)
+    coords = molecule.coords + 0.1 * np.random.random(molecule.coords.shape)
+    ff = LJForce(kernel='neighbor', cutoff=cutoff, skin=skin)
+    ff.set_params(sigma=0.9, epsilon=1.0)
+    ff.set_box(molecule.box)
+    # the first call builds the periodic cell list
+    t0 = time.perf_counter()
+    ff.neighbor_list.build(coords)
+    t_build = time.perf_counter() - t0
+    # later calls reuse the list
+    t0 = time.perf_counter()
+    ff.compute_force(coords)
+    t_force = time.perf_counter() - t0
+    n_pairs = len(ff.neighbor_list.pairs[0])
+    print(f"{molecule.noa:9d} {n_pairs:10d} {t_build:10.3f} {t_force:10.3f} {(t_build + t_force) / molecule.noa * 1e6:8.2f}")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VelocityVerletIntegrator
+
+def time_force(compute, coords, repeat=3):
+    """ Return the best wall time of compute(coords) in seconds """
+    compute(coords)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute(coords)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+def energy_drift(precision, t_step, n=4, n_steps=20000, log_interval=100):
+    """ Run velocity Verlet on a cube of atoms, return the wall time and the max total energy change """
+    molecule = Molecule()
+    molecule.create_cube(n=n)
+    coords = 1.1 * molecule.coords + 0.05 * np.random.RandomState(0).random_sample(molecule.coords.shape)
+    ff = LJForce(kernel='half', precision=precision)
+    ff.set_params(sigma=1.0, epsilon=1.0)
+    # the energy is checked in double precision
+    ref = LJForce(kernel='half')
+    integrator = VelocityVerletIntegrator(t_step=t_step, inplace=True)
+    energies = []
+    t_run = 0.0
+    for i_step in range(n_steps):
+        if i_step % log_interval == 0:
+            energy = ref.compute_energy_force(coords)[0]
+        t0 = time.perf_counter()
+        integrator.integrate_coords_inplace(coords, ff.compute_force(coords), molecule.masses)
+        t_run += time.perf_counter() - t0
+        if i_step % log_interval == 0:
+            energies.append(energy + integrator.kinetic_energy)
+    return t_run, np.abs(np.array(energies) - energies[0]).max()
+
+# speed of the pair kernels on cubes of atoms with random displacements
+print(f"{'atoms':>8s} {'kernel':>8s} {'precision':>10s} {'time (ms)':>10s} {'speedup':>8s} {'max err':>10s}")
+for n in [6, 10, 14]:
+    cube = np.array([[x,y,z] for x in range(n) for y in range(n) for z in range(n)], dtype=float)
+    coords = cube + 0.2 * np.random.random(cube.shape)
+    for kernel in ['dense', 'tiled', 'half']:
+        ref_time = None
+        for precision in LJForce.PRECISIONS:
+            ff = LJForce(kernel=kernel, precision=precision)
+            ff.set_params(sigma=0.9, epsilon=20.0)
+            elapsed = time_force(ff.compute_force, coords)
+            if precision == 'double':
+                ref_time, ref_force = elapsed, ff.compute_force(coords)
+            # error relative to the largest force
+            err = np.abs(ff.compute_force(coords) - ref_force).max() / np.abs(ref_force).max()
+            print(f"{len(coords):8d} {kernel:>8s} {precision:>10s} {elapsed * 1e3:10.3f} {ref_time / elapsed:8.2f} {err:10.2e}")
+
+# energy conservation over a long run, the coordinates are integrated in float64 in all modes
+print(f"{'precision':>10s} {'dt':>8s} {'time (s)':>9s} {'max |dE|':>10s}")
+for t_step in [0.002, 0.0005]:
+    for precision in LJForce.PRECISIONS:
+        t_run, drift = energy_drift(precision, t_step)
+        print(f"{precision:>10s} {t_step:8.4f} {t_run:9.2f} {drift:10.2e}")
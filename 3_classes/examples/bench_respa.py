@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce, LJTailForce
+from mdsim.integrator import VelocityVerletIntegrator, RESPAIntegrator
+
+def run(fast, integrator, coords, masses, n_steps, full, log_interval=50):
+    """ Run the integrator loop, return the wall time and the total energies along the run """
+    energies = []
+    t_run = 0.0
+    for i_step in range(n_steps):
+        prev_coords = coords
+        t0 = time.perf_counter()
+        force = fast.compute_force(coords)
+        coords = integrator.integrate_coords(coords, force, masses)
+        t_run += time.perf_counter() - t0
+        if i_step % log_interval == 0:
+            # the kinetic energy is of the coordinates before this step, the check is not timed
+            energies.append(full.compute_energy_force(prev_coords)[0] + integrator.kinetic_energy)
+    return t_run, np.array(energies)
+
+# an LJ liquid-like droplet: a cube with spacing close to the LJ minimum
+molecule = Molecule()
+molecule.create_cube(n=8)
+coords0 = 1.1 * molecule.coords + 0.05 * np.random.random(molecule.coords.shape)
+masses = molecule.masses
+cutoff, n_steps = 2.5, 2000
+full = LJForce(kernel='half')
+short = LJForce(kernel='neighbor', cutoff=cutoff)
+tail = LJTailForce(cutoff=cutoff)
+for ff in [full, short, tail]:
+    ff.set_params(sigma=1.0, epsilon=1.0)
+
+print(f"{molecule.noa} atoms, {n_steps} steps, cutoff {cutoff}")
+print(f"{'integrator':>16s} {'time (s)':>9s} {'full evals':>11s} {'max |dE|':>10s}")
+for name, period in [('velocity Verlet', None), ('RESPA k=2', 2), ('RESPA k=4', 4), ('RESPA k=8', 8)]:
+    if period is None:
+        integrator, fast = VelocityVerletIntegrator(t_step=0.002), full
+    else:
+        integrator, fast = RESPAIntegrator(slow_forces=[(tail, period)], t_step=0.002), short
+    t_run, energies = run(fast, integrator, coords0.copy(), masses, n_steps, full)
+    # number of O(N^2) all-pair evaluations
+    n_full = n_steps if period is None else integrator.n_slow_evals[0]
+    print(f"{name:>16s} {t_run:9.2f} {n_full:11d} {np.abs(energies - energies[0]).max():10.2e}")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+
+def time_force(compute, coords, repeat=5):
+    """ Return the best wall time of compute(coords) in seconds """
+    compute(coords)
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute(coords)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+# the same cubes of atoms with one global parameter set, and as a random H/He mixture
+print(f"{'atoms':>8s} {'kernel':>9s} {'single (ms)':>12s} {'mixture (ms)':>13s} {'ratio':>6s}")
+for n in [6, 10, 16]:
+    molecule = Molecule()
+    molecule.create_cube(n=n)
+    molecule.set_elems(list(np.random.choice(['H', 'He'], size=molecule.noa)))
+    coords = molecule.coords + 0.2 * np.random.random(molecule.coords.shape)
+    kernels = [('dense', None), ('half', None), ('tiled', None), ('neighbor', 2.5)] if n <= 10 else [('neighbor', 2.5)]
+    for kernel, cutoff in kernels:
+        single = LJForce(kernel=kernel, cutoff=cutoff)
+        single.set_params(sigma=0.9, epsilon=20.0)
+        mixture = LJForce(kernel=kernel, cutoff=cutoff)
+        mixture.set_params(sigma={'H': 0.7, 'He': 0.9}, epsilon={'H': 5.0, 'He': 20.0})
+        mixture.set_types(molecule.elem_idx)
+        t_single = time_force(single.compute_force, coords)
+        t_mixture = time_force(mixture.compute_force, coords)
+        print(f"{molecule.noa:8d} {kernel:>9s} {t_single * 1e3:12.3f} {t_mixture * 1e3:13.3f} {t_mixture / t_single:6.2f}")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+import os
+import time
+import tempfile
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_simulation import MDSimulation
+from mdsim.md_trajectory import MDTrajectory
+
+# a real trajectory, consecutive frames are close to each other
+molecule = Molecule()
+molecule.create_cube(n=8)
+ff = LJForce(kernel='neighbor', cutoff=2.5)
+ff.set_params(sigma=0.9, epsilon=20.0)
+simulation = MDSimulation(molecule, ff, VerletIntegrator(), interval=10)
+simulation.step(2000)
+traj = simulation.trajectory
+raw_mb = traj.xyz.nbytes / 1e6
+
+def timed(func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    print(f"{len(traj)} frames x {traj.noa} atoms, {raw_mb:.1f} MB as float64")
+    print(f"{'format':>20s} {'size MB':>8s} {'vs xyz':>7s} {'encode MB/s':>12s} {'decode MB/s':>12s} {'max error':>10s}")
+    filename = os.path.join(tmpdir, 'traj.xyz')
+    _, t_save = timed(traj.save_xyz, filename)
+    xyz_mb = os.path.getsize(filename) / 1e6
+    loaded = MDTrajectory(traj.elems)
+    _, t_load = timed(loaded.load_xyz, filename)
+    error = np.abs(loaded.xyz - traj.xyz).max()
+    # throughput is given in MB of float64 coordinates per second
+    print(f"{'xyz':>20s} {xyz_mb:8.2f} {1.0:6.1f}x {raw_mb / t_save:12.1f} {raw_mb / t_load:12.1f} {error:10.1e}")
+    for codec in ['zlib', 'lzma']:
+        for precision in [1e-3, 1e-5]:
+            filename = os.path.join(tmpdir, f'traj_{codec}_{precision}.mdz')
+            _, t_save = timed(traj.save_compressed, filename, precision=precision, codec=codec)
+            size_mb = os.path.getsize(filename) / 1e6
+            loaded = MDTrajectory(traj.elems)
+            _, t_load = timed(loaded.load_compressed, filename)
+            error = np.abs(loaded.xyz - traj.xyz).max()
+            name = f'{codec} {precision:.0e}'
+            print(f"{name:>20s} {size_mb:8.2f} {xyz_mb / size_mb:6.1f}x {raw_mb / t_save:12.1f} {raw_mb / t_load:12.1f} {error:10.1e}")
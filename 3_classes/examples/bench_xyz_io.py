@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import os
+import time
+import tempfile
+import numpy as np
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.io import read_xyz_coords, read_xyz_parallel
+
+def load_xyz_per_line(filename):
+    """ The per-line parser, kept here as the baseline """
+    with open(filename) as f:
+        lines = f.readlines()
+    noa = int(lines[0])
+    lines_per_frame = noa + 2
+    xyz = []
+    for i_frame in range(len(lines) // lines_per_frame):
+        frame_lines = lines[i_frame*lines_per_frame:(i_frame+1)*lines_per_frame]
+        xyz.append(np.array([np.array(line.split()[1:], dtype=float) for line in frame_lines[2:]]))
+    return np.array(xyz)
+
+n_frames, noa = 200, 1000
+traj = MDTrajectory(['He'] * noa)
+traj.set_xyz(10 * np.random.random((n_frames, noa, 3)) - 5)
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    filename = os.path.join(tmpdir, 'traj.xyz')
+    t0 = time.perf_counter()
+    traj.save_xyz(filename)
+    t_write = time.perf_counter() - t0
+    size_mb = os.path.getsize(filename) / 1e6
+    print(f"{n_frames} frames x {noa} atoms, {size_mb:.1f} MB xyz")
+    print(f"{'write xyz':>20s}: {t_write:8.3f} s {size_mb / t_write:8.1f} MB/s")
+    timings = {}
+    n_cpus = os.cpu_count()
+    parallel_loads = [(f'parallel x{n}', lambda f, n=n: read_xyz_parallel(f, n_workers=n))
+                      for n in sorted({2, n_cpus}) if n > 1]
+    for name, load in [('per-line parser', load_xyz_per_line), ('bulk parser', read_xyz_coords)] + parallel_loads:
+        t0 = time.perf_counter()
+        xyz = load(filename)
+        timings[name] = time.perf_counter() - t0
+        assert np.allclose(xyz, traj.xyz, atol=1e-7)
+        print(f"{name:>20s}: {timings[name]:8.3f} s {size_mb / timings[name]:8.1f} MB/s")
+    print(f"bulk parser speedup: {timings['per-line parser'] / timings['bulk parser']:.1f}x")
+    for name, _ in parallel_loads:
+        print(f"{name} speedup over bulk parser: {timings['bulk parser'] / timings[name]:.1f}x")
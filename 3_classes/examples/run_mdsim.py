@@ -4,6 +4,7 @@ from mdsim.molecule import Molecule
 from mdsim.force import LJForce
 from mdsim.integrator import VerletIntegrator
 from mdsim.md_simulation import MDSimulation
+from mdsim.break_detector import BreakDetector
 
 # create initial molecule as a 3x3x3 cube
 molecule = Molecule()
@@ -19,12 +20,15 @@ integrator = VerletIntegrator(t_step=0.001)
 # create simulation
 simulation = MDSimulation(molecule, ff, integrator, interval=100, verbose=True)
 
-# run simulation
-simulation.step(10000)
+# run simulation until the cube destructs
+detector = BreakDetector(thresh=0.1)
+simulation.step(10000, stop_conditions=[detector])
 
 # save simulation trajectory
 simulation.trajectory.save_xyz('traj.xyz')
 
-# analyze simulation trajectory
-break_frame = simulation.trajectory.find_break_frame(thresh=0.1)
-print(f"Found cube destructs at frame ~ {break_frame}")
\ No newline at end of file
+# report the break found during the run
+if detector.broken:
+    print(f"Found cube destructs at step {detector.break_step}")
+else:
+    print(f"Cube did not destruct, max displacement {detector.max_move:.3f}")
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+The BreakDetector Class
+"""
+
+import numpy as np
+
+class BreakDetector:
+    """
+    BreakDetector finds the step where the structure changes from the initial one while
+    the simulation runs
+
+    The max abs displacement from the first coordinates is updated with each new set of
+    coordinates, with the same criterion as MDTrajectory.find_break_frame(). It can be
+    given to MDSimulation.step() as a stop condition to end the run at the break.
+    """
+    def __init__(self, thresh=0.1):
+        """
+        Parameters
+        ----------
+        thresh: float
+            The threshold for detecting the geometry change
+        """
+        self.thresh = thresh
+        self.reset()
+
+    def reset(self):
+        """ Forget the reference coordinates and the break """
+        self.reference = None
+        # max abs displacement from the reference seen so far
+        self.max_move = 0.0
+        self.n_updates = 0
+        # the update count and the simulation step where the threshold is crossed
+        self.break_index = None
+        self.break_step = None
+
+    @property
+    def broken(self):
+        return self.break_index is not None
+
+    def update(self, coords, step=None):
+        """ Compare new coordinates with the reference
+
+        The first coordinates given become the reference.
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Coordinates of the current step
+        step: int
+            The simulation step of the coordinates, recorded at the break
+
+        Returns
+        -------
+        broken: bool
+            True if the threshold has been crossed
+        """
+        if self.reference is None:
+            self.reference = np.array(coords, dtype=float)
+        elif not self.broken:
+            move = np.abs(coords - self.reference).max(initial=0.0)
+            self.max_move = max(self.max_move, move)
+            if move > self.thresh:
+                self.break_index = self.n_updates
+                self.break_step = step
+        self.n_updates += 1
+        return self.broken
+
+    def __call__(self, simulation):
+        """ Stop condition of MDSimulation.step() """
+        return self.update(simulation.molecule.coords, step=simulation.current_step)
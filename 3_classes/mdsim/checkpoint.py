@@ -0,0 +1,56 @@
+"""
+Checkpoint files of simulations
+
+A checkpoint is a nested dict of states, e.g. from MDSimulation.get_state(), stored
+as a numpy .npz archive with one binary array per value. Nested keys are joined by '.'
+and None values are left out. The file is written to a temporary file first and then
+renamed over the old checkpoint, so a crash while writing never leaves a broken file.
+"""
+
+import os
+import numpy as np
+
+def flatten_state(state, prefix=''):
+    """ Flatten a nested dict into {'a.b.c': value}, dropping None values """
+    flat = {}
+    for key, value in state.items():
+        if isinstance(value, dict):
+            flat.update(flatten_state(value, prefix=f'{prefix}{key}.'))
+        elif value is not None:
+            flat[prefix + key] = value
+    return flat
+
+def unflatten_state(flat):
+    """ Rebuild the nested dict from flatten_state(), 0-d arrays become python scalars """
+    state = {}
+    for key, value in flat.items():
+        *parents, name = key.split('.')
+        node = state
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[name] = value.item() if value.ndim == 0 else value
+    return state
+
+def save_checkpoint(filename, state):
+    """ Write a nested dict of states atomically into a checkpoint file
+
+    Parameters
+    ----------
+    filename: string
+        Name of the checkpoint file
+    state: dict
+        Nested dict of numbers, strings and numpy arrays
+    """
+    filename = os.fspath(filename)
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'wb') as f:
+        np.savez(f, **flatten_state(state))
+        f.flush()
+        # make sure the data is on disk before the rename
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+def load_checkpoint(filename):
+    """ Read the nested dict of states from a checkpoint file """
+    with np.load(filename, allow_pickle=False) as data:
+        return unflatten_state({key: data[key] for key in data.files})
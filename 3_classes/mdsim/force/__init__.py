@@ -1,2 +1,7 @@
 from mdsim.force.md_force import MDForce
-from mdsim.force.lj_force import LJForce
\ No newline at end of file
+from mdsim.force.lj_force import LJForce
+from mdsim.force.lj_tail_force import LJTailForce
+from mdsim.force.lj_table_force import LJTableForce
+from mdsim.force.soft_repulsion_force import SoftRepulsionForce
+from mdsim.force.composite_pair_force import CompositePairForce
+from mdsim.force.neighbor_list import NeighborList
\ No newline at end of file
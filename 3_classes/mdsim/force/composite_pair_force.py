@@ -0,0 +1,182 @@
+"""
+The CompositePairForce Class
+"""
+
+import numpy as np
+from mdsim.force.md_force import MDForce
+from mdsim.force.lj_force import LJForce
+from mdsim.force.neighbor_list import NeighborList, minimum_image
+
+class CompositePairForce(MDForce):
+    """
+    CompositePairForce sums several pairwise force terms over one shared list of atom pairs
+
+    The atom pairs, their displacements and squared distances are computed once per call and
+    handed to the pair formula of each term, e.g. LJForce and SoftRepulsionForce, so a term only
+    adds its own arithmetic. The gradient magnitudes of all terms are summed per pair, and
+    scattered onto the atoms once.
+
+    Only the pair formula, the parameters and the cutoff of each term are used, the pairs are
+    computed in float64 by the kernel of the composite. So the terms should not have a neighbor
+    kernel, whose neighbor list would never be used, nor a single or mixed precision. Terms that
+    select their pairs in their own kernel, e.g. LJTailForce which drops the pairs within its
+    cutoff in the dense kernel, are not supported.
+
+    Kernels
+    -------
+    half: all N x (N-1) / 2 unique pairs i < j (default)
+    neighbor: the pairs within the cutoff, by default the largest cutoff of the terms, from a
+        Verlet neighbor list, which supports a periodic box given by set_box()
+
+    A term with a cutoff only contributes for the pairs within its cutoff.
+    """
+    KERNELS = ('half', 'neighbor')
+
+    def __init__(self, terms, kernel='half', cutoff=None, skin=0.3):
+        """
+        Parameters
+        ----------
+        terms: list of LJForce
+            Pairwise force terms, LJForce or its subclasses, with any kernel but 'neighbor'
+        kernel: string
+            'half' or 'neighbor'
+        cutoff: float
+            Cutoff of the neighbor list, the largest cutoff of the terms by default
+        skin: float
+            Skin distance of the neighbor list
+        """
+        super().__init__()
+        assert len(terms) > 0, 'at least one term is required'
+        for term in terms:
+            assert isinstance(term, LJForce), 'terms should be pairwise forces'
+            assert type(term)._dense_pair_force is LJForce._dense_pair_force, \
+                f'{type(term).__name__} selects its pairs in its own kernel, which is not used by the composite'
+            assert term.kernel != 'neighbor', 'the pairs are computed by the composite, the terms should not have a neighbor kernel'
+            assert term.precision == 'double', 'the pairs are computed by the composite in double precision'
+        assert kernel in self.KERNELS, f'kernel should be one of {self.KERNELS}'
+        self.terms = list(terms)
+        self.kernel = kernel
+        self.neighbor_list = None
+        if kernel == 'neighbor':
+            if cutoff is None:
+                assert all(term.cutoff is not None for term in terms), 'cutoff is required for the neighbor kernel'
+                cutoff = max(term.cutoff for term in terms)
+            self.neighbor_list = NeighborList(cutoff, skin=skin)
+        self.cutoff = cutoff
+        # cached upper triangle pair indices for the half kernel
+        self._triu_pairs = None
+
+    def set_types(self, types):
+        """ Set the element type index of each atom for all terms """
+        super().set_types(types)
+        for term in self.terms:
+            term.set_types(types)
+
+    def set_box(self, box):
+        """ Set the lengths of the periodic box, or None """
+        assert box is None or self.kernel == 'neighbor', 'only the neighbor kernel supports a periodic box'
+        super().set_box(box)
+        if self.neighbor_list is not None:
+            self.neighbor_list.set_box(box)
+
+    def get_state(self):
+        """ Return the state of each term, and the neighbor list """
+        state = super().get_state()
+        state['terms'] = {str(k): term.get_state() for k, term in enumerate(self.terms)}
+        if self.neighbor_list is not None:
+            state['neighbor_list'] = self.neighbor_list.get_state()
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        super().set_state(state)
+        for k, term in enumerate(self.terms):
+            term.set_state(state['terms'][str(k)])
+        if self.neighbor_list is not None and 'neighbor_list' in state:
+            self.neighbor_list.set_state(state['neighbor_list'])
+
+    def pairs(self, coords):
+        """
+        The shared atom pairs with their displacements and squared distances
+
+        Returns
+        -------
+        pair_i, pair_j: numpy.ndarray of shape (Npairs,)
+            Indices of the atoms in each pair
+        c_diff: numpy.ndarray of shape (Npairs, 3)
+            Displacements of the pairs, of the nearest images in a periodic box
+        r2: numpy.ndarray of shape (Npairs,)
+            Squared distances of the pairs
+        """
+        if self.kernel == 'neighbor':
+            self.neighbor_list.update(coords)
+            pair_i, pair_j = self.neighbor_list.pairs
+        else:
+            noa = len(coords)
+            if self._triu_pairs is None or len(self._triu_pairs[0]) != noa * (noa - 1) // 2:
+                self._triu_pairs = np.triu_indices(noa, k=1)
+            pair_i, pair_j = self._triu_pairs
+        c_diff = minimum_image(coords[pair_i] - coords[pair_j], self.box)
+        r2 = np.einsum('ij,ij->i', c_diff, c_diff)
+        return pair_i, pair_j, c_diff, r2
+
+    def compute_force(self, coords, out=None):
+        """
+        Compute the sum of the force vectors of all terms
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+        out: numpy.ndarray of shape (Natoms, 3)
+            Buffer the force is written into and returned, e.g. reused in every step
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        coords = np.asarray(coords, dtype=float)
+        pair_i, pair_j, c_diff, r2 = self.pairs(coords)
+        f_pair = np.zeros_like(r2)
+        for term in self.terms:
+            f_term = term.pair_force(r2, term.pair_types(pair_i, pair_j))
+            if term.cutoff is not None:
+                f_term[r2 >= term.cutoff**2] = 0.0
+            f_pair += f_term
+        return LJForce.scatter_pair_force(len(coords), pair_i, pair_j, f_pair[:,np.newaxis] * c_diff, out=out)
+
+    def compute_energy_force(self, coords):
+        """
+        Compute the sum of the energies, force vectors and virials of all terms in one pass
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+
+        Returns
+        -------
+        energy: float
+            Potential energy
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        virial: numpy.ndarray of shape (3, 3)
+            Virial tensor sum_{i<j} rij (x) Fij, where Fij = -gradient is the force of j on i
+        """
+        coords = np.asarray(coords, dtype=float)
+        pair_i, pair_j, c_diff, r2 = self.pairs(coords)
+        energy = 0.0
+        f_pair = np.zeros_like(r2)
+        for term in self.terms:
+            e_term, f_term = term.pair_energy_force(r2, term.pair_types(pair_i, pair_j))
+            if term.cutoff is not None:
+                outside = r2 >= term.cutoff**2
+                e_term[outside] = 0.0
+                f_term[outside] = 0.0
+            energy += e_term.sum()
+            f_pair += f_term
+        pair_grad = f_pair[:,np.newaxis] * c_diff
+        force = LJForce.scatter_pair_force(len(coords), pair_i, pair_j, pair_grad)
+        virial = -pair_grad.T @ c_diff
+        return energy, force, virial
@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from mdsim.force.md_force import MDForce
+from mdsim.force.neighbor_list import NeighborList, minimum_image
+from mdsim.molecule import Molecule
 
 class LJForce(MDForce):
     """
@@ -9,13 +12,194 @@ class LJForce(MDForce):
     ---------
     The LJ force takes the formula:
         Fij = (-12 x sigma^12 / rij^13 + 6 x sigma^6 / rij^7) * 4 * epsilon * [rij]/rij
+
+    Kernels
+    -------
+    dense: all N x N pairs are computed with numpy broadcasting (default)
+    neighbor: only pairs within the cutoff are computed, using a Verlet neighbor list
+        with a skin distance. The list is kept between calls and only rebuilt when
+        some atom has moved more than half of the skin.
+    tiled: all pairs are computed in tiles of block_size x block_size atoms, so the peak
+        memory is O(block_size^2) instead of O(N^2). The tiles are distributed to n_workers
+        threads, which run in parallel since numpy releases the GIL. The thread pool is kept
+        between calls and follows changes of n_workers, close() or a with block shuts it down.
+    half: only the N x (N-1) / 2 unique pairs i < j are computed, and the gradient of each
+        pair is added to atom i and subtracted from atom j (Newton's third law).
+
+    With a periodic box set by set_box(), the neighbor kernel computes the pairs within
+    the cutoff by their nearest images, and the neighbor list is built on a periodic cell grid.
+    The cutoff plus skin should be at most half of the box. The other kernels do not support a box.
+
+    Species
+    -------
+    sigma and epsilon can be dicts with the parameters of each element, e.g.
+    set_params(sigma={'H': 0.6, 'He': 0.9}, epsilon={'H': 0.5, 'He': 1.0}). The parameters of
+    each pair of elements are mixed by the Lorentz-Berthelot rules into tables over the pairs
+    of element types, and the kernels gather them by the type of each atom given by set_types(),
+    e.g. molecule.elem_idx. The type pairs of the neighbor list and of the half kernel, and
+    the coefficients gathered for them, are cached until the pairs change.
+
+    compute_energy_force() returns the potential energy and the virial together with the
+    force, computed from the same pair distances by the same kernel. The gradients are
+    the same as compute_force() bit for bit. With a cutoff, the potential is truncated
+    without shifting.
+
+    Precision
+    ---------
+    double: all pair terms and sums are computed in float64 (default)
+    single: the pair displacements, distances and gradients are computed in float32, which
+        halves the memory traffic of the pair arrays, and the results are float32.
+    mixed: the pair terms are computed in float32 as in single, but the forces are accumulated
+        over tiles and returned in float64, and the energy and virial are summed in float64.
+    The half and neighbor kernels sum the pairs onto atoms with np.bincount, which always
+    works in float64. The integrators keep the coordinates in float64 in all modes.
     """
-    def __init__(self):
+    KERNELS = ('dense', 'neighbor', 'tiled', 'half')
+    PRECISIONS = ('double', 'single', 'mixed')
+    # largest (Natoms, Npairs) incidence matrix of the batched half kernel, 128 MB in float64
+    MAX_INCIDENCE_SIZE = 2**24
+
+    def __init__(self, kernel='dense', cutoff=None, skin=0.3, block_size=256, n_workers=1, precision='double'):
         super().__init__()
         # set default sigma and epsilon parameter
         self._params = {'sigma': 1.0, 'epsilon': 1.0}
+        assert kernel in self.KERNELS, f'kernel should be one of {self.KERNELS}'
+        self.kernel = kernel
+        self.cutoff = cutoff
+        self.neighbor_list = None
+        if kernel == 'neighbor':
+            assert cutoff is not None, 'cutoff is required for the neighbor kernel'
+            self.neighbor_list = NeighborList(cutoff, skin=skin)
+        assert block_size > 0, 'block_size should be positive'
+        assert n_workers > 0, 'n_workers should be positive'
+        self.block_size = block_size
+        self.n_workers = n_workers
+        assert precision in self.PRECISIONS, f'precision should be one of {self.PRECISIONS}'
+        self.precision = precision
+        # dtype of the pair terms and of the sums over pairs
+        self.dtype = np.float64 if precision == 'double' else np.float32
+        self.sum_dtype = np.float32 if precision == 'single' else np.float64
+        # the thread pool of the tiled kernel and its number of workers
+        self._executor = None
+        self._executor_workers = None
+        # cached upper triangle pair indices for the half kernel
+        self._triu_pairs = None
+        self._incidence = None
+        # tables of the mixed per-element parameters, and the cached type pairs of a list of atom pairs
+        self._mixing = None
+        self._pair_types = None
+
+    def set_params(self, **kwargs):
+        """ Set sigma and epsilon, as numbers, arrays of one value per replica or dicts of one value per element """
+        super().set_params(**kwargs)
+        self._build_mixing_tables()
+
+    def set_types(self, types):
+        """ Set the element type index of each atom, e.g. molecule.elem_idx """
+        super().set_types(types)
+        self._check_types()
+
+    def _build_mixing_tables(self):
+        """ Mix the per-element parameters into flattened (Ntypes x Ntypes) tables of pair coefficients """
+        self._pair_types = None
+        sigma, epsilon = self._params['sigma'], self._params['epsilon']
+        assert isinstance(sigma, dict) == isinstance(epsilon, dict), 'sigma and epsilon should both be per element or not'
+        if not isinstance(sigma, dict):
+            self._mixing = None
+            return
+        assert set(sigma) == set(epsilon), 'sigma and epsilon should be given for the same elements'
+        assert all(e in Molecule.ELEM_MASS for e in sigma), 'Element not recognized'
+        # elements without parameters are NaN
+        sigma = np.array([sigma.get(e, np.nan) for e in Molecule.ELEM_MASS], dtype=float)
+        epsilon = np.array([epsilon.get(e, np.nan) for e in Molecule.ELEM_MASS], dtype=float)
+        # Lorentz-Berthelot mixing rules
+        sigma = 0.5 * (sigma[:,np.newaxis] + sigma[np.newaxis,:])
+        epsilon = np.sqrt(epsilon[:,np.newaxis] * epsilon[np.newaxis,:])
+        s6 = sigma**6
+        tables = {
+            'sigma': sigma,
+            's6': s6,
+            'epsilon': epsilon,
+            # f_lj = (f12 / r^6 + f6) / r^8 and e_lj = (e12 / r^6 - e6) / r^6
+            'f12': -48.0 * epsilon * s6 * s6,
+            'f6': 24.0 * epsilon * s6,
+            'e12': 4.0 * epsilon * s6 * s6,
+            'e6': 4.0 * epsilon * s6,
+        }
+        self._mixing = {name: np.ascontiguousarray(table, dtype=self.dtype).ravel() for name, table in tables.items()}
+        self._check_types()
 
-    def compute_force(self, coords):
+    def _check_types(self):
+        """ Check that all atom types have per-element parameters """
+        if self._mixing is not None and self.types is not None:
+            n_types = len(Molecule.ELEM_MASS)
+            type_s6 = self._mixing['s6'][np.unique(self.types) * (n_types + 1)]
+            assert np.all(np.isfinite(type_s6)), 'sigma and epsilon are not given for all elements of the atoms'
+
+    def pair_types(self, pair_i, pair_j):
+        """
+        Index of the type pair of each atom pair in the mixing tables
+
+        The result is cached as long as the same pair_i and pair_j arrays are passed, e.g. the
+        pairs of the neighbor list between rebuilds.
+
+        Parameters
+        ----------
+        pair_i, pair_j: numpy.ndarray
+            Indices of the atoms in each pair, broadcast together
+
+        Returns
+        -------
+        pair_types: numpy.ndarray or None
+            Index into the flattened tables, or None if sigma and epsilon are not per element
+        """
+        if self._mixing is None:
+            return None
+        assert self.types is not None, 'set_types() is required for per-element parameters'
+        cache = self._pair_types
+        if cache is None or cache[0] is not pair_i or cache[1] is not pair_j or cache[2] is not self.types:
+            pair_types = self.types[pair_i] * len(Molecule.ELEM_MASS) + self.types[pair_j]
+            # the coefficients gathered for these pairs are kept with them
+            self._pair_types = cache = (pair_i, pair_j, self.types, pair_types, {})
+        return cache[3]
+
+    def _lj_params(self, pair_types, n_pair_axes):
+        """ sigma^6 and epsilon of the pairs, gathered by pair_types or broadcast over the last n_pair_axes axes """
+        if pair_types is not None:
+            return np.take(self._mixing['s6'], pair_types), np.take(self._mixing['epsilon'], pair_types)
+        pair_axes = (Ellipsis,) + (np.newaxis,) * n_pair_axes
+        sigma = np.asarray(self._params['sigma'], dtype=self.dtype)[pair_axes]
+        epsilon = np.asarray(self._params['epsilon'], dtype=self.dtype)[pair_axes]
+        return sigma**6, epsilon
+
+    def _dense_pair_types(self, noa):
+        """ Type pairs of all (Natoms, Natoms) atom pairs, or None """
+        if self._mixing is None:
+            return None
+        atoms = np.arange(noa)
+        return self.pair_types(atoms[:,np.newaxis], atoms[np.newaxis,:])
+
+    def set_box(self, box):
+        """ Set the lengths of the periodic box, or None """
+        assert box is None or self.kernel == 'neighbor', 'only the neighbor kernel supports a periodic box'
+        super().set_box(box)
+        if self.neighbor_list is not None:
+            self.neighbor_list.set_box(box)
+
+    def get_state(self):
+        """ Return the parameters and the neighbor list, which decides the summation order """
+        state = super().get_state()
+        if self.neighbor_list is not None:
+            state['neighbor_list'] = self.neighbor_list.get_state()
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        super().set_state(state)
+        if self.neighbor_list is not None and 'neighbor_list' in state:
+            self.neighbor_list.set_state(state['neighbor_list'])
+
+    def compute_force(self, coords, out=None):
         """
         Compute the Lennard-Jones force vector on current geometry
 
@@ -23,27 +207,478 @@ class LJForce(MDForce):
         ----------
         coords: numpy.ndarray of shape (Natoms, 3)
             Numpy array of atomic coordinates
+        out: numpy.ndarray of shape (Natoms, 3)
+            Buffer the force is written into and returned, e.g. reused in every step
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        assert self.kernel in ('dense', 'half') or np.ndim(coords) == 2, \
+            'only the dense and half kernels support a batch of replicas'
+        if self.kernel == 'neighbor':
+            return self.compute_force_neighbor(coords, out=out)
+        if self.kernel == 'tiled':
+            return self.compute_force_tiled(coords, out=out)
+        if self.kernel == 'half':
+            return self.compute_force_half(coords, out=out)
+        return self.compute_force_dense(coords, out=out)
+
+    def compute_energy_force(self, coords):
+        """
+        Compute the Lennard-Jones energy, force and virial on current geometry in one pass
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates, a batch of replicas is supported by the dense kernel
 
         Returns
         -------
+        energy: float
+            Potential energy
         force: numpy.ndarray of shape (Natoms, 3)
             Numpy array of gradients on each atom
+        virial: numpy.ndarray of shape (3, 3)
+            Virial tensor sum_{i<j} rij (x) Fij, where Fij = -gradient is the force of j on i
+        """
+        assert self.kernel == 'dense' or np.ndim(coords) == 2, \
+            'only the dense kernel supports a batch of replicas'
+        coords = np.asarray(coords, dtype=float)
+        if self.kernel == 'neighbor':
+            self.neighbor_list.update(coords)
+            pair_i, pair_j = self.neighbor_list.pairs
+            return self.compute_energy_force_pairs(coords, pair_i, pair_j, cutoff=self.cutoff)
+        if self.kernel == 'tiled':
+            return self.compute_energy_force_tiled(coords)
+        if self.kernel == 'half':
+            return self.compute_energy_force_pairs(coords, *self.triu_pairs(len(coords)))
+        return self.compute_energy_force_dense(coords)
+
+    def compute_force_dense(self, coords, out=None):
+        """
+        Compute the Lennard-Jones force vector of all atom pairs with numpy broadcasting
+
+        A batch of replicas can be computed at once by stacking their coordinates, in which
+        case sigma and epsilon can also be arrays with one value per replica.
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Numpy array of atomic coordinates
+        out: numpy.ndarray in the same shape of coords
+            Buffer the force is written into and returned
+
+        Returns
+        -------
+        force: numpy.ndarray in the same shape of coords
+            Numpy array of gradients on each atom
         """
-        sigma = self._params['sigma']
-        epsilon = self._params['epsilon']
+        c_diff, r2_mat, f_lj_mat = self._dense_pair_force(coords)
+        # contract with coordinates dR to get gradient vectors
+        return self.sum_pair_force(c_diff, f_lj_mat, out=out)
+
+    def compute_energy_force_dense(self, coords):
+        """
+        Compute the Lennard-Jones energy, force and virial of all atom pairs with numpy broadcasting
+
+        Returns
+        -------
+        energy, force, virial: float, numpy.ndarray, numpy.ndarray
+            As in compute_energy_force(), with a leading replica axis for a batch of replicas
+        """
+        c_diff, r2_mat, f_lj_mat = self._dense_pair_force(coords)
+        force = self.sum_pair_force(c_diff, f_lj_mat)
+        s6, epsilon = self._lj_params(self._dense_pair_types(coords.shape[-2]), 2)
+        diag = np.arange(coords.shape[-2])
+        r2_mat[...,diag,diag] = 1.0 # prevent 1/0 error in equation
+        s6r6_mat = s6 / (r2_mat * r2_mat * r2_mat)
+        e_lj_mat = 4.0 * epsilon * s6r6_mat * (s6r6_mat - 1.0)
+        e_lj_mat[...,diag,diag] = 0.0
+        # each pair is counted twice in the full matrices
+        energy = 0.5 * e_lj_mat.sum(axis=(-2, -1), dtype=self.sum_dtype)
+        # sum of the outer products as one matrix product over all pairs
+        pair_grad = (c_diff * f_lj_mat[...,np.newaxis]).reshape(*c_diff.shape[:-3], -1, 3)
+        virial = -0.5 * np.matmul(np.swapaxes(pair_grad, -1, -2), c_diff.reshape(pair_grad.shape), dtype=self.sum_dtype)
+        return energy, force, virial
+
+    def _dense_pair_force(self, coords):
+        """ Pair displacements, squared distances and gradient magnitudes of all atom pairs """
+        coords = np.asarray(coords, dtype=self.dtype)
+        # per-replica parameters broadcast over the (Natoms, Natoms) pair matrix
+        s6, epsilon = self._lj_params(self._dense_pair_types(coords.shape[-2]), 2)
         # compute the distance between each atom pairs
-        c_diff = coords[:,np.newaxis,:] - coords[np.newaxis,:,:]
+        c_diff = coords[...,:,np.newaxis,:] - coords[...,np.newaxis,:,:]
         r2_mat = np.sum(np.square(c_diff), axis=-1)
         # prepare values for the LJ force formula
-        s6 = sigma**6
         r2_mat2 = np.square(r2_mat)
-        np.fill_diagonal(r2_mat2, 1.0) # prevent 1/0 error in equation
+        diag = np.arange(coords.shape[-2])
+        r2_mat2[...,diag,diag] = 1.0 # prevent 1/0 error in equation
         r2_matn4 = 1.0 / np.square(r2_mat2)
         r2_matn7 = np.square(r2_matn4) * r2_mat
         # compute the magnitude of the gradients
         f_lj_mat = (-12.0*r2_matn7 * s6 + 6.0*r2_matn4) * 4 * epsilon * s6
-        # contract with coordinates dR to get gradient vectors
-        return np.einsum('ijk,ij->ik', c_diff, f_lj_mat)
+        return c_diff, r2_mat, f_lj_mat
+
+    def sum_pair_force(self, c_diff, f_lj_mat, out=None):
+        """
+        Sum the gradient vectors of a (..., Ni, Nj) block of atom pairs over the atoms j
+
+        Parameters
+        ----------
+        c_diff: numpy.ndarray of shape (..., Ni, Nj, 3)
+            Displacements of the atom pairs
+        f_lj_mat: numpy.ndarray of shape (..., Ni, Nj)
+            Gradient magnitudes divided by rij
+        out: numpy.ndarray of shape (..., Ni, 3)
+            Buffer the gradients are written into and returned
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (..., Ni, 3)
+            Gradients on the atoms i, in sum_dtype or in the dtype of out
+        """
+        if out is not None:
+            return np.einsum('...ijk,...ij->...ik', c_diff, f_lj_mat, out=out)
+        # a row of pairs is summed in dtype, converting the pair arrays to float64 costs more than the pair terms
+        return np.einsum('...ijk,...ij->...ik', c_diff, f_lj_mat).astype(self.sum_dtype, copy=False)
+
+    def compute_force_neighbor(self, coords, out=None):
+        """
+        Compute the Lennard-Jones force vector of atom pairs within the cutoff
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+        out: numpy.ndarray of shape (Natoms, 3)
+            Buffer the force is written into and returned, e.g. reused in every step
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        coords = np.asarray(coords, dtype=float)
+        # the list is reused until some atom moves more than half of the skin
+        self.neighbor_list.update(coords)
+        pair_i, pair_j = self.neighbor_list.pairs
+        # the list is built from the float64 coordinates, the pairs are computed in dtype
+        pair_coords = coords.astype(self.dtype, copy=False)
+        c_diff = minimum_image(pair_coords[pair_i] - pair_coords[pair_j], self.box)
+        r2 = np.einsum('ij,ij->i', c_diff, c_diff)
+        f_lj = self.pair_force(r2, self.pair_types(pair_i, pair_j))
+        # pairs in the skin are outside of the cutoff
+        f_lj[r2 >= self.cutoff**2] = 0.0
+        return self.scatter_pair_force(len(coords), pair_i, pair_j, f_lj[:,np.newaxis] * c_diff, out=out)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def executor(self):
+        """ The thread pool of the tiled kernel, created again if n_workers has changed """
+        if self._executor is None or self._executor_workers != self.n_workers:
+            self.close()
+            self._executor = ThreadPoolExecutor(max_workers=self.n_workers)
+            self._executor_workers = self.n_workers
+        return self._executor
+
+    def close(self):
+        """ Shut down the thread pool of the tiled kernel, it is created again when needed """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_workers = None
+
+    def compute_force_tiled(self, coords, out=None):
+        """
+        Compute the Lennard-Jones force vector of all atom pairs in tiles of atom blocks
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+        out: numpy.ndarray of shape (Natoms, 3)
+            Buffer the force is written into and returned, e.g. reused in every step
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        coords = np.asarray(coords, dtype=self.dtype)
+        noa = len(coords)
+        if out is None:
+            force = np.zeros((noa, 3), dtype=self.sum_dtype)
+        else:
+            force = out
+            force.fill(0.0)
+        blocks = [(i0, min(i0 + self.block_size, noa)) for i0 in range(0, noa, self.block_size)]
+        def compute_row_block(row_block):
+            # each task only writes to its own rows of force, so no lock is needed
+            i0, i1 = row_block
+            for j0, j1 in blocks:
+                c_diff = coords[i0:i1,np.newaxis,:] - coords[np.newaxis,j0:j1,:]
+                r2_tile = np.einsum('ijk,ijk->ij', c_diff, c_diff)
+                if i0 == j0:
+                    np.fill_diagonal(r2_tile, 1.0) # prevent 1/0 error, c_diff is zero there
+                tile_types = self._tile_types(i0, i1, j0, j1)
+                force[i0:i1] += self.sum_pair_force(c_diff, self.pair_force(r2_tile, tile_types))
+        if self.n_workers > 1 and len(blocks) > 1:
+            list(self.executor().map(compute_row_block, blocks))
+        else:
+            for row_block in blocks:
+                compute_row_block(row_block)
+        return force
+
+    def compute_energy_force_tiled(self, coords):
+        """
+        Compute the Lennard-Jones energy, force and virial of all atom pairs in tiles of atom blocks
+
+        Returns
+        -------
+        energy, force, virial: float, numpy.ndarray, numpy.ndarray
+            As in compute_energy_force()
+        """
+        coords = np.asarray(coords, dtype=self.dtype)
+        noa = len(coords)
+        force = np.zeros((noa, 3), dtype=self.sum_dtype)
+        blocks = [(i0, min(i0 + self.block_size, noa)) for i0 in range(0, noa, self.block_size)]
+        def compute_row_block(row_block):
+            # each task only writes to its own rows of force, and returns its energy and virial
+            i0, i1 = row_block
+            energy = 0.0
+            virial = np.zeros((3, 3), dtype=self.sum_dtype)
+            for j0, j1 in blocks:
+                c_diff = coords[i0:i1,np.newaxis,:] - coords[np.newaxis,j0:j1,:]
+                r2_tile = np.einsum('ijk,ijk->ij', c_diff, c_diff)
+                if i0 == j0:
+                    np.fill_diagonal(r2_tile, 1.0) # prevent 1/0 error, c_diff is zero there
+                e_lj, f_lj = self.pair_energy_force(r2_tile, self._tile_types(i0, i1, j0, j1))
+                if i0 == j0:
+                    np.fill_diagonal(e_lj, 0.0)
+                force[i0:i1] += self.sum_pair_force(c_diff, f_lj)
+                energy += e_lj.sum(dtype=self.sum_dtype)
+                pair_grad = (c_diff * f_lj[...,np.newaxis]).reshape(-1, 3)
+                virial -= np.matmul(pair_grad.T, c_diff.reshape(-1, 3), dtype=self.sum_dtype)
+            return energy, virial
+        if self.n_workers > 1 and len(blocks) > 1:
+            results = list(self.executor().map(compute_row_block, blocks))
+        else:
+            results = [compute_row_block(row_block) for row_block in blocks]
+        # each pair is counted twice over all tiles
+        energy = 0.5 * sum(e for e, _ in results)
+        virial = 0.5 * sum(v for _, v in results)
+        return energy, force, virial
+
+    def _tile_types(self, i0, i1, j0, j1):
+        """ Type pairs of the atoms i0:i1 with the atoms j0:j1, or None """
+        if self._mixing is None:
+            return None
+        assert self.types is not None, 'set_types() is required for per-element parameters'
+        return self.types[i0:i1,np.newaxis] * len(Molecule.ELEM_MASS) + self.types[np.newaxis,j0:j1]
+
+    def compute_energy_force_pairs(self, coords, pair_i, pair_j, cutoff=None):
+        """
+        Compute the Lennard-Jones energy, force and virial of a list of atom pairs
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+        pair_i, pair_j: numpy.ndarray of shape (Npairs,)
+            Indices of the atoms in each pair, each pair is counted once
+        cutoff: float
+            Pairs at or beyond the cutoff are skipped
+
+        Returns
+        -------
+        energy, force, virial: float, numpy.ndarray, numpy.ndarray
+            As in compute_energy_force()
+        """
+        coords = np.asarray(coords, dtype=self.dtype)
+        c_diff = minimum_image(coords[pair_i] - coords[pair_j], self.box)
+        r2 = np.einsum('ij,ij->i', c_diff, c_diff)
+        e_lj, f_lj = self.pair_energy_force(r2, self.pair_types(pair_i, pair_j))
+        if cutoff is not None:
+            outside = r2 >= cutoff**2
+            e_lj[outside] = 0.0
+            f_lj[outside] = 0.0
+        pair_grad = f_lj[:,np.newaxis] * c_diff
+        force = self.scatter_pair_force(len(coords), pair_i, pair_j, pair_grad)
+        virial = -np.matmul(pair_grad.T, c_diff, dtype=self.sum_dtype)
+        return e_lj.sum(dtype=self.sum_dtype), force, virial
+
+    def triu_pairs(self, noa):
+        """ The indices of the unique atom pairs i < j, cached for the number of atoms """
+        if self._triu_pairs is None or len(self._triu_pairs[0]) != noa * (noa - 1) // 2:
+            self._triu_pairs = np.triu_indices(noa, k=1)
+            self._incidence = None
+        return self._triu_pairs
+
+    def compute_force_half(self, coords, out=None):
+        """
+        Compute the Lennard-Jones force vector of each unique atom pair once
+
+        A batch of replicas can be computed at once by stacking their coordinates. The pairs
+        of a batch are then gathered and scattered by matrix products with the (Natoms, Npairs)
+        pair incidence matrix, which is fast for the small systems run in batches. The matrix
+        grows as Natoms^3, so above MAX_INCIDENCE_SIZE elements the pairs are gathered by index
+        and each replica is scattered by np.bincount instead.
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Numpy array of atomic coordinates
+        out: numpy.ndarray in the same shape of coords
+            Buffer the force is written into and returned
+
+        Returns
+        -------
+        force: numpy.ndarray in the same shape of coords
+            Numpy array of gradients on each atom
+        """
+        coords = np.asarray(coords, dtype=self.dtype)
+        noa = coords.shape[-2]
+        # the pair indices only depend on the number of atoms
+        pair_i, pair_j = self.triu_pairs(noa)
+        if coords.ndim == 2:
+            c_diff = coords[pair_i] - coords[pair_j]
+            r2 = np.einsum('ij,ij->i', c_diff, c_diff)
+            f_lj = self.pair_force(r2, self.pair_types(pair_i, pair_j))
+            return self.scatter_pair_force(noa, pair_i, pair_j, f_lj[:,np.newaxis] * c_diff, out=out)
+        if noa * len(pair_i) > self.MAX_INCIDENCE_SIZE:
+            self._incidence = None
+            c_diff = coords[...,pair_i,:] - coords[...,pair_j,:]
+            r2 = np.einsum('...ij,...ij->...i', c_diff, c_diff)
+            c_diff *= self.pair_force(r2, self.pair_types(pair_i, pair_j))[...,np.newaxis]
+            force = np.empty(coords.shape, dtype=self.sum_dtype) if out is None else out
+            for replica in np.ndindex(coords.shape[:-2]):
+                self.scatter_pair_force(noa, pair_i, pair_j, c_diff[replica], out=force[replica])
+            return force
+        # incidence matrix with +1 for atom i and -1 for atom j of each pair
+        if self._incidence is None:
+            self._incidence = np.zeros((noa, len(pair_i)), dtype=self.dtype)
+            self._incidence[pair_i, np.arange(len(pair_i))] = 1.0
+            self._incidence[pair_j, np.arange(len(pair_j))] = -1.0
+        # work on (Nreplicas, 3, Npairs) arrays so each component is contiguous
+        c_diff = np.matmul(np.swapaxes(coords, -1, -2), self._incidence)
+        r2 = np.square(c_diff[...,0,:]) + np.square(c_diff[...,1,:]) + np.square(c_diff[...,2,:])
+        c_diff *= self.pair_force(r2, self.pair_types(pair_i, pair_j))[...,np.newaxis,:]
+        if out is not None:
+            np.matmul(c_diff, self._incidence.T, dtype=self.sum_dtype, out=np.swapaxes(out, -1, -2))
+            return out
+        return np.swapaxes(np.matmul(c_diff, self._incidence.T, dtype=self.sum_dtype), -1, -2)
+
+    def pair_force(self, r2, pair_types=None):
+        """
+        Compute the magnitude of the LJ gradients divided by rij
+
+        Parameters
+        ----------
+        r2: numpy.ndarray
+            Squared distances of atom pairs, the last axis is broadcast with per-replica parameters
+        pair_types: numpy.ndarray
+            Type pairs of the atom pairs given by pair_types(), for per-element parameters
+
+        Returns
+        -------
+        f_lj: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        f12, f6 = self._pair_coef(('f12', 'f6'), pair_types)
+        # (-12 x s12 / r^14 + 6 x s6 / r^8) * 4 * epsilon, written with r^-2 and r^-6
+        r2n1 = 1.0 / r2
+        r2n3 = r2n1 * r2n1 * r2n1
+        f_lj = r2n3 * f12
+        f_lj += f6
+        f_lj *= r2n3
+        f_lj *= r2n1
+        return f_lj
+
+    def pair_energy_force(self, r2, pair_types=None):
+        """
+        Compute the LJ energy and the magnitude of the LJ gradients divided by rij
+
+        The gradients are computed with the same operations as pair_force(), so they are
+        the same bit for bit.
+
+        Parameters
+        ----------
+        r2: numpy.ndarray
+            Squared distances of atom pairs
+        pair_types: numpy.ndarray
+            Type pairs of the atom pairs given by pair_types(), for per-element parameters
+
+        Returns
+        -------
+        e_lj: numpy.ndarray in the same shape of r2
+            Energy of each pair, 4 x epsilon x (s12 / r^12 - s6 / r^6)
+        f_lj: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        f12, f6, e12, e6 = self._pair_coef(('f12', 'f6', 'e12', 'e6'), pair_types)
+        r2n1 = 1.0 / r2
+        r2n3 = r2n1 * r2n1 * r2n1
+        f_lj = r2n3 * f12
+        f_lj += f6
+        f_lj *= r2n3
+        f_lj *= r2n1
+        e_lj = r2n3 * e12
+        e_lj -= e6
+        e_lj *= r2n3
+        return e_lj, f_lj
+
+    def _pair_coef(self, names, pair_types):
+        """ Coefficients of the pair formulas, gathered from the mixing tables or from the parameters """
+        if pair_types is not None:
+            if self._pair_types is not None and pair_types is self._pair_types[3]:
+                # the cached pairs, e.g. of the neighbor list, only gather each coefficient once
+                gathered = self._pair_types[4]
+                for name in names:
+                    if name not in gathered:
+                        gathered[name] = np.take(self._mixing[name], pair_types)
+                return [gathered[name] for name in names]
+            return [np.take(self._mixing[name], pair_types) for name in names]
+        s6, epsilon = self._lj_params(None, 1)
+        coef = {
+            'f12': -48.0 * epsilon * s6 * s6,
+            'f6': 24.0 * epsilon * s6,
+            'e12': 4.0 * epsilon * s6 * s6,
+            'e6': 4.0 * epsilon * s6,
+        }
+        return [coef[name] for name in names]
+
+    @staticmethod
+    def scatter_pair_force(noa, pair_i, pair_j, pair_force, out=None):
+        """
+        Sum the gradient vectors of atom pairs onto atoms, +f for atom i and -f for atom j
+
+        Parameters
+        ----------
+        noa: int
+            Number of atoms
+        pair_i, pair_j: numpy.ndarray of shape (Npairs,)
+            Indices of the atoms in each pair
+        pair_force: numpy.ndarray of shape (Npairs, 3)
+            Gradient vectors of each pair
+        out: numpy.ndarray of shape (Natoms, 3)
+            Buffer the force is written into and returned
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        force = np.empty((noa, 3), dtype=float) if out is None else out
+        for k in range(3):
+            np.subtract(np.bincount(pair_i, pair_force[:,k], minlength=noa),
+                        np.bincount(pair_j, pair_force[:,k], minlength=noa), out=force[:,k])
+        return force
 
     def compute_force_ref(self, coords):
         """
@@ -61,11 +696,18 @@ class LJForce(MDForce):
         """
 
         noa = len(coords)
-        s6 = self._params['sigma']**6
-        epsilon = self._params['epsilon']
+        if self._mixing is None:
+            s6 = self._params['sigma']**6
+            epsilon = self._params['epsilon']
+        else:
+            sigmas, epsilons = self._params['sigma'], self._params['epsilon']
+            elems = [list(Molecule.ELEM_MASS)[t] for t in self.types]
         forces = np.zeros((noa,3), dtype=float)
         for i in range(noa):
             for j in range(i+1,noa):
+                if self._mixing is not None:
+                    s6 = (0.5 * (sigmas[elems[i]] + sigmas[elems[j]]))**6
+                    epsilon = np.sqrt(epsilons[elems[i]] * epsilons[elems[j]])
                 dc = coords[i] - coords[j]
                 r2 = dc[0]*dc[0] + dc[1]*dc[1] + dc[2]*dc[2]
                 f = (-12 / r2**7 * s6 + 6 / r2**4) * 4 * epsilon * s6
@@ -0,0 +1,169 @@
+"""
+The LJTableForce Class
+"""
+
+import numpy as np
+from mdsim.force.lj_force import LJForce
+
+class LJTableForce(LJForce):
+    """
+    LJTableForce computes the Lennard-Jones force by interpolation in a table over r^2
+
+    The gradient magnitude f(r^2) and the energy e(r^2) of a pair are tabulated on a uniform
+    grid of n_grid points of r^2 between r_min^2 and r_max^2, so a pair is evaluated by a table
+    lookup instead of the powers and the reciprocal of the formula. The table is rebuilt by
+    every set_params() call. Pairs outside of the table are computed by the formula.
+
+    Interpolation
+    -------------
+    linear: piecewise linear in r^2, the error decreases as 1 / n_grid^2
+    cubic: cubic Hermite with the exact derivatives at the grid points, the error decreases
+        as 1 / n_grid^4. The energy uses de/dr^2 = f / 2, so the interpolated force and
+        energy are consistent at the grid points.
+
+    The neighbor, tiled and half kernels evaluate the pairs through the table. The dense
+    kernel evaluates the formula in its own broadcasting pass, so it is not supported.
+    """
+    INTERPOLATIONS = ('linear', 'cubic')
+
+    def __init__(self, kernel='half', cutoff=None, skin=0.3, block_size=256, n_workers=1, precision='double',
+                 n_grid=2000, interpolation='cubic', r_min=None, r_max=None):
+        """
+        Parameters
+        ----------
+        n_grid: int
+            Number of grid points of the table
+        interpolation: string
+            'linear' or 'cubic'
+        r_min: float
+            Shortest distance in the table, 0.8 x sigma by default
+        r_max: float
+            Longest distance in the table, the cutoff or 4 x sigma by default
+
+        Other parameters are the same as LJForce.
+        """
+        assert kernel != 'dense', 'the dense kernel does not use the table'
+        assert n_grid >= 2, 'n_grid should be at least 2'
+        assert interpolation in self.INTERPOLATIONS, f'interpolation should be one of {self.INTERPOLATIONS}'
+        super().__init__(kernel=kernel, cutoff=cutoff, skin=skin, block_size=block_size,
+                         n_workers=n_workers, precision=precision)
+        self.n_grid = n_grid
+        self.interpolation = interpolation
+        self.r_min = r_min
+        self.r_max = r_max
+        self.build_table()
+
+    def set_params(self, **kwargs):
+        """ Set the parameters and rebuild the table """
+        super().set_params(**kwargs)
+        self.build_table()
+
+    def build_table(self):
+        """ Tabulate the polynomial coefficients of f(r^2) and e(r^2) in each grid interval """
+        sigma, epsilon = self._params['sigma'], self._params['epsilon']
+        assert np.ndim(sigma) == 0 and np.ndim(epsilon) == 0 and self._mixing is None, \
+            'the table does not support per-replica or per-element parameters'
+        r_min = 0.8 * sigma if self.r_min is None else self.r_min
+        r_max = self.r_max
+        if r_max is None:
+            r_max = 4.0 * sigma if self.cutoff is None else self.cutoff
+        assert 0 < r_min < r_max, 'r_min should be positive and less than r_max'
+        self.r2_min = r_min**2
+        self.r2_max = r_max**2
+        r2 = np.linspace(self.r2_min, self.r2_max, self.n_grid)
+        h = r2[1] - r2[0]
+        self._inv_h = 1.0 / h
+        # the table is computed in float64 by the formula of LJForce
+        s6 = sigma**6
+        r2n1 = 1.0 / r2
+        r2n3 = r2n1 * r2n1 * r2n1
+        f = (24.0 * epsilon * s6 - 48.0 * epsilon * s6 * s6 * r2n3) * r2n3 * r2n1
+        e = 4.0 * epsilon * s6 * (s6 * r2n3 - 1.0) * r2n3
+        if self.interpolation == 'linear':
+            f_coef = np.stack([f[:-1], f[1:] - f[:-1]], axis=-1)
+            e_coef = np.stack([e[:-1], e[1:] - e[:-1]], axis=-1)
+        else:
+            # derivatives with respect to r^2, scaled to the grid interval
+            df = (336.0 * epsilon * s6 * s6 * r2n3 - 96.0 * epsilon * s6) * r2n3 * r2n1 * r2n1 * h
+            de = 0.5 * f * h
+            f_coef = self._hermite_coef(f, df)
+            e_coef = self._hermite_coef(e, de)
+        # coefficients of the same interval are contiguous, so a lookup gathers one row
+        self._f_coef = np.ascontiguousarray(f_coef, dtype=self.dtype)
+        self._e_coef = np.ascontiguousarray(e_coef, dtype=self.dtype)
+
+    @staticmethod
+    def _hermite_coef(y, dy):
+        """ Coefficients of y0 + t x (c1 + t x (c2 + t x c3)) in each interval, from the values and scaled derivatives """
+        y0, y1, m0, m1 = y[:-1], y[1:], dy[:-1], dy[1:]
+        return np.stack([y0, m0, 3.0 * (y1 - y0) - 2.0 * m0 - m1, 2.0 * (y0 - y1) + m0 + m1], axis=-1)
+
+    def _locate(self, r2):
+        """ Interval index and position in the interval of each r^2, and the mask of r^2 outside of the table """
+        x = (r2 - self.r2_min) * self._inv_h
+        outside = (x < 0.0) | (x >= self.n_grid - 1)
+        # the pairs outside are clipped into the table, and overwritten later
+        np.clip(x, 0.0, self.n_grid - 1, out=x)
+        idx = np.minimum(x.astype(np.intp), self.n_grid - 2)
+        x -= idx
+        return idx, x, outside
+
+    @staticmethod
+    def _interpolate(coef, idx, t):
+        """ Evaluate the polynomials of the intervals idx at the positions t with the Horner scheme """
+        # np.take is much faster than fancy indexing for gathering rows
+        rows = np.take(coef, idx, axis=0)
+        y = rows[...,-1].copy()
+        for k in range(coef.shape[-1] - 2, -1, -1):
+            y *= t
+            y += rows[...,k]
+        return y
+
+    def pair_force(self, r2, pair_types=None):
+        """
+        Interpolate the magnitude of the LJ gradients divided by rij
+
+        Parameters
+        ----------
+        r2: numpy.ndarray
+            Squared distances of atom pairs
+        pair_types: None
+            Only for the signature of LJForce.pair_force(), the table is for one type of atoms
+
+        Returns
+        -------
+        f_lj: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        idx, t, outside = self._locate(r2)
+        f_lj = self._interpolate(self._f_coef, idx, t)
+        if outside.any():
+            f_lj[outside] = super().pair_force(r2[outside])
+        return f_lj
+
+    def pair_energy_force(self, r2, pair_types=None):
+        """
+        Interpolate the LJ energy and the magnitude of the LJ gradients divided by rij
+
+        The gradients are the same as pair_force() bit for bit.
+
+        Parameters
+        ----------
+        r2: numpy.ndarray
+            Squared distances of atom pairs
+        pair_types: None
+            Only for the signature of LJForce.pair_energy_force()
+
+        Returns
+        -------
+        e_lj: numpy.ndarray in the same shape of r2
+            Energy of each pair
+        f_lj: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        idx, t, outside = self._locate(r2)
+        e_lj = self._interpolate(self._e_coef, idx, t)
+        f_lj = self._interpolate(self._f_coef, idx, t)
+        if outside.any():
+            e_lj[outside], f_lj[outside] = super().pair_energy_force(r2[outside])
+        return e_lj, f_lj
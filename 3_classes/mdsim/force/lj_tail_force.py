@@ -0,0 +1,28 @@
+"""
+The LJTailForce Class
+"""
+
+import numpy as np
+from mdsim.force.lj_force import LJForce
+
+class LJTailForce(LJForce):
+    """
+    LJTailForce implements the Lennard-Jones force of the atom pairs at or beyond the cutoff
+
+    Together with LJForce(kernel='neighbor', cutoff=cutoff), which computes the pairs within
+    the cutoff, it gives the full Lennard-Jones force. The tail changes slowly with time,
+    so it can be a slow force of RESPAIntegrator. All pairs are computed with the dense kernel.
+    """
+    def __init__(self, cutoff, precision='double'):
+        super().__init__(kernel='dense', precision=precision)
+        assert cutoff > 0, 'cutoff should be positive'
+        self.cutoff = cutoff
+
+    def _dense_pair_force(self, coords):
+        """ Pair displacements, squared distances and gradient magnitudes, without the pairs within the cutoff """
+        c_diff, r2_mat, f_lj_mat = super()._dense_pair_force(coords)
+        inside = r2_mat < self.cutoff**2
+        f_lj_mat[inside] = 0.0
+        # pairs at infinite distance have zero energy
+        r2_mat[inside] = np.inf
+        return c_diff, r2_mat, f_lj_mat
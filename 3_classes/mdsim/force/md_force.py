@@ -12,6 +12,10 @@ class MDForce:
 
     def __init__(self):
         self._params = dict()
+        # lengths of the periodic box, None for no periodic boundary
+        self.box = None
+        # element type index of each atom
+        self.types = None
 
     def set_params(self, **kwargs):
         self._params.update(kwargs)
@@ -19,8 +23,27 @@ class MDForce:
     def get_params(self):
         return self._params.copy()
 
+    def set_box(self, box):
+        """ Set the lengths of the periodic box, e.g. molecule.box, or None """
+        self.box = None if box is None else np.array(np.broadcast_to(box, (3,)), dtype=float)
+
+    def set_types(self, types):
+        """ Set the element type index of each atom, e.g. molecule.elem_idx """
+        self.types = None if types is None else np.asarray(types, dtype=np.int64)
+
+    def get_state(self):
+        """ Return the state needed to resume the computation as a dict """
+        return {'params': self.get_params()}
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        self.set_params(**state['params'])
+
     def print_params(self):
         print(self._params)
 
-    def compute_force(self, coords):
+    def compute_force(self, coords, out=None):
         raise NotImplementedError('compute_force should be implemented in child class')
+
+    def compute_energy_force(self, coords):
+        raise NotImplementedError('compute_energy_force should be implemented in child class')
@@ -0,0 +1,215 @@
+"""
+The NeighborList Class
+"""
+
+import numpy as np
+
+# the 13 neighbor cell offsets in the "upper half" of the 3x3x3 shell, plus the cell itself
+# visiting only these offsets finds every pair of neighboring cells exactly once
+HALF_SHELL = [(0, 0, 0)] + [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                            if (dx, dy, dz) > (0, 0, 0)]
+
+def minimum_image(c_diff, box):
+    """ Replace pair displacements of shape (..., 3) by their nearest periodic image, in place """
+    if box is not None:
+        box = np.asarray(box, dtype=c_diff.dtype)
+        c_diff -= box * np.rint(c_diff / box)
+    return c_diff
+
+def find_pairs(coords, rcut, box=None):
+    """
+    Find all atom pairs closer than rcut using a cell list
+
+    Atoms are binned into cubic cells with edge length rcut and sorted by cell index,
+    so only atoms in the same or adjacent cells are compared. The cost is O(N) at fixed density.
+
+    Parameters
+    ----------
+    coords: numpy.ndarray of shape (Natoms, 3)
+        Numpy array of atomic coordinates
+    rcut: float
+        The pair distance cutoff
+    box: numpy.ndarray of shape (3,)
+        Lengths of the periodic box, the distances are then of the nearest images
+
+    Returns
+    -------
+    pair_i, pair_j: numpy.ndarray of shape (Npairs,)
+        Indices of the atoms in each pair, every pair appears once
+    """
+    if box is not None:
+        return find_pairs_periodic(coords, rcut, box)
+    noa = len(coords)
+    if noa < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # compute the integer cell index of each atom, padded by one cell on each side
+    # so that the neighbor offsets of the border cells never wrap to another row
+    cell_idx = np.floor((coords - coords.min(axis=0)) / rcut).astype(np.int64) + 1
+    n_cells = cell_idx.max(axis=0) + 2
+    keys = (cell_idx[:,0] * n_cells[1] + cell_idx[:,1]) * n_cells[2] + cell_idx[:,2]
+    # sort atoms by cell, only the occupied cells are stored to keep memory O(N)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    cell_keys, cell_start, cell_count = np.unique(sorted_keys, return_index=True, return_counts=True)
+    pair_i, pair_j = [], []
+    for dx, dy, dz in HALF_SHELL:
+        # find the neighbor cell of each (sorted) atom
+        nbr_keys = sorted_keys + (dx * n_cells[1] + dy) * n_cells[2] + dz
+        loc = np.minimum(np.searchsorted(cell_keys, nbr_keys), len(cell_keys) - 1)
+        n_nbr = np.where(cell_keys[loc] == nbr_keys, cell_count[loc], 0)
+        # expand each atom against all atoms in its neighbor cell
+        total = n_nbr.sum()
+        idx_i = np.repeat(np.arange(noa), n_nbr)
+        idx_j = np.repeat(cell_start[loc] - np.cumsum(n_nbr) + n_nbr, n_nbr) + np.arange(total)
+        if (dx, dy, dz) == (0, 0, 0):
+            # inside the same cell only keep each pair once
+            keep = idx_j > idx_i
+            idx_i, idx_j = idx_i[keep], idx_j[keep]
+        idx_i, idx_j = order[idx_i], order[idx_j]
+        c_diff = coords[idx_i] - coords[idx_j]
+        keep = np.einsum('ij,ij->i', c_diff, c_diff) < rcut**2
+        pair_i.append(idx_i[keep])
+        pair_j.append(idx_j[keep])
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+def find_pairs_periodic(coords, rcut, box):
+    """
+    Find all atom pairs closer than rcut in a periodic box using a cell list
+
+    The box is divided into a grid of at least 3 cells along each axis with edges of at least
+    rcut, and the neighbor cells wrap around the box. Atoms are sorted by cell index, and the
+    start and count of every cell are kept in arrays over the whole grid, which has O(N) cells.
+    Smaller boxes compare all pairs.
+
+    Parameters
+    ----------
+    coords: numpy.ndarray of shape (Natoms, 3)
+        Numpy array of atomic coordinates, they do not need to be wrapped into the box
+    rcut: float
+        The pair distance cutoff, at most half of the box so each pair has one nearest image
+    box: numpy.ndarray of shape (3,)
+        Lengths of the periodic box
+
+    Returns
+    -------
+    pair_i, pair_j: numpy.ndarray of shape (Npairs,)
+        Indices of the atoms in each pair, every pair appears once
+    """
+    box = np.asarray(box, dtype=float)
+    assert np.all(rcut <= 0.5 * box), 'rcut should be at most half of the box'
+    noa = len(coords)
+    n_cells = np.floor(box / rcut).astype(np.int64)
+    # larger cells for a dilute system, so the grid does not outgrow the atoms
+    n_grid = np.prod(n_cells)
+    if n_grid > 2 * noa:
+        n_cells = np.maximum((n_cells * (2 * noa / n_grid)**(1/3)).astype(np.int64), 1)
+    if noa < 2 or np.any(n_cells < 3):
+        # the neighbor cells are not distinct with less than 3 cells along an axis
+        idx_i, idx_j = np.triu_indices(noa, k=1)
+        c_diff = minimum_image(coords[idx_i] - coords[idx_j], box)
+        keep = np.einsum('ij,ij->i', c_diff, c_diff) < rcut**2
+        return idx_i[keep], idx_j[keep]
+    # fractional coordinates wrapped into [0, 1)
+    frac = coords / box
+    frac -= np.floor(frac)
+    cell_idx = np.minimum((frac * n_cells).astype(np.int64), n_cells - 1)
+    keys = (cell_idx[:,0] * n_cells[1] + cell_idx[:,1]) * n_cells[2] + cell_idx[:,2]
+    order = np.argsort(keys, kind='stable')
+    sorted_cells = cell_idx[order]
+    # the wrapped coordinates in the sorted order
+    sorted_coords = frac[order] * box
+    cell_count = np.bincount(keys, minlength=np.prod(n_cells))
+    cell_start = np.cumsum(cell_count) - cell_count
+    pair_i, pair_j = [], []
+    for offset in HALF_SHELL:
+        # the neighbor cell of each (sorted) atom, wrapped around the box
+        n_wraps, nbr_cells = np.divmod(sorted_cells + offset, n_cells)
+        nbr_keys = (nbr_cells[:,0] * n_cells[1] + nbr_cells[:,1]) * n_cells[2] + nbr_cells[:,2]
+        n_nbr = cell_count[nbr_keys]
+        # expand each atom against all atoms in its neighbor cell
+        total = n_nbr.sum()
+        idx_i = np.repeat(np.arange(noa), n_nbr)
+        idx_j = np.repeat(cell_start[nbr_keys] - np.cumsum(n_nbr) + n_nbr, n_nbr) + np.arange(total)
+        if offset == (0, 0, 0):
+            # inside the same cell only keep each pair once
+            keep = idx_j > idx_i
+            idx_i, idx_j = idx_i[keep], idx_j[keep]
+        # the image of atom j in the neighbor cell of atom i, shifted by the wraps of the cell
+        shift = n_wraps * box
+        c_diff = sorted_coords[idx_i] - sorted_coords[idx_j]
+        c_diff -= shift[idx_i]
+        keep = np.einsum('ij,ij->i', c_diff, c_diff) < rcut**2
+        pair_i.append(order[idx_i[keep]])
+        pair_j.append(order[idx_j[keep]])
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+class NeighborList:
+    """
+    NeighborList keeps the Verlet list of atom pairs within cutoff + skin
+
+    The list is only rebuilt when some atom has moved more than half of the skin
+    since the last build, so between rebuilds no pair can enter the cutoff unnoticed.
+    With a periodic box, the pairs are found by their nearest images.
+    """
+    @property
+    def rlist(self):
+        return self.cutoff + self.skin
+
+    @property
+    def pairs(self):
+        return self._pair_i, self._pair_j
+
+    def __init__(self, cutoff, skin=0.3, box=None):
+        assert cutoff > 0, 'cutoff should be positive'
+        assert skin >= 0, 'skin should not be negative'
+        self.cutoff = cutoff
+        self.skin = skin
+        self.box = None
+        self.set_box(box)
+        # number of times the list is built
+        self.n_builds = 0
+        self._ref_coords = None
+        self._pair_i = self._pair_j = np.zeros(0, dtype=np.int64)
+
+    def set_box(self, box):
+        """ Set the lengths of the periodic box, or None, the list is rebuilt at the next update """
+        self.box = None if box is None else np.array(np.broadcast_to(box, (3,)), dtype=float)
+        assert self.box is None or np.all(self.rlist <= 0.5 * self.box), 'cutoff + skin should be at most half of the box'
+        self._ref_coords = None
+
+    def get_state(self):
+        """ Return the current list and the coordinates it was built with """
+        return {'ref_coords': self._ref_coords, 'pair_i': self._pair_i, 'pair_j': self._pair_j, 'n_builds': self.n_builds}
+
+    def set_state(self, state):
+        """ Restore the list returned by get_state(), so the rebuilds happen at the same steps """
+        self._ref_coords = state.get('ref_coords')
+        self._pair_i = np.asarray(state['pair_i'], dtype=np.int64)
+        self._pair_j = np.asarray(state['pair_j'], dtype=np.int64)
+        self.n_builds = int(state['n_builds'])
+
+    def needs_update(self, coords):
+        """ Check if any atom moved more than half of the skin since the last build """
+        if self._ref_coords is None or self._ref_coords.shape != coords.shape:
+            return True
+        max_disp2 = np.max(np.sum(np.square(coords - self._ref_coords), axis=1), initial=0.0)
+        return max_disp2 > (0.5 * self.skin)**2
+
+    def build(self, coords):
+        """ Build the list of pairs within cutoff + skin """
+        self._pair_i, self._pair_j = find_pairs(coords, self.rlist, box=self.box)
+        self._ref_coords = np.array(coords, dtype=float)
+        self.n_builds += 1
+
+    def update(self, coords):
+        """ Rebuild the list if needed
+
+        Returns
+        -------
+        rebuilt: bool
+            True if the list was rebuilt
+        """
+        if self.needs_update(coords):
+            self.build(coords)
+            return True
+        return False
@@ -0,0 +1,96 @@
+"""
+The SoftRepulsionForce Class
+"""
+
+import numpy as np
+from mdsim.force.lj_force import LJForce
+
+class SoftRepulsionForce(LJForce):
+    """
+    SoftRepulsionForce implements a harmonic soft-sphere repulsion between overlapping atoms
+
+    Reference
+    ---------
+    The energy of a pair at distance rij is
+        Eij = epsilon x (1 - rij / sigma)^2 for rij < sigma, and 0 beyond sigma
+
+    The parameters, including per-element parameters with Lorentz-Berthelot mixing, and the
+    neighbor, tiled and half kernels are those of LJForce, with this pair formula.
+    """
+    def __init__(self, kernel='half', cutoff=None, skin=0.3, block_size=256, n_workers=1, precision='double'):
+        assert kernel != 'dense', 'the dense kernel evaluates the LJ formula'
+        super().__init__(kernel=kernel, cutoff=cutoff, skin=skin, block_size=block_size,
+                         n_workers=n_workers, precision=precision)
+
+    def _soft_params(self, pair_types):
+        """ sigma and epsilon of the pairs, gathered by pair_types or broadcast over the pairs """
+        if pair_types is not None:
+            return np.take(self._mixing['sigma'], pair_types), np.take(self._mixing['epsilon'], pair_types)
+        sigma = np.asarray(self._params['sigma'], dtype=self.dtype)[..., np.newaxis]
+        epsilon = np.asarray(self._params['epsilon'], dtype=self.dtype)[..., np.newaxis]
+        return sigma, epsilon
+
+    def pair_force(self, r2, pair_types=None):
+        """
+        Compute the magnitude of the repulsion gradients divided by rij
+
+        Parameters
+        ----------
+        r2: numpy.ndarray
+            Squared distances of atom pairs
+        pair_types: numpy.ndarray
+            Type pairs of the atom pairs given by pair_types(), for per-element parameters
+
+        Returns
+        -------
+        f_soft: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        return self.pair_energy_force(r2, pair_types)[1]
+
+    def pair_energy_force(self, r2, pair_types=None):
+        """
+        Compute the repulsion energy and the magnitude of its gradients divided by rij
+
+        Returns
+        -------
+        e_soft: numpy.ndarray in the same shape of r2
+            Energy of each pair
+        f_soft: numpy.ndarray in the same shape of r2
+            Multiply by [rij] to get the gradient vector of each pair
+        """
+        sigma, epsilon = self._soft_params(pair_types)
+        r = np.sqrt(r2)
+        overlap = np.maximum(1.0 - r / sigma, 0.0)
+        e_soft = epsilon * overlap * overlap
+        # dE/dr / r
+        f_soft = -2.0 * epsilon * overlap / (sigma * r)
+        return e_soft, f_soft
+
+    def compute_force_ref(self, coords):
+        """
+        Compute the repulsion force vector with a loop over atom pairs, for one set of parameters
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+
+        Returns
+        -------
+        force: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of gradients on each atom
+        """
+        noa = len(coords)
+        sigma = self._params['sigma']
+        epsilon = self._params['epsilon']
+        forces = np.zeros((noa,3), dtype=float)
+        for i in range(noa):
+            for j in range(i+1,noa):
+                dc = coords[i] - coords[j]
+                r = np.sqrt(dc[0]*dc[0] + dc[1]*dc[1] + dc[2]*dc[2])
+                if r < sigma:
+                    f = -2 * epsilon * (1 - r / sigma) / (sigma * r)
+                    forces[i] += f * dc
+                    forces[j] -= f * dc
+        return forces
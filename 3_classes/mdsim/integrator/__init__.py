@@ -1,2 +1,4 @@
 from mdsim.integrator.md_integrator import MDIntegrator
-from mdsim.integrator.verlet_integrator import VerletIntegrator
\ No newline at end of file
+from mdsim.integrator.verlet_integrator import VerletIntegrator
+from mdsim.integrator.velocity_verlet_integrator import VelocityVerletIntegrator
+from mdsim.integrator.respa_integrator import RESPAIntegrator
\ No newline at end of file
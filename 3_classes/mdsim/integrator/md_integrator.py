@@ -2,10 +2,72 @@
 The MDIntegrator Class
 """
 
+import math
+
 class MDIntegrator:
-    """ The MDIntegrator class with common methods and properties """
+    """ The MDIntegrator class with common methods and properties
+
+    In the adaptive mode, enabled by set_adaptive(), t_step is chosen in each step from
+    the max speed and acceleration of the atoms, and is the step used by the last
+    integrate() call. The caller can bound the next step by t_step_limit, e.g. to land
+    on a time where a frame is recorded.
+    """
     def __init__(self, t_step=0.001):
         self.t_step = t_step
+        # (t_step_min, t_step_max, max_displacement, max_growth), None for a fixed time step
+        self.adaptive = None
+        self.t_step_limit = None
+        # the step chosen by the criteria before t_step_limit is applied
+        self._t_step_target = t_step
+
+    def set_adaptive(self, t_step_min, t_step_max, max_displacement=0.01, max_growth=1.05):
+        """ Enable the adaptive time step
+
+        Parameters
+        ----------
+        t_step_min, t_step_max: float
+            Bounds of the time step
+        max_displacement: float
+            The step is chosen so that no atom moves more than this in one step
+        max_growth: float
+            Max ratio between consecutive steps, the step shrinks without limit
+        """
+        assert 0 < t_step_min <= t_step_max, 'bounds should satisfy 0 < t_step_min <= t_step_max'
+        assert max_displacement > 0, 'max_displacement should be positive'
+        assert max_growth >= 1, 'max_growth should not be less than 1'
+        self.adaptive = (t_step_min, t_step_max, max_displacement, max_growth)
+        self.t_step = self._t_step_target = min(max(self.t_step, t_step_min), t_step_max)
+
+    def next_t_step(self, max_speed, max_accel):
+        """ Choose the time step of the adaptive mode from the max speed and acceleration of atoms """
+        t_step_min, t_step_max, max_displacement, max_growth = self.adaptive
+        t_step = self._t_step_target * max_growth
+        # displacements by the velocity and by the acceleration are each bounded
+        if max_speed > 0:
+            t_step = min(t_step, max_displacement / max_speed)
+        if max_accel > 0:
+            t_step = min(t_step, math.sqrt(2.0 * max_displacement / max_accel))
+        t_step = min(max(t_step, t_step_min), t_step_max)
+        self._t_step_target = t_step
+        if self.t_step_limit is not None:
+            t_step = min(t_step, self.t_step_limit)
+        return t_step
+
+    def forces(self):
+        """ The forces computed by the integrator itself, which are given the element types and the box of the molecule """
+        return []
+
+    def get_state(self):
+        """ Return the state needed to resume the integration as a dict """
+        return {'t_step': self.t_step, 't_step_target': self._t_step_target}
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        self.t_step = state['t_step']
+        self._t_step_target = state.get('t_step_target', self.t_step)
 
     def integrate(self, molecule):
         raise NotImplementedError("integrate() method should be implemented in child class")
+
+    def integrate_coords(self, coords, force, masses):
+        raise NotImplementedError("integrate_coords() method should be implemented in child class")
@@ -0,0 +1,114 @@
+"""
+The RESPAIntegrator Class
+"""
+
+import numpy as np
+from mdsim.force import MDForce
+from mdsim.integrator.velocity_verlet_integrator import VelocityVerletIntegrator
+
+class RESPAIntegrator(VelocityVerletIntegrator):
+    """ RESPAIntegrator that implements the impulse multiple time step (RESPA) algorithm
+
+    The force given in molecule.force, e.g. computed by the MDSimulation loop, is the fast
+    force integrated with velocity Verlet at every step. Each slow force is computed by the
+    integrator itself, only every period steps, and applied as two impulses of period x dt / 2
+    at both ends of its outer step. The closing impulse of one outer step and the opening
+    impulse of the next one use the force at the same coordinates, so each slow force is
+    computed once per period.
+
+    References
+    ----------
+    Impulse RESPA with outer step T = period x dt, with As = -slow gradient / m:
+        V = V + As x T / 2
+        period velocity Verlet steps with the fast force
+        V = V + As x T / 2
+    """
+    def __init__(self, slow_forces=(), t_step=0.001, inplace=False):
+        """
+        Parameters
+        ----------
+        slow_forces: list of (MDForce, int)
+            Slow force terms and the number of steps between their evaluations
+        t_step: float
+            Time step of the fast force
+        inplace: bool
+            Write the new coordinates into molecule.coords
+        """
+        for ff, period in slow_forces:
+            assert isinstance(ff, MDForce)
+            assert period >= 1, 'period should be a positive number of steps'
+        self.slow_forces = list(slow_forces)
+        super().__init__(t_step=t_step, inplace=inplace)
+
+    def reset(self):
+        """ Forget the velocities and the step count, and release the buffers """
+        super().reset()
+        self.n_steps = 0
+        # number of evaluations of each slow force
+        self.n_slow_evals = [0] * len(self.slow_forces)
+
+    def forces(self):
+        """ The slow forces """
+        return [ff for ff, _ in self.slow_forces]
+
+    def set_adaptive(self, t_step_min, t_step_max, max_displacement=0.01, max_growth=1.05):
+        raise NotImplementedError('the slow impulses assume a constant time step')
+
+    def get_state(self):
+        """ Return the state needed to resume the integration, including the slow forces """
+        state = super().get_state()
+        state['n_steps'] = self.n_steps
+        state['n_slow_evals'] = np.array(self.n_slow_evals, dtype=np.int64)
+        state['slow_forces'] = {str(k): ff.get_state() for k, (ff, _) in enumerate(self.slow_forces)}
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        super().set_state(state)
+        self.n_steps = int(state['n_steps'])
+        self.n_slow_evals = [int(n) for n in np.atleast_1d(state['n_slow_evals'])]
+        for k, (ff, _) in enumerate(self.slow_forces):
+            ff.set_state(state['slow_forces'][str(k)])
+
+    def integrate_coords_inplace(self, coords, force, masses):
+        """
+        integrate coordinate and fast force arrays, and write the new coordinates into coords
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Current coordinates, overwritten by the new set of coordinates
+        force: numpy.ndarray in the same shape of coords
+            Gradients of the fast force on each atom
+        masses: numpy.ndarray of shape (Natoms,)
+            Masses of each atom
+        """
+        self.prepare_buffers(coords, masses)
+        v, dv = self.velocities, self._dv
+        np.multiply(force, self._half_inv_masses, out=dv)
+        dv *= self.t_step
+        # complete the fast half kick of the last step
+        if self._half_step:
+            np.add(v, dv, out=v)
+        # the slow forces at the boundaries of their outer steps
+        slow_kicks = []
+        for k, (ff, period) in enumerate(self.slow_forces):
+            if self.n_steps % period == 0:
+                # As x period x dt / 2, only allocated every period steps
+                slow_kick = ff.compute_force(coords) * self._half_inv_masses
+                slow_kick *= period * self.t_step
+                self.n_slow_evals[k] += 1
+                slow_kicks.append(slow_kick)
+                # the closing impulse of the last outer step
+                if self.n_steps > 0:
+                    np.add(v, slow_kick, out=v)
+        self.kinetic_energy = 0.5 * np.einsum('...ij,...ij,i->...', v, v, masses)
+        # the opening impulses of the next outer steps
+        for slow_kick in slow_kicks:
+            np.add(v, slow_kick, out=v)
+        # the fast half kick and the drift
+        np.add(v, dv, out=v)
+        self._half_step = True
+        np.multiply(v, self.t_step, out=dv)
+        np.add(coords, dv, out=coords)
+        self.n_steps += 1
@@ -0,0 +1,163 @@
+"""
+The VelocityVerletIntegrator Class
+"""
+
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.integrator.md_integrator import MDIntegrator
+
+class VelocityVerletIntegrator(MDIntegrator):
+    """ VelocityVerletIntegrator that implements the velocity Verlet algorithm
+
+    The force of each step is only computed once, at the current coordinates, so the
+    two half kicks of velocity Verlet are applied in the same call: the second half
+    kick of the previous step completes the velocities V[i] at the current time, and
+    the first half kick of this step gives V[i+1/2] for the drift. The kinetic energy
+    of the current time is computed from V[i] as a by-product.
+
+    The velocities are kept in a preallocated array, and with inplace=True integrate()
+    writes the new coordinates into molecule.coords, so no memory is allocated in each step.
+
+    In the adaptive mode, the step dt[i] of X[i] -> X[i+1] is chosen after V[i] is known,
+    and the two half kicks at X[i] use dt[i-1] / 2 and dt[i] / 2.
+
+    References
+    ----------
+    Velocity Verlet integration formula, with A[i] = -gradient[i] / m:
+        V[i] = V[i-1/2] + A[i] x dt[i-1] / 2
+        V[i+1/2] = V[i] + A[i] x dt[i] / 2
+        X[i+1] = X[i] + V[i+1/2] x dt[i]
+    """
+    def __init__(self, t_step=0.001, inplace=False):
+        super().__init__(t_step=t_step)
+        self.inplace = inplace
+        self.reset()
+
+    def reset(self):
+        """ Forget the velocities and release the buffers """
+        self.velocities = None
+        # False while the velocities are at full step, before the first step
+        self._half_step = False
+        self.kinetic_energy = None
+        self._dv = None
+        self._masses = None
+        self._half_inv_masses = None
+
+    def set_velocities(self, velocities):
+        """ Set the velocities at the time of the current coordinates """
+        self.velocities = np.array(velocities, dtype=float)
+        self._half_step = False
+        self._dv = np.empty_like(self.velocities)
+        # recompute -1/2m in the shape of the velocities
+        self._masses = None
+
+    def get_state(self):
+        """ Return the state needed to resume the integration, including the velocities """
+        state = super().get_state()
+        state['velocities'] = None if self.velocities is None else self.velocities.copy()
+        state['half_step'] = self._half_step
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        super().set_state(state)
+        self.reset()
+        if state.get('velocities') is not None:
+            self.set_velocities(state['velocities'])
+            self._half_step = bool(state['half_step'])
+
+    def integrate(self, molecule):
+        """
+        integrate current coords and force to get new coordinates
+
+        Parameters
+        ----------
+        molecule: mdsim.molecule.Molecule object
+            molecule.coords, molecule.force, molecule.masses will be used.
+
+        Returns
+        -------
+        new_molecule: mdsim.molecule.Molecule object
+            The new molecule containing the new set of coordinates,
+            or the same molecule updated in place if self.inplace is True
+        """
+        assert isinstance(molecule, Molecule)
+        if self.inplace:
+            self.integrate_coords_inplace(molecule.coords, molecule.force, molecule.masses)
+            return molecule
+        new_coords = self.integrate_coords(molecule.coords, molecule.force, molecule.masses)
+        # create new molecule
+        new_molecule = molecule.copy()
+        new_molecule.reset_force()
+        new_molecule.set_coords_unchecked(new_coords)
+        return new_molecule
+
+    def integrate_coords(self, coords, force, masses):
+        """
+        integrate coordinate and force arrays to get new coordinates
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Current coordinates, a batch of replicas is integrated at once
+        force: numpy.ndarray in the same shape of coords
+            Gradients on each atom
+        masses: numpy.ndarray of shape (Natoms,)
+            Masses of each atom
+
+        Returns
+        -------
+        new_coords: numpy.ndarray in the same shape of coords
+            The new set of coordinates
+        """
+        new_coords = np.array(coords, dtype=float)
+        self.integrate_coords_inplace(new_coords, force, masses)
+        return new_coords
+
+    def integrate_coords_inplace(self, coords, force, masses):
+        """
+        integrate coordinate and force arrays, and write the new coordinates into coords
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Current coordinates, overwritten by the new set of coordinates
+        force: numpy.ndarray in the same shape of coords
+            Gradients on each atom
+        masses: numpy.ndarray of shape (Natoms,)
+            Masses of each atom, -1/2m is only recomputed when a different array is passed
+        """
+        self.prepare_buffers(coords, masses)
+        v, dv = self.velocities, self._dv
+        # A[i] x dt / 2
+        np.multiply(force, self._half_inv_masses, out=dv)
+        dv *= self.t_step
+        # V[i] = V[i-1/2] + A[i] x dt / 2
+        if self._half_step:
+            np.add(v, dv, out=v)
+        self.kinetic_energy = 0.5 * np.einsum('...ij,...ij,i->...', v, v, masses)
+        if self.adaptive is not None:
+            max_speed = np.sqrt(np.einsum('...ij,...ij->...i', v, v).max(initial=0.0))
+            # dv holds A[i] x dt[i-1] / 2
+            max_accel = np.sqrt(np.einsum('...ij,...ij->...i', dv, dv).max(initial=0.0)) * 2.0 / self.t_step
+            t_step = self.next_t_step(max_speed, max_accel)
+            if t_step != self.t_step:
+                np.multiply(dv, t_step / self.t_step, out=dv)
+                self.t_step = t_step
+        # V[i+1/2] = V[i] + A[i] x dt / 2
+        np.add(v, dv, out=v)
+        self._half_step = True
+        # X[i+1] = X[i] + V[i+1/2] x dt
+        np.multiply(v, self.t_step, out=dv)
+        np.add(coords, dv, out=coords)
+
+    def prepare_buffers(self, coords, masses):
+        """ Allocate the velocities and compute -1/2m in the shape of coords if needed """
+        # the system starts at rest if no velocities are given
+        if self.velocities is None or self.velocities.shape != coords.shape:
+            self.set_velocities(np.zeros_like(coords))
+        # independent of the time step, so it is kept when the adaptive step changes
+        if masses is not self._masses:
+            self._masses = masses
+            # stored in the full shape of coords, a broadcast operand makes numpy allocate a buffer
+            self._half_inv_masses = np.ascontiguousarray(np.broadcast_to(-0.5 / masses[:, np.newaxis], coords.shape))
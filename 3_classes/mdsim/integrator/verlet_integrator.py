@@ -9,11 +9,44 @@ from mdsim.integrator.md_integrator import MDIntegrator
 class VerletIntegrator(MDIntegrator):
     """ VerletIntegrator that implements the verlet algorithm
 
+    With inplace=True, integrate() writes the new coordinates into molecule.coords and
+    returns the same molecule. The previous coordinates and the step buffer are allocated
+    once, so no memory is allocated in each step.
+
     References
     ----------
     Verlet integration formula:
         X[i+1] = X[i] x 2 + dX - X[i-1]
     """
+    def __init__(self, t_step=0.001, inplace=False):
+        super().__init__(t_step=t_step)
+        self.inplace = inplace
+        self.reset()
+
+    def reset(self):
+        """ Forget the previous coordinates and release the buffers """
+        self.prev_coords = None
+        self._dx = None
+        self._masses = None
+        self._scale = None
+        self._scale_t_step = None
+
+    def set_adaptive(self, t_step_min, t_step_max, max_displacement=0.01, max_growth=1.05):
+        raise NotImplementedError('the Verlet formula assumes a constant time step, use VelocityVerletIntegrator')
+
+    def get_state(self):
+        """ Return the state needed to resume the integration, including the previous coordinates """
+        state = super().get_state()
+        state['prev_coords'] = None if self.prev_coords is None else self.prev_coords.copy()
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        super().set_state(state)
+        self.reset()
+        if state.get('prev_coords') is not None:
+            self.prev_coords = np.array(state['prev_coords'], dtype=float)
+
     def integrate(self, molecule):
         """
         integrate current coords and force to get new coordinates
@@ -26,18 +59,79 @@ class VerletIntegrator(MDIntegrator):
         Returns
         -------
         new_molecule: mdsim.molecule.Molecule object
-            The new molecule containing the new set of coordinates
+            The new molecule containing the new set of coordinates,
+            or the same molecule updated in place if self.inplace is True
         """
         assert isinstance(molecule, Molecule)
-        # initialize prev_coords
-        if not hasattr(self, 'prev_coords'):
-            self.prev_coords = molecule.coords.copy()
-        # compute step dX
-        dx = -molecule.force / molecule.masses[:, np.newaxis] * self.t_step**2
+        if self.inplace:
+            self.integrate_coords_inplace(molecule.coords, molecule.force, molecule.masses)
+            return molecule
+        new_coords = self.integrate_coords(molecule.coords, molecule.force, molecule.masses)
         # create new molecule
         new_molecule = molecule.copy()
         new_molecule.reset_force()
-        new_molecule.set_coords(molecule.coords * 2 + dx - self.prev_coords)
+        new_molecule.set_coords_unchecked(new_coords)
+        return new_molecule
+
+    def integrate_coords(self, coords, force, masses):
+        """
+        integrate coordinate and force arrays to get new coordinates
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Current coordinates, a batch of replicas is integrated at once
+        force: numpy.ndarray in the same shape of coords
+            Gradients on each atom
+        masses: numpy.ndarray of shape (Natoms,)
+            Masses of each atom
+
+        Returns
+        -------
+        new_coords: numpy.ndarray in the same shape of coords
+            The new set of coordinates
+        """
+        # initialize prev_coords
+        if self.prev_coords is None:
+            self.prev_coords = coords.copy()
+        # compute step dX
+        dx = -force / masses[:, np.newaxis] * self.t_step**2
+        new_coords = coords * 2 + dx - self.prev_coords
         # update self.prev_coords
-        self.prev_coords = molecule.coords.copy()
-        return new_molecule
\ No newline at end of file
+        self.prev_coords = coords.copy()
+        return new_coords
+
+    def integrate_coords_inplace(self, coords, force, masses):
+        """
+        integrate coordinate and force arrays, and write the new coordinates into coords
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3) or (Nreplicas, Natoms, 3)
+            Current coordinates, overwritten by the new set of coordinates
+        force: numpy.ndarray in the same shape of coords
+            Gradients on each atom
+        masses: numpy.ndarray of shape (Natoms,)
+            Masses of each atom, dt^2/m is only recomputed when a different array is passed
+        """
+        # allocate the buffers in the first step
+        if self.prev_coords is None or self.prev_coords.shape != coords.shape:
+            self.prev_coords = coords.copy()
+            self._dx = None
+        if self._dx is None:
+            self._dx = np.empty_like(coords)
+            self._masses = None
+        if masses is not self._masses or self.t_step != self._scale_t_step:
+            self._masses = masses
+            # stored in the full shape of coords, a broadcast operand makes numpy allocate a buffer
+            self._scale = np.ascontiguousarray(np.broadcast_to(-self.t_step**2 / masses[:, np.newaxis], coords.shape))
+            self._scale_t_step = self.t_step
+        dx = self._dx
+        # dX - X[i-1]
+        np.multiply(force, self._scale, out=dx)
+        np.subtract(dx, self.prev_coords, out=dx)
+        # X[i] becomes X[i-1] of the next step
+        np.copyto(self.prev_coords, coords)
+        # X[i+1] = X[i] x 2 + dX - X[i-1]
+        np.multiply(coords, 2.0, out=coords)
+        np.add(coords, dx, out=coords)
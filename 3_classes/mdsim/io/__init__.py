@@ -0,0 +1,7 @@
+from mdsim.io.xyz_writer import XYZWriter
+from mdsim.io.xyz_format import xyz_frame_template, format_xyz_frames
+from mdsim.io.binary_traj import BinaryTrajWriter, load_binary_traj
+from mdsim.io.xyz_reader import read_xyz_coords, iter_xyz_blocks
+from mdsim.io.xyz_index import XYZReader, build_xyz_index
+from mdsim.io.xyz_parallel import read_xyz_parallel
+from mdsim.io.compressed_traj import CompressedTrajWriter, CompressedTrajReader, save_compressed_traj, load_compressed_traj
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Binary trajectory format
+
+The file starts with a header holding the number of atoms, the data type and the
+elements, padded to HEADER_ALIGN bytes. It is followed by the frames as one
+contiguous (Nframes, Natoms, 3) block, so the number of frames is given by the file
+size and frames can be appended. Loading maps the file into memory, and only the
+pages of the frames that are accessed are read from disk.
+"""
+
+import os
+import struct
+import numpy as np
+
+MAGIC = b'MDTRAJ01'
+# magic, number of atoms, data type string, number of bytes of the elements
+HEADER_STRUCT = struct.Struct('<8sQ4sQ')
+HEADER_ALIGN = 64
+# maximum number of bytes of frames converted to the stored data type at a time
+WRITE_BLOCK_SIZE = 1 << 24
+
+def write_binary_header(f, elems, dtype=np.float64):
+    """ Write the header of a binary trajectory into an opened file
+
+    Returns
+    -------
+    offset: int
+        The byte offset where the frames start
+    """
+    dtype = np.dtype(dtype)
+    assert dtype in (np.float32, np.float64), 'only float32 and float64 are supported'
+    elem_bytes = '\n'.join(elems).encode()
+    header = HEADER_STRUCT.pack(MAGIC, len(elems), dtype.str.encode(), len(elem_bytes)) + elem_bytes
+    # pad the header so the frame block is aligned
+    header += b'\0' * (-len(header) % HEADER_ALIGN)
+    f.write(header)
+    return len(header)
+
+def write_binary_frames(f, xyz, dtype=np.float64):
+    """ Write frames of coordinates into an opened binary trajectory file
+
+    The frames are written from the array memory, with no copy if xyz is contiguous and
+    already has the stored data type. Otherwise they are converted in blocks of at most
+    WRITE_BLOCK_SIZE bytes, so the memory used does not grow with the trajectory.
+
+    Parameters
+    ----------
+    f: file object
+        The file opened in binary mode, positioned after the header or the last frame
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        The frames of coordinates
+    dtype: numpy.dtype
+        Data type of the stored coordinates, float32 or float64
+    """
+    dtype = np.dtype(dtype)
+    frame_size = xyz.shape[1] * 3 * dtype.itemsize
+    block_frames = max(WRITE_BLOCK_SIZE // max(frame_size, 1), 1)
+    for start in range(0, len(xyz), block_frames):
+        f.write(memoryview(np.ascontiguousarray(xyz[start:start+block_frames], dtype=dtype)))
+
+def read_binary_header(f):
+    """ Read the header of a binary trajectory from an opened file
+
+    Returns
+    -------
+    elems: list of strings
+        List of elements for all atoms
+    dtype: numpy.dtype
+        Data type of the coordinates
+    offset: int
+        The byte offset where the frames start
+    """
+    magic, noa, dtype_str, n_elem_bytes = HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+    assert magic == MAGIC, 'Not a binary trajectory file'
+    elem_bytes = f.read(n_elem_bytes)
+    elems = elem_bytes.decode().split('\n') if noa > 0 else []
+    assert len(elems) == noa, 'Corrupted binary trajectory header'
+    offset = HEADER_STRUCT.size + n_elem_bytes
+    offset += -offset % HEADER_ALIGN
+    return elems, np.dtype(dtype_str.rstrip(b'\0').decode()), offset
+
+def load_binary_traj(filename):
+    """ Map a binary trajectory file into memory
+
+    Returns
+    -------
+    elems: list of strings
+        List of elements for all atoms
+    xyz: numpy.memmap of shape (Nframes, Natoms, 3)
+        Read-only array of the frames, backed by the file
+    """
+    with open(filename, 'rb') as f:
+        elems, dtype, offset = read_binary_header(f)
+        f.seek(0, 2)
+        file_size = f.tell()
+    frame_size = len(elems) * 3 * dtype.itemsize
+    n_frames = (file_size - offset) // frame_size if frame_size > 0 else 0
+    if n_frames == 0:
+        # an empty file region can not be mapped
+        return elems, np.zeros((0, len(elems), 3), dtype=dtype)
+    xyz = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(n_frames, len(elems), 3))
+    return elems, xyz
+
+class BinaryTrajWriter:
+    """
+    BinaryTrajWriter streams trajectory frames into a binary trajectory file
+
+    It can be used as the writer of MDSimulation. The frames are written through
+    the buffered file object, so each frame is one small memory copy.
+    """
+    def __init__(self, filename, elems, dtype=np.float64, resume=False):
+        """
+        Parameters
+        ----------
+        filename: string
+            Name of the output binary trajectory file
+        elems: list of strings
+            List of elements for all atoms
+        dtype: numpy.dtype
+            Data type of the stored coordinates, float32 or float64
+        resume: bool
+            Open the existing file to continue a run, see set_state()
+        """
+        self.filename = filename
+        self.elems = elems
+        self.dtype = np.dtype(dtype)
+        self.n_frames = 0
+        if resume:
+            self._file = open(filename, 'r+b')
+            self._file.seek(0, 2)
+        else:
+            self._file = open(filename, 'wb')
+            write_binary_header(self._file, elems, self.dtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, coords):
+        """ Add a frame of coordinates to the output """
+        assert len(coords) == len(self.elems)
+        self._file.write(memoryview(np.ascontiguousarray(coords, dtype=self.dtype)))
+        self.n_frames += 1
+
+    def get_state(self):
+        """ Write the buffered frames and return the number of frames and the file position """
+        self.flush()
+        return {'n_frames': self.n_frames, 'position': self._file.tell()}
+
+    def set_state(self, state):
+        """ Continue writing from the state returned by get_state(), the frames after it are removed """
+        self._file.seek(state['position'])
+        self._file.truncate()
+        self.n_frames = int(state['n_frames'])
+
+    def flush(self):
+        """ Write the buffered frames to file """
+        self._file.flush()
+
+    def sync(self):
+        """ Write the buffered frames and make sure they are on disk, e.g. before a checkpoint refers to them """
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """ Write the buffered frames and close the file """
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,261 @@
+"""
+Compressed trajectory format
+
+Coordinates are quantized to integer multiples of a fixed precision and stored as
+the difference to the previous frame, which is small for consecutive MD frames.
+The frames are grouped into chunks, and each chunk is encoded with the smallest
+integer type that holds its values, split into byte planes and compressed with
+zlib or lzma. Each chunk starts from absolute values, so it can be decoded on its
+own, and an index of the chunks at the end of the file gives random access.
+
+The file layout is
+    header: magic, number of atoms, precision, codec, chunk_frames, elements
+    chunks: compressed data of each chunk
+    index: (offset, number of bytes, number of frames, integer size) of each chunk
+    footer: offset of the index, number of chunks, magic
+"""
+
+import lzma
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b'MDTRAJZ1'
+# magic, number of atoms, precision, codec, frames per chunk, number of bytes of the elements
+HEADER_STRUCT = struct.Struct('<8sQd4sQQ')
+# offset of the index, number of chunks, magic
+FOOTER_STRUCT = struct.Struct('<QQ8s')
+CODECS = {
+    b'zlib': (zlib.compress, zlib.decompress),
+    b'lzma': (lzma.compress, lzma.decompress),
+}
+
+def encode_chunk(xyz, precision, codec=b'zlib'):
+    """ Quantize, delta encode and compress a chunk of frames
+
+    Parameters
+    ----------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames in the chunk
+    precision: float
+        The coordinates are rounded to multiples of precision
+    codec: bytes
+        Name of the compressor, b'zlib' or b'lzma'
+
+    Returns
+    -------
+    data: bytes
+        The compressed chunk
+    itemsize: int
+        Number of bytes of the integers in the chunk
+    """
+    quantized = np.rint(np.asarray(xyz, dtype=float) / precision)
+    assert np.abs(quantized).max(initial=0) < 2**62, 'precision too small for the coordinates'
+    quantized = quantized.astype(np.int64)
+    delta = quantized.copy()
+    # the first frame is kept as absolute values, so the chunk is decoded on its own
+    delta[1:] -= quantized[:-1]
+    max_value = np.abs(delta).max(initial=0)
+    itemsize = next(size for size in (1, 2, 4, 8) if max_value < 2**(8*size-1))
+    # group the bytes of the same significance together, which compresses much better
+    byte_planes = delta.astype(f'<i{itemsize}').view(np.uint8).reshape(-1, itemsize).T
+    compress = CODECS[codec][0]
+    return compress(byte_planes.tobytes()), itemsize
+
+def decode_chunk(data, itemsize, n_frames, noa, precision, codec=b'zlib'):
+    """ Decompress a chunk of frames encoded by encode_chunk()
+
+    Returns
+    -------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames in the chunk
+    """
+    decompress = CODECS[codec][1]
+    byte_planes = np.frombuffer(decompress(data), dtype=np.uint8).reshape(itemsize, -1)
+    delta = np.ascontiguousarray(byte_planes.T).view(f'<i{itemsize}').reshape(n_frames, noa, 3)
+    return np.cumsum(delta, axis=0, dtype=np.int64) * precision
+
+class CompressedTrajWriter:
+    """
+    CompressedTrajWriter streams trajectory frames into a compressed trajectory file
+
+    It can be used as the writer of MDSimulation. Frames are collected until a chunk
+    is full, then the chunk is compressed and written. The index is written by close().
+    """
+    def __init__(self, filename, elems, precision=1e-3, chunk_frames=100, codec='zlib', resume=False):
+        """
+        Parameters
+        ----------
+        filename: string
+            Name of the output file
+        elems: list of strings
+            List of elements for all atoms
+        precision: float
+            The coordinates are rounded to multiples of precision
+        chunk_frames: int
+            Number of frames in each independently compressed chunk
+        codec: string
+            Name of the compressor, 'zlib' or 'lzma'
+        resume: bool
+            Open the existing file to continue a run, the position is given by set_state()
+        """
+        assert precision > 0, 'precision should be positive'
+        assert chunk_frames > 0, 'chunk_frames should be positive'
+        self.codec = codec.encode()
+        assert self.codec in CODECS, f'codec should be one of {[c.decode() for c in CODECS]}'
+        self.filename = filename
+        self.elems = elems
+        self.precision = precision
+        self.chunk_frames = chunk_frames
+        self.n_frames = 0
+        self._buffer = np.empty((chunk_frames, len(elems), 3), dtype=float)
+        self._n_buffered = 0
+        # (offset, number of bytes, number of frames, integer size) of each chunk
+        self._index = []
+        if resume:
+            self._file = open(filename, 'r+b')
+            return
+        self._file = open(filename, 'wb')
+        elem_bytes = '\n'.join(elems).encode()
+        self._file.write(HEADER_STRUCT.pack(MAGIC, len(elems), precision, self.codec, chunk_frames, len(elem_bytes)))
+        self._file.write(elem_bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, coords):
+        """ Add a frame of coordinates to the output """
+        assert len(coords) == len(self.elems)
+        self._buffer[self._n_buffered] = coords
+        self._n_buffered += 1
+        self.n_frames += 1
+        if self._n_buffered == self.chunk_frames:
+            self._write_chunk()
+
+    def write_frames(self, xyz):
+        """ Add frames of shape (Nframes, Natoms, 3) to the output, whole chunks are encoded without copy """
+        start = 0
+        # fill the partial chunk in the buffer first
+        while start < len(xyz) and self._n_buffered > 0:
+            self.write_frame(xyz[start])
+            start += 1
+        for start in range(start, len(xyz), self.chunk_frames):
+            chunk = xyz[start:start+self.chunk_frames]
+            if len(chunk) < self.chunk_frames:
+                for coords in chunk:
+                    self.write_frame(coords)
+            else:
+                self._write_chunk(chunk)
+                self.n_frames += len(chunk)
+
+    def get_state(self):
+        """ Return the file position, the chunk index and the frames of the partial chunk """
+        self.flush()
+        return {'n_frames': self.n_frames, 'position': self._file.tell(),
+                'index': np.array(self._index, dtype=np.int64).reshape(-1, 4),
+                'buffer': self._buffer[:self._n_buffered].copy()}
+
+    def set_state(self, state):
+        """ Continue writing from the state returned by get_state(), the chunks after it are removed """
+        self._file.seek(state['position'])
+        self._file.truncate()
+        self.n_frames = int(state['n_frames'])
+        self._index = [tuple(int(v) for v in row) for row in state['index']]
+        self._n_buffered = len(state['buffer'])
+        self._buffer[:self._n_buffered] = state['buffer']
+
+    def flush(self):
+        """ Write the encoded chunks to file, the frames of a partial chunk stay in the buffer """
+        self._file.flush()
+
+    def close(self):
+        """ Write the last chunk and the index, and close the file """
+        if not self._file.closed:
+            if self._n_buffered > 0:
+                self._write_chunk()
+            index_offset = self._file.tell()
+            self._file.write(np.array(self._index, dtype='<i8').reshape(-1, 4).tobytes())
+            self._file.write(FOOTER_STRUCT.pack(index_offset, len(self._index), MAGIC))
+            self._file.close()
+
+    def _write_chunk(self, chunk=None):
+        if chunk is None:
+            chunk = self._buffer[:self._n_buffered]
+            self._n_buffered = 0
+        data, itemsize = encode_chunk(chunk, self.precision, self.codec)
+        self._index.append((self._file.tell(), len(data), len(chunk), itemsize))
+        self._file.write(data)
+
+class CompressedTrajReader:
+    """
+    CompressedTrajReader provides random access to the frames of a compressed trajectory
+
+    reader[k] and reader[a:b] only decompress the chunks holding the requested frames.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            magic, noa, self.precision, self.codec, self.chunk_frames, n_elem_bytes = HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+            assert magic == MAGIC, 'Not a compressed trajectory file'
+            elem_bytes = f.read(n_elem_bytes)
+            self.elems = elem_bytes.decode().split('\n') if noa > 0 else []
+            f.seek(-FOOTER_STRUCT.size, 2)
+            index_offset, n_chunks, magic = FOOTER_STRUCT.unpack(f.read(FOOTER_STRUCT.size))
+            assert magic == MAGIC, 'Compressed trajectory file is not complete'
+            f.seek(index_offset)
+            self.index = np.frombuffer(f.read(n_chunks * 32), dtype='<i8').reshape(n_chunks, 4)
+        # all chunks but the last one hold chunk_frames frames, which locates the chunk of each frame
+        self.n_frames = int(self.index[:, 2].sum())
+
+    @property
+    def noa(self):
+        return len(self.elems)
+
+    def __len__(self):
+        return self.n_frames
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.read_frames(*key.indices(len(self)))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(f'frame {key} out of range')
+        return self.read_frames(key, key + 1)[0]
+
+    def read_frames(self, start, stop, step=1):
+        """ Read frames in range(start, stop, step) into an array of shape (Nframes, Natoms, 3) """
+        frames = range(start, stop, step)
+        if len(frames) == 0:
+            return np.zeros((0, self.noa, 3), dtype=float)
+        first_chunk = min(frames) // self.chunk_frames
+        last_chunk = max(frames) // self.chunk_frames
+        with open(self.filename, 'rb') as f:
+            xyz = np.concatenate([self._read_chunk(f, i) for i in range(first_chunk, last_chunk + 1)])
+        return xyz[frames.start - first_chunk*self.chunk_frames::step][:len(frames)]
+
+    def _read_chunk(self, f, i_chunk):
+        offset, n_bytes, n_frames, itemsize = self.index[i_chunk]
+        f.seek(offset)
+        return decode_chunk(f.read(n_bytes), itemsize, n_frames, self.noa, self.precision, self.codec)
+
+def save_compressed_traj(filename, elems, xyz, precision=1e-3, chunk_frames=100, codec='zlib'):
+    """ Write frames of shape (Nframes, Natoms, 3) into a compressed trajectory file """
+    with CompressedTrajWriter(filename, elems, precision=precision, chunk_frames=chunk_frames, codec=codec) as writer:
+        writer.write_frames(xyz)
+
+def load_compressed_traj(filename):
+    """ Read all frames of a compressed trajectory file
+
+    Returns
+    -------
+    elems: list of strings
+        List of elements for all atoms
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of all frames
+    """
+    reader = CompressedTrajReader(filename)
+    return reader.elems, reader[:]
@@ -0,0 +1,44 @@
+"""
+Formatting of frames in xyz format
+"""
+
+def xyz_frame_template(elems):
+    """ Build the %-format template of one xyz frame
+
+    The elements and the number of atoms are baked into the template, so a frame
+    is formatted by a single % operation on the frame number and the coordinates.
+
+    Parameters
+    ----------
+    elems: list of strings
+        List of elements for all atoms
+
+    Returns
+    -------
+    template: string
+        Template taking the frame number followed by the flattened coordinates
+    """
+    # a literal % in the element names has to be escaped
+    atom_lines = ''.join(f"{e.replace('%', '%%')} %10.7f %10.7f %10.7f\n" for e in elems)
+    return f'{len(elems)}\nFrame%10d\n' + atom_lines
+
+def format_xyz_frames(template, xyz, start=0):
+    """ Format a batch of frames into one string
+
+    Parameters
+    ----------
+    template: string
+        Template of one frame from xyz_frame_template()
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames
+    start: int
+        Frame number of the first frame
+
+    Returns
+    -------
+    text: string
+        The frames in xyz format, the same as formatting each line with f'{x:10.7f}'
+    """
+    # converting to python floats at once is faster than formatting numpy scalars
+    rows = xyz.reshape(len(xyz), xyz.shape[1] * 3).tolist()
+    return ''.join([template % (i, *row) for i, row in enumerate(rows, start)])
@@ -0,0 +1,144 @@
+"""
+Byte offset index of the frames in xyz trajectory files
+"""
+
+import os
+import numpy as np
+from mdsim.io.xyz_reader import CHUNK_SIZE, parse_xyz_bytes
+
+# the sidecar index file is named after the trajectory file
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+
+def build_xyz_index(filename, chunk_size=CHUNK_SIZE):
+    """ Find the byte offset of each frame in one pass over an xyz file
+
+    Parameters
+    ----------
+    filename: string
+        Name of the xyz file
+    chunk_size: int
+        Number of bytes read at a time
+
+    Returns
+    -------
+    noa: int
+        Number of atoms in each frame
+    offsets: numpy.ndarray of shape (Nframes + 1,)
+        Frame k is stored in bytes offsets[k]:offsets[k+1] of the file
+    """
+    with open(filename, 'rb') as f:
+        noa = int(f.readline())
+        f.seek(0)
+        lines_per_frame = noa + 2
+        frame_starts = [np.zeros(1, dtype=np.int64)]
+        n_newlines = 0
+        file_size = 0
+        last_byte = b'\n'
+        for data in iter(lambda: f.read(chunk_size), b''):
+            newline_pos = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+            # a frame starts after every lines_per_frame new lines
+            line_number = n_newlines + np.arange(1, len(newline_pos) + 1)
+            frame_starts.append(file_size + newline_pos[line_number % lines_per_frame == 0] + 1)
+            n_newlines += len(newline_pos)
+            file_size += len(data)
+            last_byte = data[-1:]
+    # the last line may not end with a new line
+    n_lines = n_newlines + (last_byte != b'\n')
+    n_frames = n_lines // lines_per_frame
+    offsets = np.concatenate(frame_starts)[:n_frames+1]
+    if len(offsets) == n_frames:
+        offsets = np.append(offsets, file_size)
+    return noa, offsets
+
+def index_filename(filename):
+    return os.fspath(filename) + INDEX_SUFFIX
+
+def save_xyz_index(filename, noa, offsets):
+    """ Save the index as a sidecar file, stamped with the size and mtime of the xyz file """
+    stat = os.stat(filename)
+    header = np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns, noa], dtype=np.int64)
+    with open(index_filename(filename), 'wb') as f:
+        np.save(f, np.concatenate([header, offsets]))
+
+def load_xyz_index(filename):
+    """ Load the sidecar index of an xyz file
+
+    Returns
+    -------
+    noa, offsets: int, numpy.ndarray
+        The index as in build_xyz_index(), or None if the sidecar file
+        does not exist or does not match the size and mtime of the xyz file
+    """
+    try:
+        with open(index_filename(filename), 'rb') as f:
+            data = np.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(filename)
+    if len(data) < 4 or tuple(data[:3]) != (INDEX_VERSION, stat.st_size, stat.st_mtime_ns):
+        return None
+    return int(data[3]), data[4:]
+
+def get_xyz_index(filename, use_sidecar=True):
+    """ Load the sidecar index of an xyz file, or build and save it if it is missing or stale """
+    index = load_xyz_index(filename) if use_sidecar else None
+    if index is None:
+        index = build_xyz_index(filename)
+        if use_sidecar:
+            try:
+                save_xyz_index(filename, *index)
+            except OSError:
+                # the index still works without the sidecar file, e.g. in a read-only folder
+                pass
+    return index
+
+class XYZReader:
+    """
+    XYZReader provides random access to the frames of an xyz file
+
+    reader[k] reads frame k and reader[a:b] reads a range of frames, each by seeking to
+    the byte offset of the frame, so the cost is proportional to the frames read.
+    """
+    def __init__(self, filename, use_sidecar=True):
+        self.filename = filename
+        self.noa, self.offsets = get_xyz_index(filename, use_sidecar=use_sidecar)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.read_frames(*key.indices(len(self)))
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(f'frame {key} out of range')
+        return self.read_frames(key, key + 1)[0]
+
+    def read_frames(self, start, stop, step=1):
+        """ Read frames in range(start, stop, step) into an array of shape (Nframes, Natoms, 3) """
+        frames = range(start, stop, step)
+        if len(frames) == 0:
+            return np.zeros((0, self.noa, 3), dtype=float)
+        with open(self.filename, 'rb') as f:
+            if step == 1:
+                # the frames are contiguous in the file, read them at once
+                return self._read_range(f, start, stop)
+            return np.concatenate([self._read_range(f, k, k + 1) for k in frames])
+
+    def iter_frames(self, start=0, stop=None, step=1, chunk_frames=256):
+        """ Yield frames in range(start, stop, step) one by one
+
+        Frames are read from the file in chunks of chunk_frames, so only one
+        chunk is held in memory at a time.
+        """
+        frames = range(*slice(start, stop, step).indices(len(self)))
+        for i in range(0, len(frames), chunk_frames):
+            sub_frames = frames[i:i+chunk_frames]
+            yield from self.read_frames(sub_frames.start, sub_frames.stop, sub_frames.step)
+
+    def _read_range(self, f, start, stop):
+        f.seek(self.offsets[start])
+        data = f.read(self.offsets[stop] - self.offsets[start])
+        return parse_xyz_bytes(data, self.noa)
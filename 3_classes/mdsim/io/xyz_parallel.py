@@ -0,0 +1,93 @@
+"""
+Parallel reading of large xyz trajectory files
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from mdsim.io.xyz_reader import parse_xyz_bytes
+from mdsim.io.xyz_index import get_xyz_index
+
+# free space left in shared memory after the result file, for other users of /dev/shm
+SHARED_MEMORY_MARGIN = 1 << 26
+
+def shared_memory_dir(n_bytes):
+    """ The folder of POSIX shared memory if it has room for n_bytes, files there are kept in RAM
+
+    /dev/shm is often small, e.g. 64 MB in a docker container, and writing past its end kills
+    the workers with SIGBUS. None is returned instead, for the default temporary folder.
+    """
+    if not os.path.isdir('/dev/shm'):
+        return None
+    try:
+        free = shutil.disk_usage('/dev/shm').free
+    except OSError:
+        return None
+    return '/dev/shm' if free >= n_bytes + SHARED_MEMORY_MARGIN else None
+
+def parse_xyz_range(filename, result_filename, shape, start, stop, byte_start, byte_stop):
+    """ Parse frames start:stop from a byte range of an xyz file into the shared result array
+
+    This is the task of each worker process. The result array is a memory-mapped file
+    shared by all processes, so the parsed frames are not sent back to the main process.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(byte_start)
+        data = f.read(byte_stop - byte_start)
+    result = np.memmap(result_filename, dtype=float, mode='r+', shape=shape)
+    result[start:stop] = parse_xyz_bytes(data, shape[1])
+    result.flush()
+    del result
+
+def read_xyz_parallel(filename, n_workers=None, n_tasks=None):
+    """ Read all frames of an xyz file with a pool of processes
+
+    The file is split at frame boundaries using the byte offset index, and each worker
+    parses its byte range into a shared memory array. The main process maps the same
+    array, so the result is assembled without copying. If /dev/shm is too small for the
+    result, the array is a file in the default temporary folder instead.
+
+    Parameters
+    ----------
+    filename: string
+        Name of the xyz file
+    n_workers: int
+        Number of worker processes, default is the number of CPUs
+    n_tasks: int
+        Number of byte ranges the file is split into, default is 4 per worker
+
+    Returns
+    -------
+    xyz: numpy.memmap of shape (Nframes, Natoms, 3)
+        Coordinates of all frames
+    """
+    noa, offsets = get_xyz_index(filename)
+    shape = (len(offsets) - 1, noa, 3)
+    if shape[0] == 0 or noa == 0:
+        return np.zeros(shape, dtype=float)
+    n_workers = n_workers or os.cpu_count()
+    n_tasks = min(n_tasks or 4 * n_workers, shape[0])
+    # allocate the result in shared memory, or in a temporary file if it does not fit
+    n_bytes = shape[0] * noa * 3 * np.dtype(float).itemsize
+    fd, result_filename = tempfile.mkstemp(suffix='.xyz.npy', dir=shared_memory_dir(n_bytes))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(n_bytes)
+        # split the frames into contiguous ranges with about the same number of frames
+        bounds = np.linspace(0, shape[0], n_tasks + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(parse_xyz_range, filename, result_filename, shape, start, stop,
+                                       int(offsets[start]), int(offsets[stop]))
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            for future in futures:
+                future.result()
+        xyz = np.memmap(result_filename, dtype=float, mode='r+', shape=shape)
+    finally:
+        # the mapping stays valid after the file is removed
+        try:
+            os.remove(result_filename)
+        except OSError:
+            pass
+    return xyz
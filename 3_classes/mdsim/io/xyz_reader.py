@@ -0,0 +1,232 @@
+"""
+Vectorized reading of xyz trajectory files
+"""
+
+import numpy as np
+
+# number of bytes read at a time
+CHUNK_SIZE = 1 << 24
+# number of atom lines parsed at a time, so the intermediate arrays stay in the CPU cache
+BLOCK_LINES = 4096
+
+NEWLINE, MINUS, POINT = b'\n-.'
+
+def parse_xyz_bytes(data, noa):
+    """ Parse the bytes of whole xyz frames into coordinates in one vectorized pass
+
+    The two header lines of each frame are dropped by their byte offsets, and the
+    coordinates in fixed-width columns are parsed by parse_fixed_columns() on the whole
+    buffer. Numbers in other formats, e.g. with exponents, are converted by the C parser
+    of numpy instead.
+
+    Parameters
+    ----------
+    data: bytes
+        The frames in xyz format, each frame has noa + 2 lines, the last line may not end with a new line
+    noa: int
+        Number of atoms in each frame
+
+    Returns
+    -------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buffer == NEWLINE)
+    if len(buffer) > 0 and buffer[-1] != NEWLINE:
+        line_ends = np.append(line_ends, len(buffer))
+    return _parse_xyz_frames(buffer, line_ends, noa)
+
+def _parse_xyz_frames(buffer, line_ends, noa):
+    """ Parse the whole frames in the bytes of buffer, given the end of each line """
+    lines_per_frame = noa + 2
+    n_frames = len(line_ends) // lines_per_frame
+    if n_frames == 0 or noa == 0:
+        return np.zeros((n_frames, noa, 3), dtype=float)
+    line_ends = line_ends[:n_frames*lines_per_frame].reshape(n_frames, lines_per_frame)
+    # each atom line starts after the end of the previous line
+    atom_starts = line_ends[:, 1:-1] + 1
+    atom_ends = line_ends[:, 2:]
+    xyz = parse_fixed_columns(buffer[:atom_ends[-1, -1]], atom_starts, atom_ends)
+    if xyz is None:
+        data = buffer.tobytes()
+        atom_lines = [data[start:end] for start, end in zip(atom_starts.ravel().tolist(), atom_ends.ravel().tolist())]
+        xyz = np.loadtxt(atom_lines, usecols=(1, 2, 3), comments=None, ndmin=2)
+    return xyz.reshape(n_frames, noa, 3)
+
+def parse_fixed_columns(buffer, line_starts, line_ends):
+    """ Parse the 3 coordinates at the end of each atom line in fixed-width columns, e.g. written by ' %10.7f'
+
+    The columns are found in the first line. The last bytes of each line are gathered into
+    a matrix, which is checked column by column for the spaces, the optional minus sign, the
+    digits and the point of each number, and the digits of all numbers are combined by one
+    matrix product. The integer of the digits and the power of 10 dividing it are both exact
+    in double precision, so the numbers are converted exactly as by float().
+
+    Parameters
+    ----------
+    buffer: numpy.ndarray of uint8
+        Bytes of the frames
+    line_starts, line_ends: numpy.ndarray of int with shape (Nframes, Natoms)
+        Byte offsets of the start and the end of each atom line
+
+    Returns
+    -------
+    xyz: numpy.ndarray of shape (Nframes * Natoms, 3) or None
+        The coordinates, or None if the lines are not in the same fixed-width columns
+    """
+    columns = _fixed_columns(buffer[line_starts[0, 0]:line_ends[0, 0]].tobytes())
+    if columns is None:
+        return None
+    width, n_int, n_frac, n_after = columns
+    # the points in the atom lines are only the 3 in the columns
+    n_points = np.count_nonzero(buffer == POINT)
+    if n_points != 3 * line_ends.size:
+        # drop the points in the header lines
+        points = np.flatnonzero(buffer == POINT)
+        n_points = np.sum(np.searchsorted(points, line_ends[:, -1]) - np.searchsorted(points, line_starts[:, 0]))
+        if n_points != 3 * line_ends.size:
+            return None
+    # the tail of each line has the 3 columns, each with a separator, n_int - 2 middle bytes
+    # of spaces, an optional minus sign and digits, a digit, the point and n_frac digits
+    n_tail = 3 * width + n_after
+    n_middle = n_int - 2
+    line_starts, line_ends = line_starts.ravel(), line_ends.ravel()
+    # each line has an element before the columns
+    if np.min(line_ends - line_starts) <= n_tail:
+        return None
+    # the lowest byte and the range of each byte of the tail, spaces up to ' ' by default,
+    # and the decimal weight of each digit
+    lowest = np.zeros(n_tail, dtype=int)
+    span = np.full(n_tail, ord(' '), dtype=np.uint8)
+    weights = np.zeros((n_tail, 3))
+    for i in range(3):
+        point = i * width + n_int
+        lowest[point-n_int+1:point+1+n_frac] = ord('0')
+        span[point-n_int+1:point+1+n_frac] = 9
+        # the middle bytes are checked again below
+        lowest[point-n_int+1:point-1] = 0
+        span[point-n_int+1:point-1] = ord('9')
+        lowest[point] = POINT
+        span[point] = 0
+        weights[point-n_int+1:point, i] = 10.0 ** np.arange(n_int - 2 + n_frac, n_frac - 1, -1)
+        weights[point+1:point+1+n_frac, i] = 10.0 ** np.arange(n_frac - 1, -1, -1)
+    # the bytes are checked after subtracting '0', which wraps the bytes below '0' around to 208-255
+    zero = ord('0')
+    lowest = np.tile((lowest - zero) % 256, BLOCK_LINES).astype(np.uint8)
+    span = np.tile(span, BLOCK_LINES)
+    space, minus = np.uint8(ord(' ') - zero + 256), np.uint8(MINUS - zero + 256)
+    scale = 10.0 ** n_frac
+    tails = np.ndarray((len(buffer) - n_tail + 1,), dtype=f'V{n_tail}', buffer=buffer, strides=(1,))
+    xyz = np.empty((len(line_ends), 3))
+    for start in range(0, len(line_ends), BLOCK_LINES):
+        block = tails[line_ends[start:start+BLOCK_LINES] - n_tail].view(np.uint8).reshape(-1, n_tail)
+        digits = block.ravel() - np.uint8(zero)
+        size = digits.size
+        checked = digits - lowest[:size]
+        if not np.all(checked <= span[:size]):
+            return None
+        # the few middle bytes are copied, so they are checked faster
+        middle = np.ndarray((len(block), 3, n_middle), dtype=np.uint8, buffer=digits, offset=1, strides=(n_tail, width, 1))
+        middle_copy = middle.copy()
+        is_minus = middle_copy == minus
+        # the middle bytes above '9' are only spaces and minus signs
+        if np.any((middle_copy > space) ^ is_minus):
+            return None
+        is_digit = middle_copy < 10
+        # spaces, then an optional minus sign, then digits
+        if n_middle > 1 and np.any((is_digit[..., :-1] | is_minus[..., :-1]) > is_digit[..., 1:]):
+            return None
+        middle_copy *= is_digit
+        middle[...] = middle_copy
+        signed_scale = np.any(is_minus, axis=2) * (-2 * scale)
+        signed_scale += scale
+        np.divide(digits.reshape(-1, n_tail) @ weights, signed_scale, out=xyz[start:start+BLOCK_LINES])
+    return xyz
+
+def _fixed_columns(line):
+    """ Width, bytes before and after the point of the 3 columns at the end of the line, and bytes after them """
+    points = [i for i, byte in enumerate(line) if byte == POINT]
+    if len(points) != 3:
+        return None
+    n_frac = [len(line) - i - 1 - len(line[i+1:].lstrip(b'0123456789')) for i in points]
+    width = points[1] - points[0]
+    n_int = width - n_frac[0] - 1
+    # at most 14 digits, so the integer of all digits is exact in double precision
+    if not (points[2] - points[1] == width and n_frac[0] == n_frac[1] == n_frac[2] <= 7 and 2 <= n_int <= 8):
+        return None
+    return width, n_int, n_frac[0], len(line) - points[2] - 1 - n_frac[0]
+
+def parse_xyz_lines(lines, noa):
+    """ Parse the lines of whole xyz frames into coordinates with parse_xyz_bytes()
+
+    Parameters
+    ----------
+    lines: list of bytes or strings
+        Lines of the frames, each frame has noa + 2 lines
+    noa: int
+        Number of atoms in each frame
+
+    Returns
+    -------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames
+    """
+    lines = [line.encode() if isinstance(line, str) else line for line in lines]
+    return parse_xyz_bytes(b'\n'.join(line.rstrip(b'\r\n') for line in lines), noa)
+
+def iter_xyz_blocks(filename, chunk_size=CHUNK_SIZE):
+    """ Read an xyz file in large chunks and yield the coordinates of the whole frames in each
+
+    Parameters
+    ----------
+    filename: string
+        Name of the xyz file
+    chunk_size: int
+        Number of bytes read at a time
+
+    Yields
+    ------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of the frames completed in each chunk
+    """
+    with open(filename, 'rb') as f:
+        noa = int(f.readline())
+        f.seek(0)
+        lines_per_frame = noa + 2
+        rest = b''
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            line_ends = np.flatnonzero(buffer == NEWLINE)
+            # the lines after the last whole frame are kept for the next chunk
+            n_lines = len(line_ends) - len(line_ends) % lines_per_frame
+            if n_lines > 0:
+                yield _parse_xyz_frames(buffer, line_ends[:n_lines], noa)
+                data = data[line_ends[n_lines-1]+1:]
+            rest = data
+        # the last frame may not end with a new line
+        if rest:
+            xyz = parse_xyz_bytes(rest, noa)
+            if len(xyz) > 0:
+                yield xyz
+
+def read_xyz_coords(filename, chunk_size=CHUNK_SIZE):
+    """ Read all frames of an xyz file
+
+    Returns
+    -------
+    xyz: numpy.ndarray of shape (Nframes, Natoms, 3)
+        Coordinates of all frames
+    """
+    with open(filename, 'rb') as f:
+        noa = int(f.readline())
+    blocks = list(iter_xyz_blocks(filename, chunk_size=chunk_size))
+    if not blocks:
+        return np.zeros((0, noa, 3), dtype=float)
+    if len(blocks) == 1:
+        return blocks[0]
+    return np.concatenate(blocks)
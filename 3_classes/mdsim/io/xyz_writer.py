@@ -0,0 +1,90 @@
+"""
+The XYZWriter Class
+"""
+
+import numpy as np
+from mdsim.io.xyz_format import xyz_frame_template, format_xyz_frames
+
+class XYZWriter:
+    """
+    XYZWriter streams trajectory frames into an xyz file while the simulation runs
+
+    Frames are copied into a buffer, and every buffer_frames frames the whole buffer
+    is formatted at once and written with a single call, so the memory usage does not
+    grow with the run length. The output is the same as MDTrajectory.save_xyz().
+    """
+    def __init__(self, filename, elems, buffer_frames=100, resume=False):
+        """
+        Parameters
+        ----------
+        filename: string
+            Name of the output xyz file
+        elems: list of strings
+            List of elements for all atoms
+        buffer_frames: int
+            Number of frames kept in the buffer before writing to file
+        resume: bool
+            Open the existing file to continue a run, see set_state()
+        """
+        assert buffer_frames > 0, 'buffer_frames should be positive'
+        self.filename = filename
+        self.elems = elems
+        self.buffer_frames = buffer_frames
+        # number of frames written, including the ones in the buffer
+        self.n_frames = 0
+        self._template = xyz_frame_template(elems)
+        self._buffer = np.empty((buffer_frames, len(elems), 3), dtype=float)
+        # number of frames in the buffer
+        self._n_buffered = 0
+        if resume:
+            self._file = open(filename, 'r+')
+            self._file.seek(0, 2)
+        else:
+            self._file = open(filename, 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_frame(self, coords):
+        """ Add a frame of coordinates to the output
+
+        Parameters
+        ----------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Numpy array of atomic coordinates
+        """
+        assert len(coords) == len(self.elems)
+        self._buffer[self._n_buffered] = coords
+        self._n_buffered += 1
+        self.n_frames += 1
+        if self._n_buffered == self.buffer_frames:
+            self.flush()
+
+    def get_state(self):
+        """ Write the buffered frames and return the number of frames and the file position """
+        self.flush()
+        return {'n_frames': self.n_frames, 'position': self._file.tell()}
+
+    def set_state(self, state):
+        """ Continue writing from the state returned by get_state(), the frames after it are removed """
+        self._n_buffered = 0
+        self._file.seek(state['position'])
+        self._file.truncate()
+        self.n_frames = int(state['n_frames'])
+
+    def flush(self):
+        """ Write the buffered frames to file """
+        if self._n_buffered > 0:
+            start = self.n_frames - self._n_buffered
+            self._file.write(format_xyz_frames(self._template, self._buffer[:self._n_buffered], start))
+            self._n_buffered = 0
+        self._file.flush()
+
+    def close(self):
+        """ Write the buffered frames and close the file """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
@@ -0,0 +1,83 @@
+"""
+The MDEnsembleSimulation Class
+"""
+
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import MDForce
+from mdsim.integrator import MDIntegrator
+from mdsim.md_trajectory import MDTrajectory
+
+class MDEnsembleSimulation:
+    """
+    The MDEnsembleSimulation class advances independent replicas of the same system together
+
+    The coordinates of all replicas are stacked into one (Nreplicas, Natoms, 3) array, so the
+    force and the integration of each step are computed for all replicas in single numpy calls.
+    The force should support a batch of coordinates, e.g. LJForce with the 'dense' or 'half' kernel.
+    Per-replica force parameters can be set as arrays, e.g. ff.set_params(sigma=[0.9, 1.0]).
+    The element types and the periodic box, which the replicas should share, are given by
+    set_types() and set_box() to ff and to the forces of the integrator, so forces without a
+    box support fail.
+    """
+    @property
+    def trajectories(self):
+        return self._trajs
+
+    @property
+    def current_step(self):
+        return self._step
+
+    @property
+    def n_replicas(self):
+        return len(self.coords)
+
+    @property
+    def molecules(self):
+        """ The molecule of each replica with its current coordinates """
+        for molecule, coords in zip(self._molecules, self.coords):
+            molecule.set_coords(coords)
+        return self._molecules
+
+    def __init__(self, molecules, ff, integrator, interval=100, verbose=False):
+        assert len(molecules) > 0, 'At least one replica is required'
+        assert all(isinstance(m, Molecule) for m in molecules)
+        assert all(m.elems == molecules[0].elems for m in molecules), 'All replicas should have the same elements'
+        assert all(np.array_equal(m.box, molecules[0].box) for m in molecules), 'All replicas should have the same box'
+        assert isinstance(ff, MDForce)
+        assert isinstance(integrator, MDIntegrator)
+        self._molecules = [m.copy() for m in molecules]
+        self.coords = np.array([m.coords for m in molecules], dtype=float)
+        self.masses = molecules[0].masses
+        self.ff = ff
+        self.integrator = integrator
+        for force in [ff] + integrator.forces():
+            # the element types for per-element force parameters
+            force.set_types(molecules[0].elem_idx)
+            if molecules[0].box is not None:
+                force.set_box(molecules[0].box)
+        self.interval = interval
+        self.verbose = verbose
+        self._trajs = [MDTrajectory(m.elems) for m in self._molecules]
+        self._step = 0
+
+    def step(self, n_steps):
+        """ Run simulation of all replicas for n_steps """
+        # allocate the trajectory buffers for the frames of this run
+        n_frames = len(range(-(-self._step // self.interval) * self.interval, self._step + n_steps, self.interval))
+        for traj in self._trajs:
+            traj.reserve(len(traj) + n_frames)
+        for _ in range(n_steps):
+            force = self.ff.compute_force(self.coords)
+            if getattr(self.integrator, 'inplace', False):
+                self.integrator.integrate_coords_inplace(self.coords, force, self.masses)
+            else:
+                self.coords = self.integrator.integrate_coords(self.coords, force, self.masses)
+            if self._step % self.interval == 0:
+                for traj, molecule in zip(self._trajs, self.molecules):
+                    traj.add_frame(molecule)
+                # print verbose information
+                if self.verbose:
+                    print(f"step {self._step:15d}")
+            # increment step count
+            self._step += 1
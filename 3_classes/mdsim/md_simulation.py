@@ -2,14 +2,53 @@
 The MDSimulation Class
 """
 
+import os
 import numpy as np
 from mdsim.molecule import Molecule
 from mdsim.force import MDForce
 from mdsim.integrator import MDIntegrator
 from mdsim.md_trajectory import MDTrajectory
+from mdsim.checkpoint import save_checkpoint, load_checkpoint
+from mdsim.io.binary_traj import BinaryTrajWriter, load_binary_traj
 
 class MDSimulation:
-    """ The MDSimulation class wrapps other modules and carry out simulations """
+    """ The MDSimulation class wrapps other modules and carry out simulations
+
+    Every interval steps a frame is added to self.trajectory if keep_frames is True,
+    and written to writer if a writer is given, e.g. mdsim.io.XYZWriter. With record_time,
+    frames are recorded at the simulated times record_time, 2 x record_time, ... instead,
+    which suits integrators with an adaptive time step: their steps are shortened to land
+    on these times. run() runs for a simulated time instead of a number of steps.
+    With keep_frames=False and a writer, frames are streamed to disk and the memory
+    usage stays constant regardless of the run length.
+
+    Stop conditions given to step() are called with the simulation after every step,
+    and the run ends as soon as one of them returns True, e.g. mdsim.break_detector.BreakDetector.
+
+    With log_observables=True, the force of every interval-th step is computed by
+    ff.compute_energy_force(), and the potential energy and virial of the coordinates at
+    the start of the step are appended to self.observables with no second pass over pairs.
+    The kinetic energy is logged too if the integrator computes it, e.g. VelocityVerletIntegrator.
+
+    The element types of the atoms are given by set_types() to ff and to the forces computed by
+    the integrator, e.g. the slow forces of RESPAIntegrator, for per-element parameters. If the
+    molecule has a periodic box, it is given to the same forces by set_box(), and a force that
+    does not support a box fails. The coordinates are not wrapped into the box, so the
+    trajectory is continuous.
+
+    The simulation advances its own copy of the molecule, so the molecule given to it is
+    never changed, also with an in-place integrator. The force of each step is written into
+    a preallocated buffer by ff.compute_force(coords, out=), so with an in-place integrator
+    the step loop only allocates the temporary pair arrays of the force kernels. The steps
+    logging observables use ff.compute_energy_force(), which returns a new force array.
+
+    With a checkpoint_file, the state is saved every checkpoint_interval steps, and
+    restore() on a simulation built with the same kinds of objects resumes the run
+    bit for bit. A writer is restored too, it should be created with resume=True.
+    The frames kept in memory are appended to the binary trajectory checkpoint_file.frames
+    next to the checkpoint, and the checkpoint only holds their number, so the cost of a
+    checkpoint does not grow with the length of the run.
+    """
     @property
     def trajectory(self):
         return self._traj
@@ -18,28 +57,250 @@ class MDSimulation:
     def current_step(self):
         return self._step
 
-    def __init__(self, molecule, ff, integrator, interval=100, verbose=False):
+    def __init__(self, molecule, ff, integrator, interval=100, verbose=False, writer=None, keep_frames=True,
+                 checkpoint_file=None, checkpoint_interval=10000, log_observables=False, record_time=None):
         assert isinstance(molecule, Molecule)
         assert isinstance(ff, MDForce)
         assert isinstance(integrator, MDIntegrator)
-        self.molecule = molecule
+        # validate the molecule once here, the step loop uses the unchecked setters
+        assert np.shape(molecule.coords) == (molecule.noa, 3), 'molecule coordinates are not set'
+        self.molecule = molecule.copy()
+        # the force of each step is written into this buffer
+        self._force = np.empty((molecule.noa, 3), dtype=float)
         self.ff = ff
         self.integrator = integrator
+        self.set_types(molecule.elem_idx)
+        if molecule.box is not None:
+            self.set_box(molecule.box)
         self.interval = interval
         self.verbose = verbose
+        self.writer = writer
+        self.keep_frames = keep_frames
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.log_observables = log_observables
+        assert record_time is None or record_time > 0, 'record_time should be positive'
+        self.record_time = record_time
+        # simulated time and the time of the next frame
+        self.time = 0.0
+        self._next_record_time = record_time
+        self.observables = {'step': [], 'potential_energy': [], 'kinetic_energy': [], 'virial': []}
         self._traj = MDTrajectory(molecule.elems)
         self._step = 0
+        # the step where the last run was ended by a stop condition
+        self.stop_step = None
+        # the sidecar file of the frames in the checkpoints
+        self._frames_writer = None
+
+    def step(self, n_steps, stop_conditions=()):
+        """ Run simulation for n_steps
+
+        Parameters
+        ----------
+        n_steps: int
+            Number of steps to run
+        stop_conditions: list of callables
+            Each is called as condition(self) after every step, the run stops
+            after the first step where one of them returns True
+
+        Returns
+        -------
+        stop_step: int
+            The step where a stop condition was met, or None if all n_steps were run
+        """
+        # allocate the trajectory buffer for the frames of this run
+        if self.keep_frames and self.record_time is None:
+            n_frames = len(range(-(-self._step // self.interval) * self.interval, self._step + n_steps, self.interval))
+            self._traj.reserve(len(self._traj) + n_frames)
+        return self._run(n_steps, None, stop_conditions)
+
+    def run(self, duration, stop_conditions=()):
+        """ Run simulation for a simulated time
+
+        With an adaptive integrator the last step is shortened to end at the time,
+        otherwise the run ends with the first step reaching it.
+
+        Parameters
+        ----------
+        duration: float
+            Simulated time to run
+        stop_conditions: list of callables
+            As in step()
+
+        Returns
+        -------
+        stop_step: int
+            The step where a stop condition was met, or None if the whole time was run
+        """
+        end_time = self.time + duration
+        if self.keep_frames and self.record_time is not None:
+            n_frames = int((end_time - self._next_record_time) // self.record_time) + 1
+            self._traj.reserve(len(self._traj) + max(n_frames, 0))
+        return self._run(None, end_time, stop_conditions)
 
-    def step(self, n_steps):
-        """ Run simulation for n_steps """
-        for _ in range(n_steps):
-            force = self.ff.compute_force(self.molecule.coords)
-            self.molecule.set_force(force)
+    def _reached(self, time):
+        """ Check if the simulated time has reached time, up to rounding errors """
+        return self.time >= time - 1e-9 * self.integrator.t_step
+
+    def _run(self, n_steps, end_time, stop_conditions):
+        """ Run simulation for n_steps or until end_time, None for no limit """
+        self.stop_step = None
+        i_step = 0
+        while (n_steps is None or i_step < n_steps) and (end_time is None or not self._reached(end_time)):
+            i_step += 1
+            if self.integrator.adaptive is not None:
+                # land on the time of the next frame and the end of the run
+                limits = [t - self.time for t in (self._next_record_time, end_time) if t is not None]
+                self.integrator.t_step_limit = min(limits) if limits else None
+            log_step = self.log_observables and self._step % self.interval == 0
+            if log_step:
+                energy, force, virial = self.ff.compute_energy_force(self.molecule.coords)
+            else:
+                force = self.ff.compute_force(self.molecule.coords, out=self._force)
+            self.molecule.set_force_unchecked(force)
             self.molecule = self.integrator.integrate(self.molecule)
-            if self._step % self.interval == 0:
-                self._traj.add_frame(self.molecule)
+            # the step used by the integrator
+            self.time += self.integrator.t_step
+            if log_step:
+                self.observables['step'].append(self._step)
+                self.observables['potential_energy'].append(energy)
+                # the kinetic energy at the start of the step, computed by the integrator
+                self.observables['kinetic_energy'].append(getattr(self.integrator, 'kinetic_energy', np.nan))
+                self.observables['virial'].append(virial)
+            if self.record_frame():
+                if self.keep_frames:
+                    self._traj.add_frame(self.molecule)
+                if self.writer is not None:
+                    self.writer.write_frame(self.molecule.coords)
                 # print verbose information
-                if self.verbose:
+                if self.verbose and self.log_observables:
+                    print(f"step {self._step:15d} potential energy {self.observables['potential_energy'][-1]:15.6f}")
+                elif self.verbose:
                     print(f"step {self._step:15d}")
+            # every condition is called, so incremental ones see all steps
+            if any([condition(self) for condition in stop_conditions]):
+                self.stop_step = self._step
             # increment step count
             self._step += 1
+            if self.checkpoint_file is not None and self._step % self.checkpoint_interval == 0:
+                self.save_checkpoint(self.checkpoint_file)
+            if self.stop_step is not None:
+                if self.verbose:
+                    print(f"stopped at step {self.stop_step}")
+                break
+        return self.stop_step
+
+    def record_frame(self):
+        """ Check if a frame is recorded after the current step, and move to the next record time """
+        if self.record_time is None:
+            return self._step % self.interval == 0
+        if not self._reached(self._next_record_time):
+            return False
+        # remove the rounding errors of the landing step
+        if abs(self.time - self._next_record_time) <= 1e-9 * self.integrator.t_step:
+            self.time = self._next_record_time
+        # the next record time is computed from its index, so rounding errors do not add up
+        n_records = int(self.time / self.record_time + 1e-9) + 1
+        self._next_record_time = n_records * self.record_time
+        return True
+
+    def set_types(self, types):
+        """ Give the element types of the atoms to ff and to the forces of the integrator """
+        for force in [self.ff] + self.integrator.forces():
+            force.set_types(types)
+
+    def set_box(self, box):
+        """ Give the periodic box to ff and to the forces of the integrator """
+        for force in [self.ff] + self.integrator.forces():
+            force.set_box(box)
+
+    def get_state(self):
+        """ Return the state of the simulation and all its parts as a nested dict """
+        state = {
+            'step': self._step,
+            'time': self.time,
+            'next_record_time': self._next_record_time,
+            # the force is recomputed from the coordinates at the start of each step
+            'molecule': {
+                'elems': np.array(self.molecule.elems),
+                'coords': self.molecule.coords,
+                'box': self.molecule.box,
+            },
+            'integrator': self.integrator.get_state(),
+            'ff': self.ff.get_state(),
+            'observables': {
+                'step': np.array(self.observables['step'], dtype=np.int64),
+                'potential_energy': np.array(self.observables['potential_energy'], dtype=float),
+                'kinetic_energy': np.array(self.observables['kinetic_energy'], dtype=float),
+                'virial': np.array(self.observables['virial'], dtype=float).reshape(-1, 3, 3),
+            },
+        }
+        if self.keep_frames:
+            state['trajectory'] = self._traj.xyz
+        if self.writer is not None:
+            state['writer'] = self.writer.get_state()
+        return state
+
+    def set_state(self, state):
+        """ Restore the state returned by get_state() """
+        self._step = int(state['step'])
+        self.time = state['time']
+        self._next_record_time = state.get('next_record_time')
+        self.molecule.set_elems(state['molecule']['elems'].tolist())
+        self.set_types(self.molecule.elem_idx)
+        self.molecule.set_coords(state['molecule']['coords'])
+        self._force = np.empty((self.molecule.noa, 3), dtype=float)
+        self.molecule.set_box(state['molecule'].get('box'))
+        # the box is set first, since it resets the neighbor lists restored by set_state()
+        if self.molecule.box is not None:
+            self.set_box(self.molecule.box)
+        self.integrator.set_state(state['integrator'])
+        self.ff.set_state(state['ff'])
+        self.observables = {key: list(value) for key, value in state['observables'].items()}
+        self._traj = MDTrajectory(self.molecule.elems)
+        if 'trajectory' in state:
+            self._traj.set_xyz(state['trajectory'])
+        # the frames may no longer match the sidecar file of the checkpoints
+        self._close_frames_writer()
+        if self.writer is not None:
+            self.writer.set_state(state['writer'])
+
+    def save_checkpoint(self, filename):
+        """ Write the state of the simulation atomically into a checkpoint file
+
+        The frames in memory are not part of the checkpoint file, only the frames added since
+        the last checkpoint are appended to the sidecar file filename.frames.
+        """
+        state = self.get_state()
+        if self.keep_frames:
+            frames_filename = os.fspath(filename) + '.frames'
+            if self._frames_writer is None or self._frames_writer.filename != frames_filename:
+                self._close_frames_writer()
+                self._frames_writer = BinaryTrajWriter(frames_filename, self.molecule.elems)
+            for coords in state.pop('trajectory')[self._frames_writer.n_frames:]:
+                self._frames_writer.write_frame(coords)
+            # the frames are on disk before the checkpoint refers to them
+            self._frames_writer.sync()
+            state['frames'] = self._frames_writer.get_state()
+        save_checkpoint(filename, state)
+
+    def restore(self, filename):
+        """ Resume the simulation from a checkpoint file written by save_checkpoint() """
+        state = load_checkpoint(filename)
+        frames_filename = os.fspath(filename) + '.frames'
+        if 'frames' in state:
+            # the sidecar file may hold frames written after the checkpoint, before a crash
+            n_frames = int(state['frames']['n_frames'])
+            xyz = load_binary_traj(frames_filename)[1]
+            assert len(xyz) >= n_frames, f'{frames_filename} has fewer frames than the checkpoint'
+            state['trajectory'] = xyz[:n_frames]
+        self.set_state(state)
+        if 'frames' in state:
+            # continue the sidecar file after the frames of the checkpoint
+            self._frames_writer = BinaryTrajWriter(frames_filename, self.molecule.elems, resume=True)
+            self._frames_writer.set_state(state['frames'])
+
+    def _close_frames_writer(self):
+        if self._frames_writer is not None:
+            self._frames_writer.close()
+            self._frames_writer = None
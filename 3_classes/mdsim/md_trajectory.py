@@ -2,8 +2,15 @@
 The MDTrajectory Class
 """
 
+import os
 import numpy as np
 from mdsim.molecule import Molecule
+from mdsim.io.binary_traj import write_binary_header, write_binary_frames, load_binary_traj
+from mdsim.io.xyz_reader import CHUNK_SIZE, iter_xyz_blocks, parse_xyz_lines
+from mdsim.io.xyz_index import XYZReader
+from mdsim.io.xyz_parallel import read_xyz_parallel
+from mdsim.io.xyz_format import xyz_frame_template, format_xyz_frames
+from mdsim.io.compressed_traj import CompressedTrajReader, save_compressed_traj
 
 class MDTrajectory:
     """
@@ -12,7 +19,10 @@ class MDTrajectory:
     """
     @property
     def xyz(self):
-        return np.array(self._xyz, dtype=float)
+        """ Read-only view of the frames in the buffer, no copy is made """
+        xyz = self._xyz[:self._n_frames]
+        xyz.flags.writeable = False
+        return xyz
 
     @property
     def noa(self):
@@ -20,14 +30,46 @@ class MDTrajectory:
 
     @property
     def length(self):
+        return self._n_frames
+
+    @property
+    def capacity(self):
         return len(self._xyz)
 
     def __len__(self):
-        return len(self._xyz)
+        return self._n_frames
 
-    def __init__(self, elems):
-        self._xyz = []
+    def __init__(self, elems, n_frames=0):
+        """
+        Parameters
+        ----------
+        elems: list of strings
+            List of elements for all atoms
+        n_frames: int
+            Number of frames to allocate in the buffer in advance
+        """
         self.elems = elems
+        # frames are stored in a contiguous buffer, the first self._n_frames are used
+        self._xyz = np.empty((n_frames, len(elems), 3), dtype=float)
+        self._n_frames = 0
+
+    def reserve(self, n_frames):
+        """ Make sure the buffer can hold n_frames without reallocation
+
+        The buffer grows at least to twice its capacity, so callers reserving a few more
+        frames at a time, e.g. MDSimulation.step() in a loop, cost amortized O(1) per frame.
+        """
+        if n_frames > self.capacity:
+            new_xyz = np.empty((max(n_frames, 2 * self.capacity), self.noa, 3), dtype=float)
+            new_xyz[:self._n_frames] = self._xyz[:self._n_frames]
+            self._xyz = new_xyz
+
+    def set_xyz(self, xyz):
+        """ Replace the frames with a copy of xyz of shape (Nframes, Natoms, 3) """
+        xyz = np.array(xyz, dtype=float)
+        assert xyz.shape[1:] == (self.noa, 3)
+        self._xyz = xyz
+        self._n_frames = len(xyz)
 
     def add_frame(self, molecule):
         """ Add a frame in trajectory
@@ -39,45 +81,143 @@ class MDTrajectory:
         """
         assert isinstance(molecule, Molecule)
         assert np.array_equal(self.elems, molecule.elems), f'{self.elems} != {molecule.elems}'
-        self._xyz.append(molecule.coords.copy())
-
-    def load_xyz(self, filename):
-        """ Read the xyz file as a trajectory """
-        # load all lines at once
-        with open(filename) as f:
-            lines = f.readlines()
-        n_lines = len(lines)
-        self._xyz = []
-        # read the number of atoms from first line
-        noa = int(lines[0])
-        lines_per_frame = noa + 2
-        # read the frames
-        for i_frame in range(int(n_lines / lines_per_frame)):
-            frame_lines = lines[i_frame*lines_per_frame:(i_frame+1)*lines_per_frame]
-            frame_coords = self.parse_xyz_frame(frame_lines)
-            self._xyz.append(frame_coords)
+        if self._n_frames == self.capacity:
+            # grow geometrically so adding frames costs amortized O(1)
+            self.reserve(max(2 * self.capacity, 16))
+        self._xyz[self._n_frames] = molecule.coords
+        self._n_frames += 1
+
+    def load_xyz(self, filename, frames=None, n_workers=1):
+        """ Read the xyz file as a trajectory
+
+        Parameters
+        ----------
+        filename: string
+            Name of the xyz file
+        frames: int or slice
+            Only read these frames, found through the byte offset index of the file
+        n_workers: int
+            Number of processes parsing the file in parallel, None for the number of CPUs
+        """
+        if frames is None and n_workers != 1:
+            # the frames are parsed into shared memory, which becomes the buffer
+            self._xyz = read_xyz_parallel(filename, n_workers=n_workers)
+            self._n_frames = len(self._xyz)
+            return
+        if frames is not None:
+            reader = XYZReader(filename)
+            xyz = reader[frames] if isinstance(frames, slice) else reader[frames][np.newaxis]
+            self._xyz = np.ascontiguousarray(xyz)
+            self._n_frames = len(xyz)
+            return
+        file_size = os.path.getsize(filename)
+        self._n_frames = 0
+        for block in iter_xyz_blocks(filename, chunk_size=CHUNK_SIZE):
+            if self._n_frames == 0:
+                # estimate the number of frames from the first chunk to allocate the buffer once
+                self._xyz = np.empty((len(block) * -(-file_size // CHUNK_SIZE), block.shape[1], 3), dtype=float)
+            if self._n_frames + len(block) > self.capacity:
+                self.reserve(max(2 * self.capacity, self._n_frames + len(block)))
+            self._xyz[self._n_frames:self._n_frames+len(block)] = block
+            self._n_frames += len(block)
+
+    @staticmethod
+    def iter_xyz(filename, start=0, stop=None, step=1):
+        """ Yield the frames of an xyz file lazily
+
+        Only the frames in range(start, stop, step) are read, found through the
+        byte offset index of the file, so the cost is proportional to the window.
+
+        Yields
+        ------
+        coords: numpy.ndarray of shape (Natoms, 3)
+            Coordinates of each frame
+        """
+        yield from XYZReader(filename).iter_frames(start, stop, step)
 
     def parse_xyz_frame(self, frame_lines):
         """ Parse a list of xyz lines into a numpy array of coordinates """
-        coords = []
-        for line in frame_lines[2:]:
-            coords.append(np.array(line.split()[1:], dtype=float))
-        return np.array(coords, dtype=float)
+        return parse_xyz_lines(frame_lines, len(frame_lines) - 2)[0]
+
+    def save_xyz(self, filename, batch_frames=1024):
+        """ Write the trajectory in xyz format
 
-    def save_xyz(self, filename):
-        """ Write the trajectory in xyz format """
+        Each batch of batch_frames frames is formatted at once and written with a single call.
+        """
+        template = xyz_frame_template(self.elems)
+        xyz = self.xyz
         with open(filename, 'w') as outfile:
-            for i, frame_xyz in enumerate(self._xyz):
-                outfile.write(f'{self.noa}\nFrame{i:10d}\n')
-                for e, c in zip(self.elems, frame_xyz):
-                    outfile.write(f'{e} {c[0]:10.7f} {c[1]:10.7f} {c[2]:10.7f}\n')
+            for start in range(0, len(xyz), batch_frames):
+                outfile.write(format_xyz_frames(template, xyz[start:start+batch_frames], start))
+
+    def save_binary(self, filename, dtype=np.float64):
+        """ Write the trajectory in the binary format of mdsim.io.binary_traj
+
+        Parameters
+        ----------
+        filename: string
+            Name of the output file
+        dtype: numpy.dtype
+            Data type of the stored coordinates, float32 or float64
+
+        The frames are written from the buffer without a copy, or converted block by block
+        for another dtype, see mdsim.io.binary_traj.write_binary_frames().
+        """
+        with open(filename, 'wb') as outfile:
+            write_binary_header(outfile, self.elems, dtype)
+            write_binary_frames(outfile, self.xyz, dtype)
+
+    def load_binary(self, filename):
+        """ Read a binary trajectory by mapping the file into memory
+
+        The frames are not read until accessed, e.g. self.xyz[k] only reads frame k,
+        so trajectories larger than the memory can be analyzed.
+        """
+        self.elems, self._xyz = load_binary_traj(filename)
+        self._n_frames = len(self._xyz)
+
+    def save_compressed(self, filename, precision=1e-3, chunk_frames=100, codec='zlib'):
+        """ Write the trajectory in the compressed format of mdsim.io.compressed_traj
+
+        Parameters
+        ----------
+        filename: string
+            Name of the output file
+        precision: float
+            The coordinates are rounded to multiples of precision
+        chunk_frames: int
+            Number of frames in each independently compressed chunk
+        codec: string
+            Name of the compressor, 'zlib' or 'lzma'
+        """
+        save_compressed_traj(filename, self.elems, self.xyz, precision=precision, chunk_frames=chunk_frames, codec=codec)
+
+    def load_compressed(self, filename, frames=None):
+        """ Read a compressed trajectory
+
+        Parameters
+        ----------
+        filename: string
+            Name of the compressed trajectory file
+        frames: int or slice
+            Only read these frames, only the chunks holding them are decompressed
+        """
+        reader = CompressedTrajReader(filename)
+        if frames is None:
+            frames = slice(None)
+        xyz = reader[frames] if isinstance(frames, slice) else reader[frames][np.newaxis]
+        self.elems = reader.elems
+        self._xyz = np.ascontiguousarray(xyz)
+        self._n_frames = len(xyz)
 
-    def find_break_frame(self, thresh=0.1):
+    def find_break_frame(self, thresh=0.1, chunk_size=1024):
         """ Find the frame in trajectory where the structure changes from initial
         Parameters
         ----------
         thresh: float
             The threshold for detecting the geometry change
+        chunk_size: int
+            Number of frames compared at a time, which bounds the temporary memory
 
         Returns
         -------
@@ -85,8 +225,11 @@ class MDTrajectory:
             The index of the first frame that the geometry changes
         """
         xyz = self.xyz
-        # compute max abs displacements along the trajectory
-        max_move = np.abs(xyz - xyz[0]).max(axis=(1,2))
-        # find the first frame that displacement is larger than thresh
-        break_frame = (max_move > thresh).argmax()
-        return break_frame
+        for start in range(0, len(xyz), chunk_size):
+            # compute max abs displacements along the chunk of trajectory
+            max_move = np.abs(xyz[start:start+chunk_size] - xyz[0]).max(axis=(1,2))
+            # find the first frame that displacement is larger than thresh
+            moved = np.flatnonzero(max_move > thresh)
+            if len(moved) > 0:
+                return start + moved[0]
+        return 0
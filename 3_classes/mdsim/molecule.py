@@ -4,28 +4,120 @@ The Molecule Class
 
 import numpy as np
 
+class ElemList(list):
+    """ List of the elements of a molecule, which refreshes the cached masses of the molecule when changed """
+
+    __slots__ = ('_molecule',)
+
+    def __init__(self, elems, molecule):
+        super().__init__(elems)
+        self._molecule = molecule
+
+    def __reduce__(self):
+        return (ElemList, (list(self), self._molecule))
+
+    def _mutator(name):
+        method = getattr(list, name)
+        def mutate(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._molecule._refresh_elems()
+            return result
+        mutate.__name__ = name
+        mutate.__doc__ = method.__doc__
+        return mutate
+
+    __setitem__ = _mutator('__setitem__')
+    __delitem__ = _mutator('__delitem__')
+    __iadd__ = _mutator('__iadd__')
+    __imul__ = _mutator('__imul__')
+    append = _mutator('append')
+    extend = _mutator('extend')
+    insert = _mutator('insert')
+    pop = _mutator('pop')
+    remove = _mutator('remove')
+    clear = _mutator('clear')
+    sort = _mutator('sort')
+    reverse = _mutator('reverse')
+    del _mutator
+
 class Molecule:
     ELEM_MASS = {'H': 1.0, 'He': 2.0}
 
+    # fixed attributes make each instance compact and the attribute access fast
+    __slots__ = ('_elems', 'coords', 'force', 'box', '_elem_idx', '_masses', '_inv_masses')
+
     @property
     def noa(self):
-        return len(self.elems)
+        return len(self._elems)
+
+    @property
+    def elems(self):
+        """ Elements of each atom as a list, changing it refreshes the cached masses """
+        return self._elems
+
+    @elems.setter
+    def elems(self, elems):
+        self.set_elems(elems)
+
+    @property
+    def elem_idx(self):
+        """ Index of each element in ELEM_MASS as an integer array """
+        return self._elem_idx
 
     @property
     def masses(self):
-        return np.array([self.ELEM_MASS[e] for e in self.elems], dtype=float)
+        """ Masses of each atom, cached until the elements are changed """
+        if self._masses is None:
+            mass_table = np.array(list(self.ELEM_MASS.values()), dtype=float)
+            self._masses = mass_table[self._elem_idx]
+            self._masses.flags.writeable = False
+        return self._masses
+
+    @property
+    def inv_masses(self):
+        """ Inverse masses of each atom, cached until the elements are changed """
+        if self._inv_masses is None:
+            self._inv_masses = 1.0 / self.masses
+            self._inv_masses.flags.writeable = False
+        return self._inv_masses
 
     def __init__(self):
         # elements list
-        self.elems = []
+        self._elems = ElemList([], self)
+        self._elem_idx = np.zeros(0, dtype=np.int64)
+        self._masses = None
+        self._inv_masses = None
         # coords
         self.coords = []
         # force
         self.force = []
+        # lengths of the periodic box along x, y, z, None for no periodic boundary
+        self.box = None
 
     def set_elems(self, elems):
-        assert all(e in self.ELEM_MASS for e in elems), 'Element not recognized'
-        self.elems = elems
+        self._elems = ElemList(elems, self)
+        self._refresh_elems()
+
+    def _refresh_elems(self):
+        """ Validate the elements and refresh the cached element indices and masses """
+        assert all(e in self.ELEM_MASS for e in self._elems), 'Element not recognized'
+        elem_index = {e: i for i, e in enumerate(self.ELEM_MASS)}
+        self._elem_idx = np.array([elem_index[e] for e in self._elems], dtype=np.int64)
+        self._elem_idx.flags.writeable = False
+        # invalidate the cached masses
+        self._masses = None
+        self._inv_masses = None
+
+    def set_box(self, box):
+        """ Set the lengths of the orthorhombic periodic box, a number for a cubic box, or None """
+        if box is None:
+            self.box = None
+            return
+        box = np.array(np.broadcast_to(box, (3,)), dtype=float)
+        assert np.all(box > 0), 'box lengths should be positive'
+        # read-only, so it can be shared by copies
+        box.flags.writeable = False
+        self.box = box
 
     def set_coords(self, coords):
         """ Set coordinates of molecule """
@@ -39,10 +131,26 @@ class Molecule:
         assert force.shape == (self.noa, 3)
         self.force = force
 
+    def set_coords_unchecked(self, coords):
+        """ Set coordinates of molecule without copy or validation
+
+        This is meant for the simulation inner loop, where coords is known to be
+        a new float array of shape (noa, 3). The array is not copied.
+        """
+        self.coords = coords
+
+    def set_force_unchecked(self, force):
+        """ Set force of molecule without copy or validation
+
+        This is meant for the simulation inner loop, where force is known to be
+        a new float array of shape (noa, 3). The array is not copied.
+        """
+        self.force = force
+
     def reset_force(self):
         self.force = np.zeros((self.noa, 3), dtype=float)
 
-    def create_cube(self, n=3, element='He'):
+    def create_cube(self, n=3, element='He', periodic=False):
         """ Create a molecule as a cube of atoms.
 
         Parameters
@@ -51,14 +159,23 @@ class Molecule:
             number of atoms in each dimension of the cube
         element: string
             The element of all atoms in this molecule
+        periodic: bool
+            Set a periodic box of length n, so the cube is a cell of a simple cubic lattice
         """
         self.set_elems([element] * n**3)
-        self.set_coords(np.array([[x,y,z] for x in range(n) for y in range(n) for z in range(n)], dtype=float))
+        grid = np.arange(n, dtype=float)
+        self.set_coords(np.stack(np.meshgrid(grid, grid, grid, indexing='ij'), axis=-1).reshape(-1, 3))
+        self.set_box(n if periodic else None)
 
     def copy(self):
         """ Return a new copy of self """
         new_molecule = Molecule()
-        new_molecule.elems = self.elems.copy()
+        # the cached arrays are read-only, so they can be shared
+        new_molecule._elems = ElemList(self._elems, new_molecule)
+        new_molecule._elem_idx = self._elem_idx
+        new_molecule._masses = self._masses
+        new_molecule._inv_masses = self._inv_masses
+        new_molecule.box = self.box
         new_molecule.coords = self.coords.copy()
         new_molecule.force = self.force.copy()
-        return new_molecule
\ No newline at end of file
+        return new_molecule
@@ -0,0 +1,42 @@
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_simulation import MDSimulation
+from mdsim.break_detector import BreakDetector
+
+def test_update():
+    detector = BreakDetector(thresh=0.1)
+    coords = np.zeros((4, 3))
+    assert not detector.update(coords, step=0)
+    assert not detector.update(coords + 0.05, step=1)
+    assert detector.max_move == 0.05
+    assert detector.update(coords - 0.2, step=2)
+    assert detector.break_index == 2
+    assert detector.break_step == 2
+    # the break is kept
+    assert detector.update(coords, step=3)
+    assert detector.break_step == 2
+    detector.reset()
+    assert not detector.broken
+
+def test_stop_condition():
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=1)
+    simulation.step(3000)
+    break_frame = simulation.trajectory.find_break_frame(thresh=0.1)
+    assert break_frame > 0
+    # the detector stops the same simulation at the first frame of the break
+    detector = BreakDetector(thresh=0.1)
+    simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=100)
+    stop_step = simulation.step(3000, stop_conditions=[detector])
+    assert stop_step == break_frame
+    assert detector.break_step == break_frame
+    assert simulation.current_step == break_frame + 1
+    # no stop before the break
+    simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=100)
+    assert simulation.step(break_frame, stop_conditions=[BreakDetector(thresh=0.1)]) is None
+    assert simulation.current_step == break_frame
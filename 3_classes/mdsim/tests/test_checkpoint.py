@@ -0,0 +1,58 @@
+import os
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_simulation import MDSimulation
+from mdsim.io import XYZWriter, BinaryTrajWriter, CompressedTrajWriter
+from mdsim.checkpoint import save_checkpoint, load_checkpoint
+
+def create_simulation(tmp_path, writer_class, resume=False, **kwargs):
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce(kernel='neighbor', cutoff=2.0, skin=0.2)
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    integrator = VerletIntegrator(t_step=0.001, inplace=True)
+    writer = writer_class(tmp_path / f'traj_{kwargs.get("checkpoint_interval")}', molecule.elems, resume=resume)
+    return MDSimulation(molecule, ff, integrator, interval=30, writer=writer, **kwargs)
+
+def test_save_load_checkpoint(tmp_path):
+    state = {'step': 5, 'a': {'b': np.arange(3), 'c': None, 'd': 0.1}}
+    save_checkpoint(tmp_path / 'state.npz', state)
+    assert not os.path.exists(tmp_path / 'state.npz.tmp')
+    loaded = load_checkpoint(tmp_path / 'state.npz')
+    assert loaded['step'] == 5
+    assert np.array_equal(loaded['a']['b'], np.arange(3))
+    assert 'c' not in loaded['a']
+    assert loaded['a']['d'] == 0.1
+
+def test_restore(tmp_path):
+    for writer_class in [XYZWriter, BinaryTrajWriter, CompressedTrajWriter]:
+        # the reference run without interruption
+        reference = create_simulation(tmp_path, writer_class, checkpoint_interval=None)
+        reference.step(500)
+        reference.writer.close()
+        # a run that crashes at step 270, after the checkpoint of step 200
+        checkpoint_file = tmp_path / 'run.chk'
+        simulation = create_simulation(tmp_path, writer_class, checkpoint_file=checkpoint_file, checkpoint_interval=100)
+        simulation.step(270)
+        simulation.writer.flush()
+        # the checkpoint only holds the number of frames, which are in the sidecar file
+        state = load_checkpoint(checkpoint_file)
+        assert 'trajectory' not in state
+        assert state['frames']['n_frames'] == 7
+        # frames written after the checkpoint, before the crash, are ignored
+        with open(f'{checkpoint_file}.frames', 'ab') as f:
+            f.write(np.zeros((2, 27, 3)).tobytes())
+        # resume with new objects
+        simulation = create_simulation(tmp_path, writer_class, resume=True, checkpoint_file=checkpoint_file, checkpoint_interval=100)
+        simulation.restore(checkpoint_file)
+        assert simulation.current_step == 200
+        assert len(simulation.trajectory) == 7
+        simulation.step(300)
+        simulation.writer.close()
+        # bit for bit the same as the uninterrupted run
+        assert np.array_equal(simulation.molecule.coords, reference.molecule.coords)
+        assert np.array_equal(simulation.trajectory.xyz, reference.trajectory.xyz)
+        assert simulation.ff.neighbor_list.n_builds == reference.ff.neighbor_list.n_builds
+        assert (tmp_path / 'traj_100').read_bytes() == (tmp_path / 'traj_None').read_bytes()
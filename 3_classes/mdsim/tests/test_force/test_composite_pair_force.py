@@ -0,0 +1,53 @@
+import pytest
+import numpy as np
+from mdsim.force import MDForce, LJForce, LJTailForce, SoftRepulsionForce, CompositePairForce
+
+def create_terms(kernel='half'):
+    lj = LJForce(kernel=kernel, cutoff=2.5)
+    lj.set_params(sigma={'H': 0.7, 'He': 0.9}, epsilon={'H': 5.0, 'He': 20.0})
+    soft = SoftRepulsionForce(kernel=kernel, cutoff=1.2)
+    soft.set_params(sigma=1.2, epsilon=5.0)
+    return [lj, soft]
+
+def test_init():
+    f = CompositePairForce(create_terms(), kernel='neighbor')
+    assert isinstance(f, MDForce)
+    # the largest cutoff of the terms
+    assert f.neighbor_list.cutoff == 2.5
+    with pytest.raises(AssertionError):
+        CompositePairForce([LJForce()], kernel='neighbor')
+    # the kernels and the precision of the terms are not used by the composite
+    with pytest.raises(AssertionError, match='neighbor kernel'):
+        CompositePairForce(create_terms(kernel='neighbor'))
+    with pytest.raises(AssertionError, match='double precision'):
+        CompositePairForce([LJForce(precision='single')])
+    # the tail drops the pairs within its cutoff in its own dense kernel
+    with pytest.raises(AssertionError, match='LJTailForce'):
+        CompositePairForce([LJTailForce(cutoff=1.5)])
+
+def test_compute_energy_force():
+    """ the composite force is the sum of the terms computed separately """
+    coords = np.array([[x,y,z] for x in range(6) for y in range(6) for z in range(6)], dtype=float)
+    coords += 0.2 * np.random.random(coords.shape)
+    types = np.random.randint(0, 2, size=len(coords))
+    for kernel, box in [('half', None), ('neighbor', None), ('neighbor', 6.0)]:
+        terms = create_terms(kernel='neighbor')
+        for term in terms:
+            term.set_types(types)
+            term.set_box(box)
+        ref = [term.compute_energy_force(coords) for term in terms]
+        f = CompositePairForce(create_terms(), kernel=kernel)
+        f.set_types(types)
+        f.set_box(box)
+        energy, force, virial = f.compute_energy_force(coords)
+        assert np.isclose(energy, sum(r[0] for r in ref))
+        assert np.allclose(force, sum(r[1] for r in ref))
+        assert np.allclose(virial, sum(r[2] for r in ref))
+        assert np.array_equal(force, f.compute_force(coords))
+    # the state of the terms and the neighbor list
+    g = CompositePairForce(create_terms(), kernel='neighbor')
+    g.set_types(types)
+    g.set_box(6.0)
+    g.set_state(f.get_state())
+    assert g.neighbor_list.n_builds == f.neighbor_list.n_builds
+    assert np.array_equal(g.compute_force(coords), f.compute_force(coords))
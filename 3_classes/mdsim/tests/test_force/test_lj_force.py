@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
 from mdsim.force import MDForce, LJForce
+from mdsim.checkpoint import save_checkpoint, load_checkpoint
 
 def test_init():
     f = LJForce()
@@ -46,3 +47,230 @@ def test_compute_force():
         force = f.compute_force(rand_coords)
         ref_force = f.compute_force_ref(rand_coords)
         assert np.allclose(force, ref_force)
+
+def test_compute_force_neighbor():
+    """ test the neighbor kernel against compute_force_ref when all pairs are within cutoff """
+    f = LJForce(kernel='neighbor', cutoff=3.0, skin=0.3)
+    f.set_params(sigma=0.9, epsilon=1.0)
+    coords = np.array([[0,0,0], [0,0,1], [0,1,0], [1,0,0]])
+    for _ in range(10):
+        rand_coords = coords + 0.5 * np.random.random(coords.shape)
+        force = f.compute_force(rand_coords)
+        ref_force = f.compute_force_ref(rand_coords)
+        assert np.allclose(force, ref_force)
+
+def test_compute_force_neighbor_cutoff():
+    """ test the neighbor kernel only includes pairs within cutoff """
+    cutoff = 1.5
+    f = LJForce(kernel='neighbor', cutoff=cutoff, skin=0.3)
+    f.set_params(sigma=0.9, epsilon=1.0)
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    rand_coords = coords + 0.2 * np.random.random(coords.shape)
+    # reference: the dense force of each pair within cutoff
+    c_diff = rand_coords[:,np.newaxis,:] - rand_coords[np.newaxis,:,:]
+    r2_mat = np.sum(np.square(c_diff), axis=-1)
+    np.fill_diagonal(r2_mat, 1.0)
+    f_mat = np.where(r2_mat < cutoff**2, f.pair_force(r2_mat), 0.0)
+    np.fill_diagonal(f_mat, 0.0)
+    ref_force = np.einsum('ijk,ij->ik', c_diff, f_mat)
+    assert np.allclose(f.compute_force(rand_coords), ref_force)
+
+def test_neighbor_list_reuse():
+    """ test the neighbor list is only rebuilt when atoms move more than half skin """
+    f = LJForce(kernel='neighbor', cutoff=2.0, skin=0.4)
+    coords = np.array([[x,y,z] for x in range(3) for y in range(3) for z in range(3)], dtype=float)
+    f.compute_force(coords)
+    assert f.neighbor_list.n_builds == 1
+    f.compute_force(coords + [0.15, 0.0, 0.0])
+    assert f.neighbor_list.n_builds == 1
+    moved = coords.copy()
+    moved[0] += 0.25
+    f.compute_force(moved)
+    assert f.neighbor_list.n_builds == 2
+
+def test_compute_force_tiled():
+    """ test the tiled kernel against the dense kernel """
+    coords = np.array([[x,y,z] for x in range(3) for y in range(3) for z in range(3)], dtype=float)
+    for block_size, n_workers in [(4, 1), (5, 3), (100, 2)]:
+        f = LJForce(kernel='tiled', block_size=block_size, n_workers=n_workers)
+        f.set_params(sigma=0.9, epsilon=1.0)
+        rand_coords = coords + 0.3 * np.random.random(coords.shape)
+        force = f.compute_force(rand_coords)
+        assert np.allclose(force, f.compute_force_dense(rand_coords))
+    # the thread pool follows n_workers, and is shut down by close()
+    with LJForce(kernel='tiled', block_size=5, n_workers=2) as f:
+        f.compute_force(coords)
+        executor = f.executor()
+        f.n_workers = 4
+        assert np.allclose(f.compute_force(coords), f.compute_force_dense(coords))
+        assert f.executor() is not executor
+        assert f._executor_workers == 4
+    assert f._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+
+def test_compute_force_half():
+    """ test the half pair kernel against compute_force_ref """
+    f = LJForce(kernel='half')
+    f.set_params(sigma=0.9, epsilon=1.0)
+    coords = np.array([[x,y,z] for x in range(3) for y in range(3) for z in range(3)], dtype=float)
+    for n in [1, 2, 27, 27, 8]:
+        rand_coords = coords[:n] + 0.3 * np.random.random((n, 3))
+        force = f.compute_force(rand_coords)
+        assert np.allclose(force, f.compute_force_ref(rand_coords))
+
+def test_compute_force_batch():
+    """ test the dense and half kernels on a batch of replicas with per-replica parameters """
+    coords = np.array([[0,0,0], [0,0,1], [0,1,0], [1,0,0]])
+    batch_coords = coords + 0.5 * np.random.random((3,) + coords.shape)
+    sigmas, epsilons = np.array([0.8, 0.9, 1.0]), np.array([1.0, 2.0, 3.0])
+    for kernel in ['dense', 'half']:
+        f = LJForce(kernel=kernel)
+        f.set_params(sigma=sigmas, epsilon=epsilons)
+        batch_force = f.compute_force(batch_coords)
+        assert batch_force.shape == batch_coords.shape
+        for rep_coords, rep_force, sigma, epsilon in zip(batch_coords, batch_force, sigmas, epsilons):
+            f.set_params(sigma=sigma, epsilon=epsilon)
+            assert np.allclose(rep_force, f.compute_force_ref(rep_coords))
+    # above the size limit of the incidence matrix, the half kernel scatters each replica by index
+    f = LJForce(kernel='half')
+    f.set_params(sigma=sigmas, epsilon=epsilons)
+    f.MAX_INCIDENCE_SIZE = 0
+    assert np.allclose(f.compute_force(batch_coords), batch_force)
+    assert f._incidence is None
+    # the force can be written into a buffer, with and without the incidence matrix
+    for max_size in [0, LJForce.MAX_INCIDENCE_SIZE]:
+        f.MAX_INCIDENCE_SIZE = max_size
+        out = np.empty_like(batch_coords)
+        assert f.compute_force(batch_coords, out=out) is out
+        assert np.allclose(out, batch_force)
+
+def test_compute_energy_force():
+    """ test the energy and virial against a loop over pairs, and the force against compute_force """
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    coords += 0.1 * np.random.random(coords.shape)
+    s6, epsilon, cutoff = 0.9**6, 20.0, 2.0
+    ref_energy = {None: 0.0, cutoff: 0.0}
+    ref_virial = {None: np.zeros((3, 3)), cutoff: np.zeros((3, 3))}
+    for i in range(len(coords)):
+        for j in range(i+1, len(coords)):
+            dc = coords[i] - coords[j]
+            r2 = dc @ dc
+            f = (-12 / r2**7 * s6 + 6 / r2**4) * 4 * epsilon * s6
+            for rc in ref_energy:
+                if rc is None or r2 < rc**2:
+                    ref_energy[rc] += 4 * epsilon * (s6**2 / r2**6 - s6 / r2**3)
+                    ref_virial[rc] -= f * np.outer(dc, dc)
+    for kernel, rc in [('dense', None), ('tiled', None), ('half', None), ('neighbor', cutoff)]:
+        f = LJForce(kernel=kernel, cutoff=rc, block_size=20)
+        f.set_params(sigma=0.9, epsilon=epsilon)
+        energy, force, virial = f.compute_energy_force(coords)
+        assert np.isclose(energy, ref_energy[rc])
+        assert np.allclose(virial, ref_virial[rc])
+        assert np.array_equal(force, f.compute_force(coords))
+    # a batch of replicas
+    f = LJForce()
+    f.set_params(sigma=0.9, epsilon=epsilon)
+    energy, force, virial = f.compute_energy_force(np.stack([coords, coords]))
+    assert np.allclose(energy, ref_energy[None])
+    assert virial.shape == (2, 3, 3)
+
+def test_precision():
+    """ test the single and mixed precision modes of all kernels against the double precision """
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    coords += 0.1 * np.random.RandomState(0).random_sample(coords.shape)
+    ref = LJForce()
+    ref.set_params(sigma=0.9, epsilon=20.0)
+    ref_energy, ref_force, ref_virial = ref.compute_energy_force(coords)
+    for precision, sum_dtype in [('single', np.float32), ('mixed', np.float64)]:
+        for kernel, rc in [('dense', None), ('tiled', None), ('half', None), ('neighbor', 10.0)]:
+            f = LJForce(kernel=kernel, cutoff=rc, block_size=20, precision=precision)
+            f.set_params(sigma=0.9, epsilon=20.0)
+            force = f.compute_force(coords)
+            if kernel in ('dense', 'tiled'):
+                assert force.dtype == sum_dtype
+            scale = np.abs(ref_force).max()
+            assert np.allclose(force, ref_force, rtol=0, atol=1e-5 * scale)
+            energy, force, virial = f.compute_energy_force(coords)
+            assert np.isclose(energy, ref_energy, rtol=1e-5)
+            assert np.allclose(virial, ref_virial, rtol=0, atol=1e-5 * np.abs(ref_virial).max())
+        # a batch of replicas
+        f = LJForce(kernel='half', precision=precision)
+        f.set_params(sigma=0.9, epsilon=20.0)
+        assert np.allclose(f.compute_force(np.stack([coords, coords]))[1], ref_force, rtol=0, atol=1e-5 * scale)
+    with pytest.raises(AssertionError):
+        LJForce(precision='half')
+
+def test_compute_force_periodic():
+    """ test the neighbor kernel in a periodic box against all pairs of nearest images """
+    box, cutoff = np.array([6.0, 7.0, 8.0]), 2.5
+    coords = np.array([[x,y,z] for x in range(6) for y in range(7) for z in range(8)], dtype=float)
+    coords += 0.2 * np.random.random(coords.shape)
+    s6, epsilon = 0.9**6, 20.0
+    c_diff = coords[:,np.newaxis,:] - coords[np.newaxis,:,:]
+    c_diff -= box * np.rint(c_diff / box)
+    r2 = np.sum(np.square(c_diff), axis=-1)
+    inside = (r2 < cutoff**2) & (r2 > 0)
+    r2[~inside] = np.inf
+    ref_force = np.einsum('ijk,ij->ik', c_diff, (-12 / r2**7 * s6 + 6 / r2**4) * 4 * epsilon * s6)
+    ref_energy = 0.5 * np.sum(4 * epsilon * (s6**2 / r2**6 - s6 / r2**3))
+    f = LJForce(kernel='neighbor', cutoff=cutoff)
+    f.set_params(sigma=0.9, epsilon=epsilon)
+    f.set_box(box)
+    force = f.compute_force(coords)
+    assert np.allclose(force, ref_force)
+    assert np.isclose(f.compute_energy_force(coords)[0], ref_energy)
+    # the atoms shifted by whole boxes feel the same force
+    shifted = coords + box * np.random.randint(-2, 3, size=coords.shape)
+    assert np.allclose(f.compute_force(shifted), force)
+    # the other kernels do not support a box
+    with pytest.raises(AssertionError):
+        LJForce().set_box(box)
+
+def test_compute_force_species(tmp_path):
+    """ test per-element parameters with Lorentz-Berthelot mixing against compute_force_ref """
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    coords += 0.1 * np.random.random(coords.shape)
+    types = np.random.randint(0, 2, size=len(coords))
+    sigma, epsilon = {'H': 0.7, 'He': 0.9}, {'H': 5.0, 'He': 20.0}
+    ref = LJForce()
+    ref.set_params(sigma=sigma, epsilon=epsilon)
+    ref.set_types(types)
+    ref_force = ref.compute_force_ref(coords)
+    ref_energy = ref.compute_energy_force(coords)[0]
+    for kernel, rc in [('dense', None), ('tiled', None), ('half', None), ('neighbor', 10.0)]:
+        f = LJForce(kernel=kernel, cutoff=rc, block_size=20)
+        f.set_params(sigma=sigma, epsilon=epsilon)
+        f.set_types(types)
+        assert np.allclose(f.compute_force(coords), ref_force)
+        energy, force, virial = f.compute_energy_force(coords)
+        assert np.isclose(energy, ref_energy)
+        assert np.array_equal(force, f.compute_force(coords))
+    # a batch of replicas of the same atoms
+    for kernel in ['dense', 'half']:
+        f = LJForce(kernel=kernel)
+        f.set_params(sigma=sigma, epsilon=epsilon)
+        f.set_types(types)
+        assert np.allclose(f.compute_force(np.stack([coords, coords]))[1], ref_force)
+    # the same parameters for all elements give the single element force
+    f = LJForce(kernel='half')
+    f.set_params(sigma={'H': 0.9, 'He': 0.9}, epsilon={'H': 20.0, 'He': 20.0})
+    f.set_types(types)
+    single = LJForce(kernel='half')
+    single.set_params(sigma=0.9, epsilon=20.0)
+    assert np.allclose(f.compute_force(coords), single.compute_force(coords))
+    # the parameters are rebuilt from a checkpoint
+    save_checkpoint(tmp_path / 'ff.chk', ref.get_state())
+    g = LJForce()
+    g.set_state(load_checkpoint(tmp_path / 'ff.chk'))
+    g.set_types(types)
+    assert np.array_equal(g.compute_force(coords), ref.compute_force(coords))
+    # the types are required, with parameters for all of them
+    with pytest.raises(AssertionError):
+        LJForce(kernel='half').set_params(sigma=sigma, epsilon=0.9)
+    f = LJForce()
+    f.set_params(sigma={'He': 0.9}, epsilon={'He': 20.0})
+    with pytest.raises(AssertionError):
+        f.compute_force(coords)
+    with pytest.raises(AssertionError):
+        f.set_types(types)
@@ -0,0 +1,47 @@
+import pytest
+import numpy as np
+from mdsim.force import MDForce, LJForce, LJTableForce
+
+def test_init():
+    f = LJTableForce()
+    assert isinstance(f, LJForce)
+    assert isinstance(f, MDForce)
+    with pytest.raises(AssertionError):
+        LJTableForce(kernel='dense')
+
+def test_compute_force():
+    """ test the interpolated force and energy against compute_force_ref and the formula """
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    coords += 0.1 * np.random.random(coords.shape)
+    ref = LJForce()
+    ref.set_params(sigma=0.9, epsilon=20.0)
+    ref_force = ref.compute_force_ref(coords)
+    ref_energy = ref.compute_energy_force(coords)[0]
+    # the table covers all pairs, the error decreases with the grid size
+    for kernel in ['half', 'tiled']:
+        for interpolation, n_grid, tol in [('linear', 20000, 1e-3), ('cubic', 4000, 1e-4)]:
+            f = LJTableForce(kernel=kernel, block_size=20, n_grid=n_grid, interpolation=interpolation, r_max=6.0)
+            f.set_params(sigma=0.9, epsilon=20.0)
+            assert np.allclose(f.compute_force(coords), ref_force, rtol=0, atol=tol * np.abs(ref_force).max())
+            energy, force, virial = f.compute_energy_force(coords)
+            assert np.isclose(energy, ref_energy, rtol=tol)
+            assert np.array_equal(force, f.compute_force(coords))
+    # the pairs outside of the table use the formula
+    f = LJTableForce(r_min=1.5, r_max=2.0)
+    f.set_params(sigma=0.9, epsilon=20.0)
+    assert np.allclose(f.compute_force(coords), ref_force, rtol=0, atol=1e-4 * np.abs(ref_force).max())
+
+def test_rebuild_table():
+    """ the table follows the parameters """
+    coords = np.array([[0,0,0], [0,0,1], [0,1,0], [1,0,0]]) + 0.1 * np.random.random((4, 3))
+    f = LJTableForce(kernel='neighbor', cutoff=3.0)
+    ref = LJForce()
+    for sigma, epsilon in [(0.9, 1.0), (1.0, 20.0)]:
+        f.set_params(sigma=sigma, epsilon=epsilon)
+        ref.set_params(sigma=sigma, epsilon=epsilon)
+        ref_force = ref.compute_force_ref(coords)
+        assert np.allclose(f.compute_force(coords), ref_force, rtol=0, atol=1e-6 * np.abs(ref_force).max())
+    # restored from a checkpoint state
+    g = LJTableForce(kernel='neighbor', cutoff=3.0)
+    g.set_state(f.get_state())
+    assert np.array_equal(g.compute_force(coords), f.compute_force(coords))
@@ -0,0 +1,24 @@
+import numpy as np
+from mdsim.force import MDForce, LJForce, LJTailForce
+
+def test_init():
+    f = LJTailForce(cutoff=2.0)
+    assert isinstance(f, LJForce)
+    assert isinstance(f, MDForce)
+
+def test_split_lj_force():
+    """ the tail and the pairs within the cutoff add up to the full LJ force """
+    coords = np.array([[x,y,z] for x in range(4) for y in range(4) for z in range(4)], dtype=float)
+    coords += 0.1 * np.random.random(coords.shape)
+    forces = [LJForce(), LJForce(kernel='neighbor', cutoff=2.0), LJTailForce(cutoff=2.0)]
+    for f in forces:
+        f.set_params(sigma=0.9, epsilon=20.0)
+    energy, force, virial = forces[0].compute_energy_force(coords)
+    energy_short, force_short, virial_short = forces[1].compute_energy_force(coords)
+    energy_tail, force_tail, virial_tail = forces[2].compute_energy_force(coords)
+    assert np.allclose(force_short + force_tail, force)
+    assert np.allclose(forces[2].compute_force(coords), force_tail)
+    assert np.isclose(energy_short + energy_tail, energy)
+    assert np.allclose(virial_short + virial_tail, virial)
+    # the tail is small
+    assert np.abs(force_tail).max() < 0.1 * np.abs(force).max()
@@ -0,0 +1,62 @@
+import numpy as np
+from mdsim.force import NeighborList
+from mdsim.force.neighbor_list import find_pairs, minimum_image
+
+def brute_force_pairs(coords, rcut, box=None):
+    c_diff = minimum_image(coords[:,np.newaxis,:] - coords[np.newaxis,:,:], box)
+    r2_mat = np.sum(np.square(c_diff), axis=-1)
+    pair_i, pair_j = np.nonzero(np.triu(r2_mat < rcut**2, k=1))
+    return set(zip(pair_i, pair_j))
+
+def test_find_pairs():
+    for noa in [0, 1, 2, 10, 200]:
+        coords = 5.0 * np.random.random((noa, 3))
+        pair_i, pair_j = find_pairs(coords, 1.2)
+        pairs = set((min(i, j), max(i, j)) for i, j in zip(pair_i, pair_j))
+        # each pair should be found exactly once
+        assert len(pairs) == len(pair_i)
+        assert pairs == brute_force_pairs(coords, 1.2)
+
+def test_find_pairs_sparse():
+    # atoms far apart should not create a large grid
+    coords = np.array([[0,0,0], [0,0,1], [1e6,1e6,1e6], [1e6,1e6,1e6+0.5]], dtype=float)
+    pair_i, pair_j = find_pairs(coords, 1.5)
+    assert set(zip(pair_i, pair_j)) == {(0, 1), (2, 3)}
+
+def test_update():
+    nlist = NeighborList(cutoff=1.0, skin=0.2)
+    assert nlist.rlist == 1.2
+    coords = np.array([[0,0,0], [0,0,1.1], [0,0,3]], dtype=float)
+    assert nlist.update(coords)
+    # pair in the skin is kept in the list
+    assert set(zip(*nlist.pairs)) == {(0, 1)}
+    # small moves do not trigger a rebuild
+    assert not nlist.update(coords + 0.05)
+    # move more than half of the skin
+    coords[2] -= 0.15
+    assert nlist.update(coords)
+    assert nlist.n_builds == 2
+
+def test_find_pairs_periodic():
+    # boxes with 3 or more cells along each axis, and a small box comparing all pairs
+    for noa, box, rcut in [(2, [8.0, 8.0, 8.0], 2.5), (300, [8.0, 10.0, 12.0], 2.5), (200, [6.0, 6.0, 6.0], 2.5)]:
+        box = np.array(box)
+        # the coordinates are not wrapped into the box
+        coords = 3.0 * box * np.random.random((noa, 3)) - box
+        pair_i, pair_j = find_pairs(coords, rcut, box=box)
+        pairs = set((min(i, j), max(i, j)) for i, j in zip(pair_i, pair_j))
+        assert len(pairs) == len(pair_i)
+        assert pairs == brute_force_pairs(coords, rcut, box=box)
+    # the pairs across the boundary are found
+    coords = np.array([[0.1, 0, 0], [7.9, 0, 0], [4, 4, 4]])
+    assert set(zip(*find_pairs(coords, 1.0, box=np.array([8.0, 8.0, 8.0])))) == {(0, 1)}
+
+def test_update_periodic():
+    nlist = NeighborList(cutoff=1.0, skin=0.2, box=8.0)
+    coords = np.array([[0,0,0], [0,0,7.5], [0,0,3]], dtype=float)
+    assert nlist.update(coords)
+    assert set(zip(*nlist.pairs)) == {(0, 1)}
+    # a new box rebuilds the list
+    nlist.set_box(9.0)
+    assert nlist.update(coords)
+    assert len(nlist.pairs[0]) == 0
@@ -0,0 +1,28 @@
+import pytest
+import numpy as np
+from mdsim.force import MDForce, LJForce, SoftRepulsionForce
+
+def test_init():
+    f = SoftRepulsionForce()
+    assert isinstance(f, LJForce)
+    assert isinstance(f, MDForce)
+    with pytest.raises(AssertionError):
+        SoftRepulsionForce(kernel='dense')
+
+def test_compute_force():
+    """ test the kernels against compute_force_ref, and the energy against the force """
+    coords = np.array([[x,y,z] for x in range(3) for y in range(3) for z in range(3)], dtype=float)
+    coords += 0.3 * np.random.random(coords.shape)
+    for kernel, rc in [('half', None), ('tiled', None), ('neighbor', 1.2)]:
+        f = SoftRepulsionForce(kernel=kernel, cutoff=rc, block_size=10)
+        f.set_params(sigma=1.2, epsilon=5.0)
+        ref_force = f.compute_force_ref(coords)
+        assert np.allclose(f.compute_force(coords), ref_force)
+        energy, force, virial = f.compute_energy_force(coords)
+        assert np.array_equal(force, f.compute_force(coords))
+    # the gradient of the energy by finite differences
+    delta = np.zeros_like(coords)
+    delta[0, 0] = 1e-6
+    energy_plus = f.compute_energy_force(coords + delta)[0]
+    energy_minus = f.compute_energy_force(coords - delta)[0]
+    assert np.isclose((energy_plus - energy_minus) / 2e-6, force[0, 0], rtol=1e-5)
@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce, LJTailForce
+from mdsim.integrator import VelocityVerletIntegrator, RESPAIntegrator
+from mdsim.md_simulation import MDSimulation
+
+def create_forces():
+    forces = [LJForce(), LJForce(kernel='neighbor', cutoff=1.5), LJTailForce(cutoff=1.5)]
+    for ff in forces:
+        ff.set_params(sigma=0.9, epsilon=20.0)
+    return forces
+
+def run(ff, integrator, n_steps):
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    simulation = MDSimulation(molecule, ff, integrator, interval=10)
+    simulation.step(n_steps)
+    return simulation
+
+def test_integrate():
+    full, short, tail = create_forces()
+    reference = run(full, VelocityVerletIntegrator(), 400)
+    # a period of 1 is velocity Verlet with the sum of the forces
+    integrator = RESPAIntegrator(slow_forces=[(tail, 1)])
+    simulation = run(short, integrator, 400)
+    assert np.allclose(simulation.trajectory.xyz, reference.trajectory.xyz)
+    assert integrator.n_slow_evals == [400]
+    # the tail is only evaluated every 4 steps
+    integrator = RESPAIntegrator(slow_forces=[(tail, 4)])
+    simulation = run(short, integrator, 400)
+    assert integrator.n_slow_evals == [100]
+    assert np.allclose(simulation.trajectory.xyz, reference.trajectory.xyz, atol=1e-4)
+
+def test_state():
+    full, short, tail = create_forces()
+    integrator = RESPAIntegrator(slow_forces=[(tail, 3)], inplace=True)
+    simulation = run(short, integrator, 100)
+    # resume from the state after 100 steps, in the middle of an outer step
+    integrator1 = RESPAIntegrator(slow_forces=[(LJTailForce(cutoff=1.5), 3)], inplace=True)
+    integrator1.set_state(integrator.get_state())
+    short1 = LJForce(kernel='neighbor', cutoff=1.5)
+    short1.set_state(short.get_state())
+    simulation1 = MDSimulation(simulation.molecule.copy(), short1, integrator1, interval=10)
+    simulation1.step(50)
+    simulation.step(50)
+    assert np.array_equal(simulation1.molecule.coords, simulation.molecule.coords)
+    assert integrator1.n_slow_evals == integrator.n_slow_evals == [50]
+
+def test_periodic():
+    # the slow forces get the periodic box of the molecule
+    molecule = Molecule()
+    molecule.create_cube(n=6, periodic=True)
+    short = LJForce(kernel='neighbor', cutoff=1.5)
+    slow = LJForce(kernel='neighbor', cutoff=2.5)
+    simulation = MDSimulation(molecule, short, RESPAIntegrator(slow_forces=[(slow, 2)]), interval=10)
+    assert np.array_equal(slow.box, molecule.box)
+    simulation.step(10)
+    # a slow force without a periodic kernel is not run without the box
+    with pytest.raises(AssertionError, match='periodic box'):
+        MDSimulation(molecule, short, RESPAIntegrator(slow_forces=[(LJTailForce(cutoff=1.5), 2)]))
+
+def test_species():
+    # the slow forces get the element types of the molecule
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    molecule.set_elems(['H', 'He'] * 13 + ['H'])
+    sigma, epsilon = {'H': 0.7, 'He': 0.9}, {'H': 5.0, 'He': 20.0}
+    forces = [LJForce(), LJForce(kernel='neighbor', cutoff=1.5), LJTailForce(cutoff=1.5)]
+    for ff in forces:
+        ff.set_params(sigma=sigma, epsilon=epsilon)
+    full, short, tail = forces
+    reference = MDSimulation(molecule, full, VelocityVerletIntegrator(), interval=10)
+    simulation = MDSimulation(molecule, short, RESPAIntegrator(slow_forces=[(tail, 1)]), interval=10)
+    assert np.array_equal(tail.types, molecule.elem_idx)
+    reference.step(100)
+    simulation.step(100)
+    assert np.allclose(simulation.trajectory.xyz, reference.trajectory.xyz)
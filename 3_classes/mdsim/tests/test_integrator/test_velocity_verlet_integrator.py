@@ -0,0 +1,108 @@
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import MDIntegrator, VelocityVerletIntegrator
+from mdsim.md_simulation import MDSimulation
+
+def test_init():
+    integrator = VelocityVerletIntegrator()
+    assert isinstance(integrator, VelocityVerletIntegrator)
+    assert isinstance(integrator, MDIntegrator)
+
+def test_integrate():
+    integrator = VelocityVerletIntegrator(t_step=0.001)
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    coords = molecule.coords.copy()
+    force = np.random.random((8, 3))
+    molecule.set_force(force)
+    accel = -force / molecule.masses[:, np.newaxis]
+    # the first step starts at rest
+    molecule1 = integrator.integrate(molecule)
+    assert integrator.kinetic_energy == 0.0
+    assert np.allclose(integrator.velocities, 0.5 * accel * 0.001)
+    assert np.allclose(molecule1.coords, coords + 0.5 * accel * 0.001**2)
+    # the second step completes the velocities of the current time
+    molecule1.set_force(force)
+    molecule2 = integrator.integrate(molecule1)
+    v1 = accel * 0.001
+    assert np.isclose(integrator.kinetic_energy, 0.5 * np.sum(molecule.masses[:, np.newaxis] * v1**2))
+    assert np.allclose(molecule2.coords, molecule1.coords + 1.5 * accel * 0.001**2)
+
+def test_integrate_inplace():
+    """ test in-place integration against the value-returning integration """
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    force = np.random.random((8, 3))
+    molecule.set_force(force)
+    integrator = VelocityVerletIntegrator()
+    integrator_inplace = VelocityVerletIntegrator(inplace=True)
+    integrator_inplace.set_velocities(np.zeros((8, 3)))
+    velocities = integrator_inplace.velocities
+    molecule_inplace = molecule.copy()
+    for _ in range(3):
+        molecule = integrator.integrate(molecule)
+        molecule.set_force(force)
+        assert integrator_inplace.integrate(molecule_inplace) is molecule_inplace
+        assert np.array_equal(molecule_inplace.coords, molecule.coords)
+    # the velocity array is reused
+    assert integrator_inplace.velocities is velocities
+    assert integrator_inplace.kinetic_energy == integrator.kinetic_energy
+
+def test_adaptive_buffers():
+    """ the cached -1/2m is kept while the adaptive step changes """
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    molecule.set_force(np.random.random((8, 3)))
+    integrator = VelocityVerletIntegrator(inplace=True)
+    integrator.set_adaptive(1e-5, 0.01)
+    integrator.integrate(molecule)
+    half_inv_masses = integrator._half_inv_masses
+    t_steps = set()
+    for _ in range(5):
+        integrator.integrate(molecule)
+        t_steps.add(integrator.t_step)
+    assert len(t_steps) > 1
+    assert integrator._half_inv_masses is half_inv_masses
+
+def test_energy_conservation():
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule, ff, VelocityVerletIntegrator(t_step=0.001), interval=10, log_observables=True)
+    simulation.step(2000)
+    kinetic = np.array(simulation.observables['kinetic_energy'])
+    total = np.array(simulation.observables['potential_energy']) + kinetic
+    # the atoms start at rest and speed up, while the total energy is conserved
+    assert kinetic[0] == 0.0
+    assert kinetic[-1] > 1.0
+    assert np.abs(total - total[0]).max() < 1e-3 * kinetic.max()
+
+def test_energy_conservation_single():
+    """ the coordinates stay float64 with float32 forces, and the energy is conserved as well """
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce(precision='single')
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule, ff, VelocityVerletIntegrator(t_step=0.001), interval=10, log_observables=True)
+    simulation.step(2000)
+    assert simulation.molecule.coords.dtype == np.float64
+    kinetic = np.array(simulation.observables['kinetic_energy'])
+    total = np.array(simulation.observables['potential_energy']) + kinetic
+    assert np.abs(total - total[0]).max() < 1e-3 * kinetic.max()
+
+def test_state():
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    force = np.random.random((8, 3))
+    molecule.set_force(force)
+    integrator = VelocityVerletIntegrator()
+    molecule = integrator.integrate(molecule)
+    # resume the integration from the state
+    integrator1 = VelocityVerletIntegrator()
+    integrator1.set_state(integrator.get_state())
+    molecule.set_force(force)
+    molecule1 = molecule.copy()
+    assert np.array_equal(integrator.integrate(molecule).coords, integrator1.integrate(molecule1).coords)
+    assert integrator.kinetic_energy == integrator1.kinetic_energy
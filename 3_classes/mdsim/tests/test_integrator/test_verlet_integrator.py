@@ -31,4 +31,26 @@ def test_integrate():
     molecule2 = integrator.integrate(molecule1)
     ref_disp = -1 * force / molecule.masses[:, np.newaxis] * 0.001**2
     ref_disp += molecule1.coords - molecule.coords
-    assert np.allclose(molecule2.coords, molecule1.coords + ref_disp)
\ No newline at end of file
+    assert np.allclose(molecule2.coords, molecule1.coords + ref_disp)
+
+def test_integrate_inplace():
+    """ test in-place integration against the value-returning integration """
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    force = np.random.random((8, 3))
+    molecule.set_force(force)
+    integrator = VerletIntegrator(t_step=0.001)
+    integrator_inplace = VerletIntegrator(t_step=0.001, inplace=True)
+    molecule_inplace = molecule.copy()
+    coords_buffer = molecule_inplace.coords
+    for _ in range(3):
+        molecule = integrator.integrate(molecule)
+        molecule.set_force(force)
+        # the same molecule and coordinate buffer are updated
+        assert integrator_inplace.integrate(molecule_inplace) is molecule_inplace
+        assert molecule_inplace.coords is coords_buffer
+        assert np.allclose(molecule_inplace.coords, molecule.coords)
+        assert np.allclose(integrator_inplace.prev_coords, integrator.prev_coords)
+    # reset() starts again from the current coordinates
+    integrator_inplace.reset()
+    assert integrator_inplace.prev_coords is None
@@ -0,0 +1,59 @@
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.md_simulation import MDSimulation
+from mdsim.io import BinaryTrajWriter, load_binary_traj
+from mdsim.io import binary_traj
+
+def create_traj(n_frames):
+    elems = ['He', 'H', 'He']
+    molecule = Molecule()
+    molecule.set_elems(elems)
+    traj = MDTrajectory(elems)
+    for _ in range(n_frames):
+        molecule.set_coords(np.random.random((3, 3)))
+        traj.add_frame(molecule)
+    return traj
+
+def test_save_load_binary(tmp_path):
+    traj = create_traj(10)
+    for dtype, atol in [(np.float64, 0), (np.float32, 1e-6)]:
+        traj.save_binary(tmp_path / 'traj.bin', dtype=dtype)
+        traj1 = MDTrajectory([])
+        traj1.load_binary(tmp_path / 'traj.bin')
+        assert traj1.elems == traj.elems
+        assert len(traj1) == 10
+        # the frames are mapped from the file
+        assert isinstance(traj1._xyz, np.memmap)
+        assert traj1.xyz.dtype == dtype
+        assert np.allclose(traj1.xyz, traj.xyz, atol=atol, rtol=0)
+        assert np.allclose(traj1.xyz[7], traj.xyz[7], atol=atol, rtol=0)
+        assert traj1.find_break_frame() == traj.find_break_frame()
+
+def test_save_binary_blocks(tmp_path, monkeypatch):
+    # frames converted to another dtype are written in blocks of 3 frames
+    monkeypatch.setattr(binary_traj, 'WRITE_BLOCK_SIZE', 3 * 3 * 3 * 4)
+    traj = create_traj(10)
+    traj.save_binary(tmp_path / 'traj.bin', dtype=np.float32)
+    elems, xyz = load_binary_traj(tmp_path / 'traj.bin')
+    assert np.array_equal(xyz, traj.xyz.astype(np.float32))
+
+def test_load_empty(tmp_path):
+    traj = create_traj(0)
+    traj.save_binary(tmp_path / 'empty.bin')
+    elems, xyz = load_binary_traj(tmp_path / 'empty.bin')
+    assert elems == ['He', 'H', 'He']
+    assert xyz.shape == (0, 3, 3)
+
+def test_binary_writer(tmp_path):
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    with BinaryTrajWriter(tmp_path / 'traj.bin', molecule.elems) as writer:
+        simulation = MDSimulation(molecule, LJForce(), VerletIntegrator(), interval=10, writer=writer)
+        simulation.step(100)
+    assert writer.n_frames == 10
+    elems, xyz = load_binary_traj(tmp_path / 'traj.bin')
+    assert elems == molecule.elems
+    assert np.array_equal(xyz, simulation.trajectory.xyz)
@@ -0,0 +1,77 @@
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.md_simulation import MDSimulation
+from mdsim.io import CompressedTrajWriter, CompressedTrajReader, load_compressed_traj
+
+def create_traj(n_frames):
+    elems = ['He', 'H', 'He']
+    traj = MDTrajectory(elems)
+    molecule = Molecule()
+    molecule.set_elems(elems)
+    coords = 10 * np.random.random((3, 3))
+    for _ in range(n_frames):
+        # small steps like consecutive MD frames, with a large jump once
+        coords = coords + 0.01 * (np.random.random((3, 3)) - 0.5)
+        molecule.set_coords(coords)
+        traj.add_frame(molecule)
+    if n_frames > 20:
+        traj._xyz[20:] += 1000.0
+    return traj
+
+def test_save_load_compressed(tmp_path):
+    traj = create_traj(55)
+    for precision in [1e-3, 1e-6]:
+        for codec in ['zlib', 'lzma']:
+            traj.save_compressed(tmp_path / 'traj.mdz', precision=precision, chunk_frames=10, codec=codec)
+            traj1 = MDTrajectory([])
+            traj1.load_compressed(tmp_path / 'traj.mdz')
+            assert traj1.elems == traj.elems
+            assert len(traj1) == 55
+            # the error is bounded by the quantization
+            assert np.abs(traj1.xyz - traj.xyz).max() <= 0.5 * precision * (1 + 1e-6)
+
+def test_random_access(tmp_path):
+    traj = create_traj(55)
+    traj.save_compressed(tmp_path / 'traj.mdz', chunk_frames=10)
+    elems, xyz = load_compressed_traj(tmp_path / 'traj.mdz')
+    reader = CompressedTrajReader(tmp_path / 'traj.mdz')
+    assert len(reader) == 55
+    assert len(reader.index) == 6
+    assert np.array_equal(reader[33], xyz[33])
+    assert np.array_equal(reader[-1], xyz[-1])
+    assert np.array_equal(reader[8:47:3], xyz[8:47:3])
+    assert np.array_equal(reader[40:5:-4], xyz[40:5:-4])
+    assert reader[50:50].shape == (0, 3, 3)
+    traj1 = MDTrajectory([])
+    traj1.load_compressed(tmp_path / 'traj.mdz', frames=12)
+    assert np.array_equal(traj1.xyz, xyz[12:13])
+
+def test_writer(tmp_path):
+    traj = create_traj(25)
+    # frames written one by one and in blocks give the same file
+    with CompressedTrajWriter(tmp_path / 'frames.mdz', traj.elems, chunk_frames=10) as writer:
+        for coords in traj.xyz:
+            writer.write_frame(coords)
+    with CompressedTrajWriter(tmp_path / 'blocks.mdz', traj.elems, chunk_frames=10) as writer:
+        writer.write_frames(traj.xyz[:3])
+        writer.write_frames(traj.xyz[3:])
+    assert (tmp_path / 'frames.mdz').read_bytes() == (tmp_path / 'blocks.mdz').read_bytes()
+    # an empty trajectory
+    MDTrajectory(traj.elems).save_compressed(tmp_path / 'empty.mdz')
+    elems, xyz = load_compressed_traj(tmp_path / 'empty.mdz')
+    assert elems == traj.elems
+    assert xyz.shape == (0, 3, 3)
+
+def test_simulation_writer(tmp_path):
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    with CompressedTrajWriter(tmp_path / 'traj.mdz', molecule.elems, precision=1e-6, chunk_frames=3) as writer:
+        simulation = MDSimulation(molecule, ff, VerletIntegrator(), interval=10, writer=writer)
+        simulation.step(100)
+    elems, xyz = load_compressed_traj(tmp_path / 'traj.mdz')
+    assert np.allclose(xyz, simulation.trajectory.xyz, atol=1e-6)
@@ -0,0 +1,22 @@
+import numpy as np
+from mdsim.io import xyz_frame_template, format_xyz_frames
+
+def format_per_line(elems, xyz, start=0):
+    """ The per-line f-string format the template has to reproduce """
+    text = ''
+    for i, frame_xyz in enumerate(xyz, start):
+        text += f'{len(elems)}\nFrame{i:10d}\n'
+        for e, c in zip(elems, frame_xyz):
+            text += f'{e} {c[0]:10.7f} {c[1]:10.7f} {c[2]:10.7f}\n'
+    return text
+
+def test_format_xyz_frames():
+    elems = ['He', 'H', 'He%d']
+    xyz = 1e3 * (np.random.random((5, 3, 3)) - 0.5)
+    # values at the edges of the format
+    xyz[0, 0] = [-0.0, 1e-9, -1e-9]
+    xyz[0, 1] = [1e12, np.inf, np.nan]
+    template = xyz_frame_template(elems)
+    assert format_xyz_frames(template, xyz, start=3) == format_per_line(elems, xyz, start=3)
+    assert format_xyz_frames(template, xyz.astype(np.float32)) == format_per_line(elems, xyz.astype(np.float32))
+    assert format_xyz_frames(template, xyz[:0]) == ''
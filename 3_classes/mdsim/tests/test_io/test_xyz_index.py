@@ -0,0 +1,70 @@
+import os
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.io import XYZReader, build_xyz_index
+from mdsim.io.xyz_index import load_xyz_index, index_filename
+
+def create_traj_file(filename, n_frames, noa=4):
+    molecule = Molecule()
+    molecule.set_elems(['He'] * noa)
+    traj = MDTrajectory(molecule.elems)
+    for _ in range(n_frames):
+        molecule.set_coords(np.random.random((noa, 3)))
+        traj.add_frame(molecule)
+    traj.save_xyz(filename)
+    return traj
+
+def test_build_xyz_index(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    create_traj_file(filename, 20)
+    lines = filename.read_bytes().split(b'\n')
+    for chunk_size in [5, 64, 1 << 20]:
+        noa, offsets = build_xyz_index(filename, chunk_size=chunk_size)
+        assert noa == 4
+        assert len(offsets) == 21
+        assert offsets[-1] == os.path.getsize(filename)
+        # each offset points to the atom count line of a frame
+        assert offsets[3] == sum(len(line) + 1 for line in lines[:3*6])
+    # a last frame without new line
+    filename.write_bytes(filename.read_bytes()[:-1])
+    noa, offsets = build_xyz_index(filename)
+    assert len(offsets) == 21
+    assert offsets[-1] == os.path.getsize(filename)
+
+def test_sidecar_index(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    create_traj_file(filename, 5)
+    assert load_xyz_index(filename) is None
+    reader = XYZReader(filename)
+    assert os.path.exists(index_filename(filename))
+    assert np.array_equal(load_xyz_index(filename)[1], reader.offsets)
+    # the sidecar is invalidated when the file changes
+    create_traj_file(filename, 8)
+    os.utime(filename, ns=(0, 12345))
+    assert load_xyz_index(filename) is None
+    assert len(XYZReader(filename)) == 8
+
+def test_reader(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    traj = create_traj_file(filename, 30)
+    reader = XYZReader(filename)
+    assert len(reader) == 30
+    assert np.allclose(reader[7], traj.xyz[7], atol=1e-7)
+    assert np.allclose(reader[-1], traj.xyz[-1], atol=1e-7)
+    assert np.allclose(reader[5:12], traj.xyz[5:12], atol=1e-7)
+    assert np.allclose(reader[20:2:-3], traj.xyz[20:2:-3], atol=1e-7)
+    frames = list(reader.iter_frames(3, 25, 2, chunk_frames=4))
+    assert np.allclose(frames, traj.xyz[3:25:2], atol=1e-7)
+
+def test_trajectory_frames(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    traj = create_traj_file(filename, 30)
+    traj1 = MDTrajectory(traj.elems)
+    traj1.load_xyz(filename, frames=slice(10, 20))
+    assert len(traj1) == 10
+    assert np.allclose(traj1.xyz, traj.xyz[10:20], atol=1e-7)
+    traj1.load_xyz(filename, frames=9)
+    assert np.allclose(traj1.xyz, traj.xyz[9:10], atol=1e-7)
+    frames = list(MDTrajectory.iter_xyz(filename, start=25))
+    assert np.allclose(frames, traj.xyz[25:], atol=1e-7)
@@ -0,0 +1,52 @@
+import shutil
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.io import read_xyz_parallel
+from mdsim.io.xyz_parallel import shared_memory_dir
+
+def create_traj_file(filename, n_frames, noa=4):
+    molecule = Molecule()
+    molecule.set_elems(['He'] * noa)
+    traj = MDTrajectory(molecule.elems)
+    for _ in range(n_frames):
+        molecule.set_coords(np.random.random((noa, 3)))
+        traj.add_frame(molecule)
+    traj.save_xyz(filename)
+    return traj
+
+def test_read_xyz_parallel(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    traj = create_traj_file(filename, 23)
+    # more tasks than workers, and ranges of different sizes
+    xyz = read_xyz_parallel(filename, n_workers=2, n_tasks=5)
+    assert xyz.shape == (23, 4, 3)
+    assert np.allclose(xyz, traj.xyz, atol=1e-7)
+    # more tasks than frames
+    xyz = read_xyz_parallel(filename, n_workers=2, n_tasks=100)
+    assert np.allclose(xyz, traj.xyz, atol=1e-7)
+
+def test_load_xyz_parallel(tmp_path):
+    filename = tmp_path / 'traj.xyz'
+    traj = create_traj_file(filename, 10)
+    traj2 = MDTrajectory(traj.elems)
+    traj2.load_xyz(filename, n_workers=2)
+    assert len(traj2) == 10
+    assert np.allclose(traj2.xyz, traj.xyz, atol=1e-7)
+    # the loaded trajectory can still grow
+    molecule = Molecule()
+    molecule.set_elems(traj.elems)
+    molecule.set_coords(np.zeros((4, 3)))
+    traj2.add_frame(molecule)
+    assert len(traj2) == 11
+    assert np.array_equal(traj2.xyz[-1], molecule.coords)
+
+def test_shared_memory_fallback(tmp_path, monkeypatch):
+    filename = tmp_path / 'traj.xyz'
+    traj = create_traj_file(filename, 10)
+    # a full /dev/shm falls back to the default temporary folder
+    usage = shutil.disk_usage(tmp_path)._replace(free=0)
+    monkeypatch.setattr(shutil, 'disk_usage', lambda path: usage)
+    assert shared_memory_dir(1) is None
+    xyz = read_xyz_parallel(filename, n_workers=2)
+    assert np.allclose(xyz, traj.xyz, atol=1e-7)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from mdsim.molecule import Molecule
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.io import read_xyz_coords, iter_xyz_blocks
+from mdsim.io.xyz_reader import parse_xyz_lines, parse_xyz_bytes
+
+def create_traj(n_frames, noa=5):
+    molecule = Molecule()
+    molecule.set_elems(['He'] * noa)
+    traj = MDTrajectory(molecule.elems)
+    for _ in range(n_frames):
+        molecule.set_coords(10 * np.random.random((noa, 3)) - 5)
+        traj.add_frame(molecule)
+    return traj
+
+def test_parse_xyz_lines():
+    lines = ['3', '', 'H 0 0 0', 'H 0 0 1', 'H 1 2 3', '3', 'frame 1', 'He -1 0.5 0', 'H 0 0 1e-3', 'H 1 2 3']
+    ref_xyz = [[[0,0,0], [0,0,1], [1,2,3]], [[-1,0.5,0], [0,0,1e-3], [1,2,3]]]
+    assert np.allclose(parse_xyz_lines(lines, 3), ref_xyz)
+    assert np.allclose(parse_xyz_lines([l.encode() for l in lines], 3), ref_xyz)
+
+def test_parse_fixed_columns():
+    np.random.seed(0)
+    xyz = np.random.random((4, 5, 3)) - 0.5
+    for fmt, scale in [(' %10.7f', 10), (' %10.7f', 100), (' %12.6f', 1e4), (' %8.3f', 1e3)]:
+        for newline in ['\n', '\r\n']:
+            for comment in ['', 'time=1.5']:
+                lines = []
+                for frame in scale * xyz:
+                    lines += ['5', comment] + [('H' if i % 2 else 'He') + fmt * 3 % tuple(c) for i, c in enumerate(frame)]
+                # the same as float(), also for the columns which are not of the same width
+                ref_xyz = [[float(v) for v in line.split()[1:]] for line in lines if line.startswith('H')]
+                assert np.array_equal(parse_xyz_bytes((newline.join(lines) + newline).encode(), 5), np.reshape(ref_xyz, (4, 5, 3)))
+    # the lines which are not numbers in the columns are left to numpy
+    line = 'He' + ' %12.6f' * 3 % (1.5, -12.25, 3)
+    with pytest.raises(ValueError):
+        parse_xyz_lines(['2', '', line, line.replace(' -12.25', '1-12.25')], 2)
+    assert np.array_equal(parse_xyz_lines(['2', '', line, line.replace('  3.0', '1 3.0')], 2), [[[1.5, -12.25, 3], [1.5, -12.25, 1]]])
+
+def test_read_xyz_coords(tmp_path):
+    traj = create_traj(30)
+    traj.save_xyz(tmp_path / 'traj.xyz')
+    # chunks that split frames and lines in the middle
+    for chunk_size in [7, 100, 1000, 1 << 20]:
+        xyz = read_xyz_coords(tmp_path / 'traj.xyz', chunk_size=chunk_size)
+        assert np.allclose(xyz, traj.xyz, atol=1e-7)
+        assert sum(len(block) for block in iter_xyz_blocks(tmp_path / 'traj.xyz', chunk_size=chunk_size)) == 30
+
+def test_read_xyz_no_final_newline(tmp_path):
+    (tmp_path / 'traj.xyz').write_text('2\n\nHe 0 0 0\nHe 0 0 1\n2\n\nHe 1 0 0\nHe 0 0 2')
+    xyz = read_xyz_coords(tmp_path / 'traj.xyz', chunk_size=5)
+    assert np.allclose(xyz, [[[0,0,0], [0,0,1]], [[1,0,0], [0,0,2]]])
+
+def test_load_xyz(tmp_path):
+    traj = create_traj(30)
+    traj.save_xyz(tmp_path / 'traj.xyz')
+    traj1 = MDTrajectory(traj.elems)
+    traj1.load_xyz(tmp_path / 'traj.xyz')
+    assert len(traj1) == 30
+    assert np.allclose(traj1.xyz, traj.xyz, atol=1e-7)
@@ -0,0 +1,40 @@
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.md_simulation import MDSimulation
+from mdsim.io import XYZWriter
+
+def test_write_frame(tmp_path):
+    elems = ['He', 'He']
+    molecule = Molecule()
+    molecule.set_elems(elems)
+    traj = MDTrajectory(elems)
+    with XYZWriter(tmp_path / 'stream.xyz', elems, buffer_frames=3) as writer:
+        for _ in range(7):
+            molecule.set_coords(np.random.random((2, 3)) - 0.5)
+            traj.add_frame(molecule)
+            writer.write_frame(molecule.coords)
+            # frames are written when the buffer is full
+            assert writer._n_buffered == writer.n_frames % 3
+    traj.save_xyz(tmp_path / 'saved.xyz')
+    # the streamed file is the same as the saved trajectory
+    assert (tmp_path / 'stream.xyz').read_text() == (tmp_path / 'saved.xyz').read_text()
+
+def test_simulation_writer(tmp_path):
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    with XYZWriter(tmp_path / 'traj.xyz', molecule.elems) as writer:
+        simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=10, writer=writer, keep_frames=False)
+        simulation.step(100)
+    # no frame is kept in memory
+    assert len(simulation.trajectory) == 0
+    simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=10)
+    simulation.step(100)
+    traj = MDTrajectory(molecule.elems)
+    traj.load_xyz(tmp_path / 'traj.xyz')
+    assert len(traj) == 10
+    assert np.allclose(traj.xyz, simulation.trajectory.xyz, atol=1e-7)
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator
+from mdsim.md_trajectory import MDTrajectory
+from mdsim.md_simulation import MDSimulation
+from mdsim.md_ensemble import MDEnsembleSimulation
+
+def create_replicas(n_replicas):
+    molecules = []
+    for _ in range(n_replicas):
+        molecule = Molecule()
+        molecule.create_cube(n=2)
+        molecule.set_coords(molecule.coords + 0.05 * np.random.random(molecule.coords.shape))
+        molecules.append(molecule)
+    return molecules
+
+def test_init():
+    molecules = create_replicas(3)
+    ff = LJForce()
+    integrator = VerletIntegrator(t_step=0.001)
+    ensemble = MDEnsembleSimulation(molecules, ff, integrator, interval=10)
+    assert ensemble.n_replicas == 3
+    assert ensemble.coords.shape == (3, 8, 3)
+    assert len(ensemble.trajectories) == 3
+    assert all(isinstance(traj, MDTrajectory) for traj in ensemble.trajectories)
+
+def test_step():
+    """ test the ensemble against independent simulations of each replica """
+    molecules = create_replicas(3)
+    sigmas = np.array([0.8, 0.9, 1.0])
+    ff = LJForce(kernel='half')
+    ff.set_params(sigma=sigmas, epsilon=20.0)
+    ensemble = MDEnsembleSimulation(molecules, ff, VerletIntegrator(t_step=0.001), interval=10)
+    ensemble.step(50)
+    assert ensemble.current_step == 50
+    for molecule, sigma, traj, ens_molecule in zip(molecules, sigmas, ensemble.trajectories, ensemble.molecules):
+        ff = LJForce()
+        ff.set_params(sigma=sigma, epsilon=20.0)
+        simulation = MDSimulation(molecule, ff, VerletIntegrator(t_step=0.001), interval=10)
+        simulation.step(50)
+        assert len(traj) == len(simulation.trajectory) == 5
+        assert np.allclose(traj.xyz, simulation.trajectory.xyz)
+        assert np.allclose(ens_molecule.coords, simulation.molecule.coords)
+
+def test_step_inplace():
+    molecules = create_replicas(2)
+    ensembles = []
+    for inplace in [False, True]:
+        ff = LJForce(kernel='half')
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        ensemble = MDEnsembleSimulation(molecules, ff, VerletIntegrator(t_step=0.001, inplace=inplace), interval=10)
+        ensemble.step(30)
+        ensembles.append(ensemble)
+    assert np.allclose(ensembles[0].coords, ensembles[1].coords)
+
+def test_periodic():
+    molecules = create_replicas(2)
+    for molecule in molecules:
+        molecule.set_box(2.0)
+    # the batch kernels do not support a periodic box, so the ensemble does not run without it
+    with pytest.raises(AssertionError, match='periodic box'):
+        MDEnsembleSimulation(molecules, LJForce(kernel='half'), VerletIntegrator())
+    molecules[1].set_box(3.0)
+    with pytest.raises(AssertionError, match='same box'):
+        MDEnsembleSimulation(molecules, LJForce(kernel='half'), VerletIntegrator())
@@ -1,6 +1,7 @@
+import numpy as np
 from mdsim.molecule import Molecule
 from mdsim.force import LJForce
-from mdsim.integrator import VerletIntegrator
+from mdsim.integrator import VerletIntegrator, VelocityVerletIntegrator
 from mdsim.md_trajectory import MDTrajectory
 from mdsim.md_simulation import MDSimulation
 
@@ -24,4 +25,115 @@ def test_step():
     simulation = MDSimulation(molecule, ff, integrator, interval=100)
     # test running simulation for 100 steps
     simulation.step(100)
-    assert simulation.current_step == 100
\ No newline at end of file
+    assert simulation.current_step == 100
+
+def test_step_neighbor_list():
+    # the neighbor list of the force should be reused between steps
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce(kernel='neighbor', cutoff=2.5, skin=0.3)
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    integrator = VerletIntegrator(t_step=0.001)
+    simulation = MDSimulation(molecule, ff, integrator, interval=100)
+    simulation.step(100)
+    assert simulation.current_step == 100
+    assert 1 <= ff.neighbor_list.n_builds < 100
+
+def test_step_inplace():
+    # in-place integration should give the same trajectory
+    trajs = []
+    for inplace in [False, True]:
+        molecule = Molecule()
+        molecule.create_cube(n=3)
+        ff = LJForce()
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        integrator = VerletIntegrator(t_step=0.001, inplace=inplace)
+        coords = molecule.coords.copy()
+        simulation = MDSimulation(molecule, ff, integrator, interval=10)
+        simulation.step(100)
+        trajs.append(simulation.trajectory.xyz)
+        # the molecule of the caller is not changed
+        assert simulation.molecule is not molecule
+        assert np.array_equal(molecule.coords, coords)
+    assert np.allclose(trajs[0], trajs[1])
+
+def test_step_force_buffer():
+    # the force of every step is written into the same buffer
+    for kernel, cutoff in [('dense', None), ('neighbor', 5.0), ('tiled', None), ('half', None)]:
+        molecule = Molecule()
+        molecule.create_cube(n=3)
+        ff = LJForce(kernel=kernel, cutoff=cutoff, block_size=10)
+        ff.set_params(sigma=0.9, epsilon=20.0)
+        simulation = MDSimulation(molecule, ff, VerletIntegrator(t_step=0.001, inplace=True), interval=10)
+        force_buffer = simulation._force
+        simulation.step(20)
+        assert simulation.molecule.force is force_buffer
+        ref_ff = LJForce()
+        ref_ff.set_params(sigma=0.9, epsilon=20.0)
+        reference = MDSimulation(molecule, ref_ff, VerletIntegrator(t_step=0.001), interval=10)
+        reference.step(20)
+        assert np.allclose(simulation.trajectory.xyz, reference.trajectory.xyz)
+
+def test_step_reserve_frames():
+    # the trajectory buffer is allocated for the frames of each run
+    molecule = Molecule()
+    molecule.create_cube(n=2)
+    simulation = MDSimulation(molecule, LJForce(), VerletIntegrator(t_step=0.001), interval=10)
+    simulation.step(25)
+    assert len(simulation.trajectory) == simulation.trajectory.capacity == 3
+    simulation.step(25)
+    assert len(simulation.trajectory) == 5
+    assert simulation.trajectory.capacity == 6
+    # short runs in a loop only reallocate the buffer a logarithmic number of times
+    capacities = set()
+    for _ in range(100):
+        simulation.step(10)
+        capacities.add(simulation.trajectory.capacity)
+    assert len(simulation.trajectory) == 105
+    assert capacities == {6, 12, 24, 48, 96, 192}
+
+def test_log_observables():
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    simulation = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=100, log_observables=True)
+    simulation.step(1000)
+    assert simulation.observables['step'] == list(range(0, 1000, 100))
+    assert len(simulation.observables['potential_energy']) == 10
+    assert simulation.observables['virial'][0].shape == (3, 3)
+    energy, force, virial = ff.compute_energy_force(molecule.coords)
+    assert simulation.observables['potential_energy'][0] == energy
+    # logging does not change the trajectory
+    reference = MDSimulation(molecule.copy(), ff, VerletIntegrator(), interval=100)
+    reference.step(1000)
+    assert np.array_equal(simulation.trajectory.xyz, reference.trajectory.xyz)
+
+def create_periodic_simulation(**kwargs):
+    """ a simple cubic lattice in a periodic box, with random displacements """
+    molecule = Molecule()
+    molecule.create_cube(n=6, periodic=True)
+    molecule.set_coords(molecule.coords + 0.1 * np.random.RandomState(0).random_sample(molecule.coords.shape))
+    ff = LJForce(kernel='neighbor', cutoff=2.65, skin=0.3)
+    ff.set_params(sigma=0.9, epsilon=1.0)
+    return MDSimulation(molecule, ff, VelocityVerletIntegrator(t_step=0.002), interval=10, log_observables=True, **kwargs)
+
+def test_step_periodic(tmp_path):
+    simulation = create_periodic_simulation()
+    assert np.array_equal(simulation.ff.box, simulation.molecule.box)
+    simulation.step(1000)
+    total = np.array(simulation.observables['potential_energy']) + np.array(simulation.observables['kinetic_energy'])
+    # the truncated potential jumps when pairs cross the cutoff, so the energy is only roughly conserved
+    assert np.abs(total - total[0]).max() < 1e-2 * np.abs(total[0])
+    # the box is restored from a checkpoint
+    reference = create_periodic_simulation()
+    reference.step(600)
+    checkpoint_file = tmp_path / 'run.chk'
+    simulation = create_periodic_simulation(checkpoint_file=checkpoint_file, checkpoint_interval=300)
+    simulation.step(300)
+    simulation = create_periodic_simulation()
+    simulation.molecule.set_box(None)
+    simulation.restore(checkpoint_file)
+    assert np.array_equal(simulation.molecule.box, reference.molecule.box)
+    simulation.step(300)
+    assert np.array_equal(simulation.trajectory.xyz, reference.trajectory.xyz)
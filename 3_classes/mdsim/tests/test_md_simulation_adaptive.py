@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from mdsim.molecule import Molecule
+from mdsim.force import LJForce
+from mdsim.integrator import VerletIntegrator, VelocityVerletIntegrator
+from mdsim.md_simulation import MDSimulation
+
+def create_simulation(integrator, **kwargs):
+    molecule = Molecule()
+    molecule.create_cube(n=3)
+    ff = LJForce()
+    ff.set_params(sigma=0.9, epsilon=20.0)
+    return MDSimulation(molecule, ff, integrator, **kwargs)
+
+def test_set_adaptive():
+    integrator = VelocityVerletIntegrator(t_step=0.1)
+    integrator.set_adaptive(1e-4, 0.01)
+    # the initial step is clipped into the bounds
+    assert integrator.t_step == 0.01
+    assert integrator.next_t_step(max_speed=10.0, max_accel=0.0) == pytest.approx(0.001)
+    assert integrator.next_t_step(max_speed=0.0, max_accel=0.0) == pytest.approx(0.00105)
+    assert integrator.next_t_step(max_speed=1e6, max_accel=0.0) == 1e-4
+    integrator.t_step_limit = 1e-6
+    assert integrator.next_t_step(max_speed=0.0, max_accel=0.0) == 1e-6
+    # the Verlet formula needs a constant step
+    with pytest.raises(NotImplementedError):
+        VerletIntegrator().set_adaptive(1e-4, 0.01)
+
+def test_record_time():
+    # a fixed step records the frames at the steps reaching each time
+    simulation = create_simulation(VelocityVerletIntegrator(t_step=0.001), record_time=0.05)
+    simulation.run(1.0)
+    assert simulation.current_step == 1000
+    assert len(simulation.trajectory) == 20
+    assert simulation.time == pytest.approx(1.0)
+    # the adaptive step lands on the record times
+    integrator = VelocityVerletIntegrator()
+    integrator.set_adaptive(1e-5, 0.003, max_displacement=0.003)
+    adaptive = create_simulation(integrator, record_time=0.05, log_observables=True, interval=1)
+    adaptive.run(1.0)
+    assert adaptive.time == 1.0
+    assert len(adaptive.trajectory) == 20
+    assert adaptive.current_step < 1000
+    assert np.allclose(adaptive.trajectory.xyz, simulation.trajectory.xyz, atol=1e-3)
+    energy = np.array(adaptive.observables['potential_energy']) + np.array(adaptive.observables['kinetic_energy'])
+    assert np.abs(energy - energy[0]).max() < 0.1
+    # the checkpoint carries the simulated time
+    state = adaptive.get_state()
+    assert state['time'] == 1.0
+    assert state['next_record_time'] == pytest.approx(1.05)
@@ -35,4 +35,39 @@ def test_fine_break_frame():
     molecule1.set_coords(coords + 1)
     traj.add_frame(molecule1)
     break_frame = traj.find_break_frame(thresh=0.1)
-    assert break_frame == 5
\ No newline at end of file
+    assert break_frame == 5
+
+def test_frame_buffer():
+    elems = ['He', 'He']
+    molecule = Molecule()
+    molecule.set_elems(elems)
+    traj = MDTrajectory(elems, n_frames=2)
+    assert traj.capacity == 2
+    for i in range(20):
+        molecule.set_coords(np.full((2, 3), i))
+        traj.add_frame(molecule)
+    # the buffer grows to hold all frames
+    assert len(traj) == 20
+    assert traj.capacity >= 20
+    assert np.array_equal(traj.xyz[:,0,0], np.arange(20))
+    # xyz is a read-only view of the buffer
+    assert traj.xyz.base is not None
+    assert not traj.xyz.flags.writeable
+    # reserve keeps the frames
+    traj.reserve(100)
+    assert traj.capacity == 100
+    assert np.array_equal(traj.xyz[:,0,0], np.arange(20))
+    # a small reservation still doubles the buffer
+    traj.reserve(101)
+    assert traj.capacity == 200
+
+def test_find_break_frame_chunks():
+    elems = ['He', 'He']
+    molecule = Molecule()
+    molecule.set_elems(elems)
+    traj = MDTrajectory(elems)
+    for i in range(50):
+        molecule.set_coords(np.zeros((2, 3)) + (i >= 37))
+        traj.add_frame(molecule)
+    for chunk_size in [1, 7, 100]:
+        assert traj.find_break_frame(thresh=0.1, chunk_size=chunk_size) == 37
@@ -1,3 +1,4 @@
+import pytest
 import numpy as np
 from mdsim.molecule import Molecule
 
@@ -59,3 +60,49 @@ def test_copy():
     assert not np.array_equal(m.masses, m1.masses)
     assert not np.array_equal(m.coords, m1.coords)
     assert not np.array_equal(m.force, m1.force)
+
+def test_masses_cache():
+    m = Molecule()
+    m.set_elems(['He', 'H'])
+    assert np.array_equal(m.elem_idx, [1, 0])
+    masses = m.masses
+    # the same array is returned until the elements are changed
+    assert m.masses is masses
+    assert np.array_equal(m.inv_masses, [0.5, 1.0])
+    m.set_elems(['H', 'H'])
+    assert np.array_equal(m.masses, [1.0, 1.0])
+    assert np.array_equal(m.inv_masses, [1.0, 1.0])
+    # changing the elements list in place also refreshes the cache
+    m.elems[1] = 'He'
+    assert np.array_equal(m.elem_idx, [0, 1])
+    assert np.array_equal(m.masses, [1.0, 2.0])
+    m.elems.append('He')
+    assert m.noa == 3
+    assert np.array_equal(m.inv_masses, [1.0, 0.5, 0.5])
+    m.elems = ['He']
+    assert np.array_equal(m.masses, [2.0])
+    with pytest.raises(AssertionError):
+        m.elems[0] = 'X'
+
+def test_set_unchecked():
+    m = Molecule()
+    m.set_elems(['He', 'He'])
+    coords = np.random.random((2,3))
+    force = np.random.random((2,3))
+    # the arrays are assigned without copy
+    m.set_coords_unchecked(coords)
+    m.set_force_unchecked(force)
+    assert m.coords is coords
+    assert m.force is force
+
+def test_set_box():
+    m = Molecule()
+    m.create_cube(n=3, periodic=True)
+    assert np.array_equal(m.box, [3.0, 3.0, 3.0])
+    assert m.copy().box is m.box
+    m.set_box([3.0, 4.0, 5.0])
+    assert np.array_equal(m.box, [3.0, 4.0, 5.0])
+    m.set_box(None)
+    assert m.box is None
+    with pytest.raises(AssertionError):
+        m.set_box([1.0, -1.0, 1.0])